@@ -4,6 +4,8 @@ This file is used when FIREBASE_EMULATOR=true in the .env file.
 """
 
 import os
+import uuid
+from enum import Enum
 from unittest.mock import MagicMock
 
 # Mock Firebase Auth
@@ -56,54 +58,147 @@ class MockFirestore:
             "applications": {},
             "scrape_tasks": {}
         }
+        # Snapshot listeners per collection
+        self.watchers = {}
         
     def collection(self, collection_name):
         """Get a collection reference."""
         if collection_name not in self.collections:
             self.collections[collection_name] = {}
-        return MockCollectionReference(self.collections[collection_name])
+        watchers = self.watchers.setdefault(collection_name, [])
+        return MockCollectionReference(self.collections[collection_name], watchers)
+    
+    def get_all(self, references, **kwargs):
+        """Get several documents in one call."""
+        return [ref.get() for ref in references]
+    
+    def batch(self):
+        """Create a write batch."""
+        return MockWriteBatch()
+
+class MockWriteBatch:
+    def __init__(self):
+        self.writes = []
+        
+    def set(self, doc_ref, data):
+        self.writes.append(lambda: doc_ref.set(data))
+        
+    def update(self, doc_ref, data):
+        self.writes.append(lambda: doc_ref.update(data))
+        
+    def delete(self, doc_ref):
+        self.writes.append(doc_ref.delete)
+        
+    def commit(self, **kwargs):
+        """Apply the queued writes."""
+        if len(self.writes) > 500:
+            raise ValueError("A batch can contain at most 500 writes")
+        for write in self.writes:
+            write()
+        return ["mock-write-result"] * len(self.writes)
+
+class MockChangeType(Enum):
+    """Mirrors google.cloud.firestore_v1.watch.ChangeType."""
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+class MockDocumentChange:
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+class MockWatch:
+    def __init__(self, watchers, callback):
+        self.watchers = watchers
+        self.callback = callback
+        
+    def unsubscribe(self):
+        """Stop receiving changes."""
+        if self.callback in self.watchers:
+            self.watchers.remove(self.callback)
+
+def notify_watchers(watchers, change_type, doc_id, data):
+    """Deliver a single change to every listener of a collection."""
+    if not watchers:
+        return
+    change = MockDocumentChange(change_type, MockDocumentSnapshot(doc_id, dict(data) if data is not None else None))
+    for callback in list(watchers):
+        callback([], [change], "mock-read-time")
 
 class MockCollectionReference:
-    def __init__(self, collection_data):
+    def __init__(self, collection_data, watchers=None):
         self.collection_data = collection_data
+        self.watchers = watchers if watchers is not None else []
         
     def document(self, doc_id=None):
         """Get a document reference."""
         if doc_id is None:
             # Generate a random doc_id
-            doc_id = f"mock-doc-{len(self.collection_data) + 1}"
-        return MockDocumentReference(self.collection_data, doc_id)
+            doc_id = f"mock-doc-{uuid.uuid4().hex[:20]}"
+        return MockDocumentReference(self.collection_data, doc_id, self.watchers)
+    
+    def on_snapshot(self, callback):
+        """Listen for changes. The current documents are delivered immediately as ADDED."""
+        self.watchers.append(callback)
+        changes = [
+            MockDocumentChange(MockChangeType.ADDED, MockDocumentSnapshot(doc_id, dict(data)))
+            for doc_id, data in self.collection_data.items()
+        ]
+        callback([], changes, "mock-read-time")
+        return MockWatch(self.watchers, callback)
     
     def where(self, field, op, value):
         """Query documents."""
-        return MockQuery(self.collection_data, field, op, value)
+        return MockQuery(self.collection_data, field, op, value, self.watchers)
+    
+    def select(self, field_paths):
+        """Return only the given fields of each document."""
+        return MockQuery(self.collection_data, watchers=self.watchers).select(field_paths)
     
-    def stream(self):
+    def order_by(self, field):
+        """Order documents by a field ("__name__" is the document ID)."""
+        return MockQuery(self.collection_data, watchers=self.watchers).order_by(field)
+    
+    def limit(self, count):
+        """Return at most count documents."""
+        return MockQuery(self.collection_data, watchers=self.watchers).limit(count)
+    
+    def count(self, alias=None):
+        """Count documents (aggregation query)."""
+        return MockQuery(self.collection_data, watchers=self.watchers).count(alias)
+    
+    def stream(self, **kwargs):
         """Stream all documents."""
         return [MockDocumentSnapshot(doc_id, data) for doc_id, data in self.collection_data.items()]
 
 class MockDocumentReference:
-    def __init__(self, collection_data, doc_id):
+    def __init__(self, collection_data, doc_id, watchers=None):
         self.collection_data = collection_data
         self.id = doc_id
+        self.watchers = watchers if watchers is not None else []
         
-    def get(self):
+    def get(self, **kwargs):
         """Get the document."""
         return MockDocumentSnapshot(self.id, self.collection_data.get(self.id))
     
-    def set(self, data):
+    def set(self, data, **kwargs):
         """Set document data."""
+        change_type = MockChangeType.MODIFIED if self.id in self.collection_data else MockChangeType.ADDED
         self.collection_data[self.id] = data
+        notify_watchers(self.watchers, change_type, self.id, data)
         
-    def update(self, data):
+    def update(self, data, **kwargs):
         """Update document data."""
         if self.id in self.collection_data:
             self.collection_data[self.id].update(data)
+            notify_watchers(self.watchers, MockChangeType.MODIFIED, self.id, self.collection_data[self.id])
     
-    def delete(self):
+    def delete(self, **kwargs):
         """Delete the document."""
         if self.id in self.collection_data:
             del self.collection_data[self.id]
+            notify_watchers(self.watchers, MockChangeType.REMOVED, self.id, None)
 
 class MockDocumentSnapshot:
     def __init__(self, doc_id, data):
@@ -115,44 +210,174 @@ class MockDocumentSnapshot:
         """Convert to dict."""
         return self._data
 
+class MockAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+class MockAggregationQuery:
+    def __init__(self, query, alias=None):
+        self.query = query
+        self.alias = alias or "count"
+    
+    def get(self, **kwargs):
+        """Run the aggregation; results come back as a list of result lists."""
+        return [[MockAggregationResult(self.alias, len(self.query.stream()))]]
+
 class MockQuery:
-    def __init__(self, collection_data, field, op, value):
+    def __init__(self, collection_data, field=None, op=None, value=None, watchers=None):
         self.collection_data = collection_data
-        self.field = field
-        self.op = op
-        self.value = value
+        self.watchers = watchers if watchers is not None else []
+        self.filters = [(field, op, value)] if field is not None else []
+        self.field_paths = None
+        self.orders = []
+        self.cursor = None
+        self.max_results = None
+    
+    def select(self, field_paths):
+        """Return only the given fields of each document."""
+        self.field_paths = list(field_paths)
+        return self
+    
+    def where(self, field, op, value):
+        """Add another filter."""
+        self.filters.append((field, op, value))
+        return self
+    
+    def count(self, alias=None):
+        """Count the matching documents (aggregation query)."""
+        return MockAggregationQuery(self, alias)
+    
+    def on_snapshot(self, callback):
+        """
+        Listen for changes to the matching documents. The current matches are
+        delivered immediately as ADDED; documents that stop matching or are
+        deleted are delivered as REMOVED.
+        """
+        matched = set()
+        first_delivery = True
+        
+        def on_collection_snapshot(col_snapshot, changes, read_time):
+            nonlocal first_delivery
+            delivered = []
+            for change in changes:
+                doc = change.document
+                if doc.exists and self.matches(doc.to_dict()):
+                    change_type = MockChangeType.MODIFIED if doc.id in matched else MockChangeType.ADDED
+                    matched.add(doc.id)
+                    delivered.append(MockDocumentChange(change_type, doc))
+                elif doc.id in matched:
+                    matched.discard(doc.id)
+                    delivered.append(MockDocumentChange(MockChangeType.REMOVED, MockDocumentSnapshot(doc.id, None)))
+            if delivered or first_delivery:
+                first_delivery = False
+                callback(col_snapshot, delivered, read_time)
         
-    def stream(self):
+        return MockCollectionReference(self.collection_data, self.watchers).on_snapshot(on_collection_snapshot)
+    
+    def order_by(self, field):
+        """Order documents by a field ("__name__" is the document ID)."""
+        self.orders.append(field)
+        return self
+    
+    def start_after(self, values):
+        """Start after the document with the given order_by values."""
+        self.cursor = values
+        return self
+    
+    def limit(self, count):
+        """Return at most count documents."""
+        self.max_results = count
+        return self
+    
+    def sort_key(self, doc_id, data):
+        """Values of the order_by fields for a document."""
+        key = []
+        for field in self.orders:
+            if field == "__name__":
+                key.append(doc_id)
+            else:
+                key.append(self.get_path(data, field))
+        return tuple(key)
+    
+    @staticmethod
+    def get_path(data, path):
+        value = data
+        for part in path.split("."):
+            if not isinstance(value, dict) or part not in value:
+                return None
+            value = value[part]
+        return value
+        
+    def stream(self, **kwargs):
         """Stream filtered documents."""
-        results = []
-        for doc_id, data in self.collection_data.items():
-            if self.matches(data):
-                results.append(MockDocumentSnapshot(doc_id, data))
-        return results
+        matching = [
+            (doc_id, data) for doc_id, data in self.collection_data.items()
+            if self.matches(data) and all(
+                field == "__name__" or self.get_path(data, field) is not None for field in self.orders
+            )
+        ]
+        if self.orders:
+            matching.sort(key=lambda item: self.sort_key(*item))
+        if self.cursor is not None:
+            after = tuple(
+                getattr(self.cursor[field], "id", self.cursor[field]) for field in self.orders
+            )
+            matching = [item for item in matching if self.sort_key(*item) > after]
+        if self.max_results is not None:
+            matching = matching[:self.max_results]
+        return [MockDocumentSnapshot(doc_id, self.project(data)) for doc_id, data in matching]
+    
+    def project(self, data):
+        """Apply select() to a document."""
+        if self.field_paths is None:
+            return data
+        result = {}
+        for path in self.field_paths:
+            value = data
+            parts = path.split(".")
+            for part in parts:
+                if not isinstance(value, dict) or part not in value:
+                    break
+                value = value[part]
+            else:
+                target = result
+                for part in parts[:-1]:
+                    target = target.setdefault(part, {})
+                target[parts[-1]] = value
+        return result
     
     def matches(self, data):
-        """Check if data matches the query."""
-        if self.field not in data:
+        """Check if data matches every filter of the query."""
+        return all(self.matches_filter(data, *f) for f in self.filters)
+    
+    @staticmethod
+    def matches_filter(data, field, op, value):
+        """Check if data matches one filter."""
+        if field not in data:
             return False
         
-        field_value = data[self.field]
+        field_value = data[field]
         
-        if self.op == "==":
-            return field_value == self.value
-        elif self.op == ">":
-            return field_value > self.value
-        elif self.op == ">=":
-            return field_value >= self.value
-        elif self.op == "<":
-            return field_value < self.value
-        elif self.op == "<=":
-            return field_value <= self.value
+        if op == "==":
+            return field_value == value
+        elif op == ">":
+            return field_value > value
+        elif op == ">=":
+            return field_value >= value
+        elif op == "<":
+            return field_value < value
+        elif op == "<=":
+            return field_value <= value
         else:
             return False
 
 # Server timestamp
 SERVER_TIMESTAMP = "mock-timestamp"
 
+# A single in-memory database shared by every client, like a real Firestore project
+_mock_db = MockFirestore()
+
 # Mock the Firebase app initialization
 def mock_firebase_init():
     """Mock Firebase initialization for testing."""
@@ -162,7 +387,7 @@ def mock_firebase_init():
     return {
         "auth": MockFirebaseAuth(),
         "firestore": type('obj', (object,), {
-            'client': lambda: MockFirestore(),
+            'client': lambda: _mock_db,
             'SERVER_TIMESTAMP': SERVER_TIMESTAMP
         })
     } 
\ No newline at end of file
@@ -3,12 +3,16 @@ import os
 import logging
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 import sys
 import datetime
 from fastapi.staticfiles import StaticFiles
+from starlette.routing import Match
+from app.services.metrics_service import metrics, current_route, render_metrics
+from app.utils.responses import FastJSONResponse
+from app.utils.compression import compress_response
 
 # Configure root logger first
 logging.basicConfig(
@@ -27,7 +31,9 @@ load_dotenv()
 app = FastAPI(
     title="ScrapeMyUni Backend",
     description="API for ScrapeMyUni application providing university data and scraping functionalities",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson rendering that understands Firestore timestamps and cached documents
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -47,7 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["Content-Type", "Authorization", "X-Requested-With"],
+    expose_headers=["Content-Type", "Authorization", "X-Requested-With", "ETag"],
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
@@ -60,15 +66,68 @@ except Exception as e:
     logger.error(f"Failed to initialize Firebase: {str(e)}")
     print(f"Error initializing Firebase: {str(e)}")
 
+# Keep live replicas of read-mostly collections (the university catalog)
+if os.getenv("FIREBASE_LIVE_REPLICA", "true").lower() == "true":
+    try:
+        from app.services.catalog_replica import start_replicas
+        from app.services.storage_backend import get_backend
+        # Seed the replicas from their snapshot files so only later changes are read
+        warm_start = os.getenv("CATALOG_SNAPSHOT_WARM_START", "true").lower() == "true"
+        start_replicas(get_backend(), snapshots=warm_start)
+        logger.info("Live collection replicas started")
+    except Exception as e:
+        logger.error(f"Failed to start live replicas: {str(e)}")
+
 # Start background scheduler
 try:
-    from app.services.scheduler_service import start_scheduler
+    from app.services.scheduler_service import start_scheduler, add_job
+    from app.services.firebase_service import FirebaseService
     start_scheduler()
+    # Send writes deferred to conserve quota once the budget allows again
+    add_job(FirebaseService().flush_deferred_writes, 'interval', minutes=5,
+            id='flush_deferred_writes', replace_existing=True)
+    # Notice catalog deletions missed by replicas that only follow changes
+    from app.services.catalog_replica import verify_replicas
+    add_job(verify_replicas, 'interval', minutes=15, id='verify_replicas', replace_existing=True)
+    # Keep the warm-start snapshots recent so the next boot reads few changes
+    refresh_hours = float(os.getenv("CATALOG_SNAPSHOT_REFRESH_HOURS", "6"))
+    if refresh_hours > 0:
+        from app.services.catalog_snapshot import save_replica_snapshots
+        add_job(save_replica_snapshots, 'interval', hours=refresh_hours,
+                id='save_replica_snapshots', replace_existing=True)
     logger.info("Background scheduler started")
 except Exception as e:
     logger.error(f"Failed to start scheduler: {str(e)}")
     print(f"Error starting scheduler: {str(e)}")
 
+# Attribute Firestore reads and writes to the route that caused them
+@app.middleware("http")
+async def track_route_metrics(request: Request, call_next):
+    """Label work done while handling a request with its route template."""
+    route = "unmatched"
+    for candidate in request.app.router.routes:
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            route = getattr(candidate, "path", route)
+            break
+    token = current_route.set(route)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        current_route.reset(token)
+        metrics.record_request(route, status_code)
+
+# Compress large JSON responses with gzip/brotli; defined last so it wraps the
+# middleware above and compresses the final body (cached bodies arrive precompressed)
+@app.middleware("http")
+async def compress_responses(request: Request, call_next):
+    """Negotiate Accept-Encoding and compress responses over COMPRESSION_MIN_SIZE bytes."""
+    response = await call_next(request)
+    return await compress_response(request, response)
+
 # Exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -106,16 +165,21 @@ except Exception as e:
 @app.get("/", tags=["Health"])
 async def root():
     """Health check endpoint."""
-    return {"message": "ScrapeMyUni API is running."}
+    return FastJSONResponse({"message": "ScrapeMyUni API is running."})
 
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Detailed health check endpoint."""
-    return {
+    return FastJSONResponse({
         "status": "ok",
         "version": app.version,
         "environment": os.getenv("ENV", "development")
-    }
+    })
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Firestore usage and cache metrics for this worker, in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Add a duplicate endpoint for /api/health for consistency
 @app.get("/api/health", tags=["Health"])
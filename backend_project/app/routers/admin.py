@@ -1,53 +1,88 @@
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Response, status, Header
 from app.services.scraper_service import scrape_all_universities
-from app.services.firebase_service import FirebaseService
+from app.services.async_firebase_service import AsyncFirebaseService
 from app.utils.auth_middleware import get_admin_user
+from fastapi.responses import FileResponse
+from app.utils.responses import FastJSONResponse
 from firebase_admin import firestore
 import time
+import asyncio
 import logging
 import subprocess
 import os
 import sys
 
 router = APIRouter()
-firebase_service = FirebaseService()
+firebase_service = AsyncFirebaseService()
 logger = logging.getLogger(__name__)
 
 @router.get("/dashboard")
 async def get_admin_dashboard(admin = Depends(get_admin_user)):
-    """Get admin dashboard statistics."""
+    """
+    Get admin dashboard statistics.
+    
+    Totals come from aggregation (count) queries, so a dashboard load costs a
+    few reads however many documents the collections hold.
+    """
     try:
-        # Count total universities
-        universities = firebase_service.query_collection("universities")
-        total_universities = len(universities)
-        
-        # Count total users
-        users = firebase_service.query_collection("users")
-        total_users = len(users)
-        
-        # Count total applications
-        applications = firebase_service.query_collection("applications")
-        total_applications = len(applications)
-        
-        # Count pending scrape jobs
-        scrape_jobs = firebase_service.query_collection(
-            "scrape_jobs", 
-            where_field="status", 
-            where_op="==", 
-            where_value="pending"
+        total_universities, total_users, total_applications, pending_scrape_jobs = await asyncio.gather(
+            firebase_service.count_documents("universities"),
+            firebase_service.count_documents("users"),
+            firebase_service.count_documents("applications"),
+            firebase_service.count_documents("scrape_jobs", [("status", "==", "pending")]),
         )
-        pending_scrape_jobs = len(scrape_jobs)
         
-        return {
+        return FastJSONResponse({
             "totalUniversities": total_universities,
             "totalUsers": total_users,
             "totalApplications": total_applications,
-            "pendingScrapeJobs": pending_scrape_jobs
-        }
+            "pendingScrapeJobs": pending_scrape_jobs,
+            "quota": firebase_service.get_quota_status()
+        })
     except Exception as e:
         logger.error(f"Error getting admin dashboard: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting admin dashboard: {str(e)}")
 
+@router.get("/quota")
+async def get_quota_status(admin = Depends(get_admin_user)):
+    """Get today's Firestore read/write budget usage and degradation state."""
+    return FastJSONResponse(firebase_service.get_quota_status())
+
+@router.post("/catalog/snapshots")
+async def save_catalog_snapshots(admin = Depends(get_admin_user)):
+    """
+    Write warm-start snapshots of the replicated collections.
+    
+    A running replica is written as it is (no reads); otherwise the whole
+    collection is streamed from Firestore.
+    """
+    from app.services.catalog_replica import REPLICATED_COLLECTIONS, get_replica
+    from app.services.catalog_snapshot import export_collection, export_replica
+    
+    snapshots = []
+    try:
+        for collection in REPLICATED_COLLECTIONS:
+            replica = get_replica(collection)
+            if replica is not None and replica.synced_at is not None:
+                snapshots.append(await asyncio.to_thread(export_replica, replica))
+            else:
+                snapshots.append(await asyncio.to_thread(export_collection, firebase_service.sync.db, collection))
+        return FastJSONResponse({"snapshots": snapshots})
+    except Exception as e:
+        logger.error(f"Error writing catalog snapshots: {e}")
+        raise HTTPException(status_code=500, detail=f"Error writing catalog snapshots: {str(e)}")
+
+@router.get("/catalog/snapshots/{collection}")
+async def download_catalog_snapshot(collection: str, admin = Depends(get_admin_user)):
+    """Download the snapshot file of a replicated collection."""
+    from app.services.catalog_replica import REPLICATED_COLLECTIONS
+    from app.services.catalog_snapshot import snapshot_path
+    
+    path = snapshot_path(collection)
+    if collection not in REPLICATED_COLLECTIONS or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(path, media_type="application/gzip", filename=os.path.basename(path))
+
 @router.post("/scrape-jobs/batch")
 async def trigger_batch_scrape(
     background_tasks: BackgroundTasks,
@@ -71,7 +106,7 @@ async def trigger_batch_scrape(
         }
         
         # Store the batch job record
-        firebase_service.create_document("scrape_batch_jobs", batch_job_data, batch_job_id)
+        await firebase_service.create_document("scrape_batch_jobs", batch_job_data, batch_job_id)
         
         # Get the path to the wrapper script
         wrapper_script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
@@ -82,11 +117,11 @@ async def trigger_batch_scrape(
         # Run the script in the background
         background_tasks.add_task(run_python_script_directly, wrapper_script_path, batch_job_id)
         
-        return {
+        return FastJSONResponse({
             "message": "Batch scrape job started successfully",
             "batchJobId": batch_job_id,
             "status": "in_progress"
-        }
+        })
     except Exception as e:
         logger.error(f"Error triggering batch scrape: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to trigger batch scrape: {str(e)}")
@@ -120,7 +155,7 @@ async def trigger_direct_batch_scrape(
         }
         
         # Store the batch job record
-        firebase_service.create_document("scrape_batch_jobs", batch_job_data, batch_job_id)
+        await firebase_service.create_document("scrape_batch_jobs", batch_job_data, batch_job_id)
         
         # Get the path to the wrapper script
         wrapper_script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
@@ -131,11 +166,11 @@ async def trigger_direct_batch_scrape(
         # Run script in the background
         background_tasks.add_task(run_python_script_directly, wrapper_script_path, batch_job_id)
         
-        return {
+        return FastJSONResponse({
             "message": "Direct batch scrape job started successfully",
             "batchJobId": batch_job_id,
             "status": "in_progress"
-        }
+        })
     except Exception as e:
         logger.error(f"Error triggering direct batch scrape: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to trigger batch scrape: {str(e)}")
@@ -145,15 +180,15 @@ async def get_scrape_jobs(admin = Depends(get_admin_user)):
     """Get all scrape jobs."""
     try:
         # Get individual scrape jobs
-        scrape_jobs = firebase_service.query_collection("scrape_jobs")
+        scrape_jobs = await firebase_service.query_collection("scrape_jobs")
         
         # Get batch scrape jobs
-        batch_jobs = firebase_service.query_collection("scrape_batch_jobs")
+        batch_jobs = await firebase_service.query_collection("scrape_batch_jobs")
         
-        return {
+        return FastJSONResponse({
             "jobs": scrape_jobs,
             "batchJobs": batch_jobs
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting scrape jobs: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting scrape jobs: {str(e)}")
@@ -162,8 +197,8 @@ async def get_scrape_jobs(admin = Depends(get_admin_user)):
 async def get_applications(admin = Depends(get_admin_user)):
     """Get all applications for admin review."""
     try:
-        applications = firebase_service.query_collection("applications")
-        return {"applications": applications}
+        applications = await firebase_service.query_collection("applications")
+        return FastJSONResponse({"applications": applications})
     except Exception as e:
         logger.error(f"Error getting applications: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting applications: {str(e)}")
@@ -189,15 +224,17 @@ async def update_application_status(
         update_data = {
             "status": status,
             "updatedAt": firestore.SERVER_TIMESTAMP,
+            # Application ETags are derived from updated_at
+            "updated_at": firestore.SERVER_TIMESTAMP,
             "updatedBy": admin.get("uid", "unknown")
         }
         
         if notes:
             update_data["adminNotes"] = notes
         
-        firebase_service.update_document("applications", application_id, update_data)
+        await firebase_service.update_document("applications", application_id, update_data)
         
-        return {"message": f"Application {application_id} updated to {status}"}
+        return FastJSONResponse({"message": f"Application {application_id} updated to {status}"})
     except Exception as e:
         logger.error(f"Error updating application {application_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error updating application: {str(e)}")
@@ -227,11 +264,11 @@ def run_scraper_script(script_path: str, batch_job_id: str):
         
         if setup_process.returncode != 0:
             logger.error(f"Firebase setup failed: {setup_stderr}")
-            firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+            firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
                 "status": "failed",
                 "error": f"Firebase setup failed: {setup_stderr}",
                 "completedAt": firestore.SERVER_TIMESTAMP
-            })
+            }, critical=False)
             return
             
         logger.info(f"Firebase setup completed: {setup_stdout}")
@@ -258,30 +295,30 @@ def run_scraper_script(script_path: str, batch_job_id: str):
         # Update the batch job record based on exit code
         if process.returncode == 0:
             # Script ran successfully
-            firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+            firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
                 "status": "completed",
                 "completedAt": firestore.SERVER_TIMESTAMP,
                 "executionTimeSeconds": end_time - start_time
-            })
+            }, critical=False)
             logger.info(f"Batch scrape job {batch_job_id} completed successfully")
         else:
             # Script failed
-            firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+            firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
                 "status": "failed",
                 "error": stderr if stderr else "Unknown error",
                 "completedAt": firestore.SERVER_TIMESTAMP,
                 "executionTimeSeconds": end_time - start_time
-            })
+            }, critical=False)
             logger.error(f"Batch scrape job {batch_job_id} failed with exit code {process.returncode}")
     except Exception as e:
         logger.error(f"Error in batch scrape job {batch_job_id}: {e}")
         
         # Update the batch job record with error
-        firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+        firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
             "status": "failed",
             "error": str(e),
             "completedAt": firestore.SERVER_TIMESTAMP
-        })
+        }, critical=False)
 
 def run_python_script_directly(script_path: str, batch_job_id: str):
     """Run the Python script directly using the system's Python interpreter."""
@@ -322,28 +359,28 @@ def run_python_script_directly(script_path: str, batch_job_id: str):
         # Update the batch job record based on exit code
         if process.returncode == 0:
             # Script ran successfully
-            firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+            firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
                 "status": "completed",
                 "completedAt": firestore.SERVER_TIMESTAMP,
                 "executionTimeSeconds": end_time - start_time,
                 "output": stdout[:500] if stdout else "No output"
-            })
+            }, critical=False)
             logger.info(f"Direct Python execution for batch job {batch_job_id} completed successfully")
         else:
             # Script failed
-            firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+            firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
                 "status": "failed",
                 "error": stderr if stderr else "Unknown error",
                 "completedAt": firestore.SERVER_TIMESTAMP,
                 "executionTimeSeconds": end_time - start_time
-            })
+            }, critical=False)
             logger.error(f"Direct Python execution for batch job {batch_job_id} failed with exit code {process.returncode}")
     except Exception as e:
         logger.error(f"Error in direct Python execution for batch job {batch_job_id}: {e}")
         
         # Update the batch job record with error
-        firebase_service.update_document("scrape_batch_jobs", batch_job_id, {
+        firebase_service.sync.update_document("scrape_batch_jobs", batch_job_id, {
             "status": "failed",
             "error": str(e),
             "completedAt": firestore.SERVER_TIMESTAMP
-        }) 
\ No newline at end of file
+        }, critical=False) 
\ No newline at end of file
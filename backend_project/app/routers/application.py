@@ -1,15 +1,34 @@
 # app/routers/application.py
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request
 from typing import List, Optional
-from app.services.firebase_service import FirebaseService
+from datetime import datetime
+from app.services.async_firebase_service import AsyncFirebaseService
 from app.models.application import ApplicationCreate, ApplicationUpdate, ApplicationResponse, ApplicationStatus
 from app.utils.auth_middleware import get_current_user
+from app.utils.responses import version_etag, not_modified, model_response
 import logging
 
 router = APIRouter()
-firebase_service = FirebaseService()
+firebase_service = AsyncFirebaseService()
 logger = logging.getLogger(__name__)
 
+# Applications are per-user: clients may keep them but must revalidate every use
+CACHE_CONTROL = "private, no-cache"
+
+def _applications_etag(applications, *scope):
+    """
+    ETag of a set of applications, from their IDs and updated_at stamps (every
+    write sets updated_at), so it is known before any response is built.
+    None if an application predates the stamp.
+    """
+    versions = []
+    for application in applications:
+        updated_at = application.get("updated_at")
+        if not isinstance(updated_at, datetime):
+            return None
+        versions += [application["id"], updated_at]
+    return version_etag(*scope, *versions)
+
 @router.post("/", response_model=ApplicationResponse, status_code=201)
 async def create_application(
     application: ApplicationCreate, 
@@ -17,7 +36,7 @@ async def create_application(
 ):
     """Create a new university application."""
     # Get university name for reference
-    university = firebase_service.get_document("universities", application.university_id)
+    university = await firebase_service.get_document("universities", application.university_id)
     if not university:
         raise HTTPException(status_code=404, detail="University not found")
     
@@ -31,42 +50,51 @@ async def create_application(
     
     # Create application in Firestore
     try:
-        app_id = firebase_service.create_document("applications", application_data)
+        app_id = await firebase_service.create_document("applications", application_data)
         # Add ID to the response
         application_data["id"] = app_id
-        return application_data
+        return model_response(ApplicationResponse, application_data, status_code=201)
     except Exception as e:
         logger.error(f"Error creating application: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create application")
 
 @router.get("/", response_model=List[ApplicationResponse])
 async def get_my_applications(
+    request: Request,
     user = Depends(get_current_user),
     status: Optional[ApplicationStatus] = Query(None, description="Filter by application status")
 ):
     """Get all applications for the current user."""
     try:
         # First get applications by user ID
-        applications = firebase_service.find_document("applications", "user_id", "==", user.get("uid"))
+        applications = await firebase_service.find_document("applications", "user_id", "==", user.get("uid"))
         
         # Apply status filter if provided
         if status:
             applications = [app for app in applications if app.get("status") == status]
         
-        return applications
+        headers = {"cache-control": CACHE_CONTROL}
+        etag = _applications_etag(applications, user.get("uid"), status)
+        if etag:
+            unchanged = not_modified(request, etag, CACHE_CONTROL)
+            if unchanged:
+                return unchanged
+            headers["etag"] = etag
+        return model_response(ApplicationResponse, applications, headers=headers)
     except Exception as e:
         logger.error(f"Error fetching applications: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve applications")
 
 @router.get("/{application_id}", response_model=ApplicationResponse)
 async def get_application(
+    request: Request,
     application_id: str = Path(..., description="The ID of the application to retrieve"),
     user = Depends(get_current_user)
 ):
     """Get a specific application by ID."""
     try:
         # Get the application
-        application = firebase_service.get_document("applications", application_id)
+        application = await firebase_service.get_document("applications", application_id)
         if not application:
             raise HTTPException(status_code=404, detail="Application not found")
         
@@ -74,9 +102,16 @@ async def get_application(
         if application.get("user_id") != user.get("uid"):
             raise HTTPException(status_code=403, detail="You do not have permission to access this application")
         
-        # Add ID to the response
-        application["id"] = application_id
-        return application
+        # Add ID to the response (the cached document is read-only)
+        application = {**application, "id": application_id}
+        headers = {"cache-control": CACHE_CONTROL}
+        etag = _applications_etag([application])
+        if etag:
+            unchanged = not_modified(request, etag, CACHE_CONTROL)
+            if unchanged:
+                return unchanged
+            headers["etag"] = etag
+        return model_response(ApplicationResponse, application, headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -92,7 +127,7 @@ async def update_application(
     """Update an existing application."""
     try:
         # Get the application
-        existing_app = firebase_service.get_document("applications", application_id)
+        existing_app = await firebase_service.get_document("applications", application_id)
         if not existing_app:
             raise HTTPException(status_code=404, detail="Application not found")
         
@@ -105,12 +140,11 @@ async def update_application(
         update_data["updated_at"] = firebase_service.get_server_timestamp()
         
         # Update the application
-        firebase_service.update_document("applications", application_id, update_data)
+        await firebase_service.update_document("applications", application_id, update_data)
         
         # Get the updated application
-        updated_app = firebase_service.get_document("applications", application_id)
-        updated_app["id"] = application_id
-        return updated_app
+        updated_app = await firebase_service.get_document("applications", application_id)
+        return model_response(ApplicationResponse, {**updated_app, "id": application_id})
     except HTTPException:
         raise
     except Exception as e:
@@ -125,7 +159,7 @@ async def delete_application(
     """Delete an application."""
     try:
         # Get the application
-        application = firebase_service.get_document("applications", application_id)
+        application = await firebase_service.get_document("applications", application_id)
         if not application:
             raise HTTPException(status_code=404, detail="Application not found")
         
@@ -134,7 +168,7 @@ async def delete_application(
             raise HTTPException(status_code=403, detail="You do not have permission to delete this application")
         
         # Delete the application
-        firebase_service.delete_document("applications", application_id)
+        await firebase_service.delete_document("applications", application_id)
         return None
     except HTTPException:
         raise
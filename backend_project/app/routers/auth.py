@@ -3,11 +3,12 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from firebase_admin import auth as firebase_auth
-from app.services.firebase_service import FirebaseService
+from app.services.async_firebase_service import AsyncFirebaseService
 from app.utils.auth_middleware import get_current_user, FirebaseAuthMiddleware
+from app.utils.responses import model_response, FastJSONResponse
 
 router = APIRouter()
-firebase_service = FirebaseService()
+firebase_service = AsyncFirebaseService()
 firebase_auth_middleware = FirebaseAuthMiddleware()
 
 class RegisterRequest(BaseModel):
@@ -44,19 +45,19 @@ async def register(req: RegisterRequest):
             "role": "user",  # Default role
             "created_at": firebase_service.get_server_timestamp()
         }
-        firebase_service.create_document("users", user_data, user.uid)
+        await firebase_service.create_document("users", user_data, user.uid)
         
         # Create custom token for initial login
         token = firebase_auth.create_custom_token(user.uid)
         
         # Return user info and token
-        return {
+        return model_response(LoginResponse, {
             "uid": user.uid,
             "email": user.email,
             "display_name": user.display_name,
             "role": "user",
             "token": token.decode('utf-8')
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Registration failed: {str(e)}")
 
@@ -81,7 +82,7 @@ async def get_current_user_info(user = Depends(get_current_user)):
     """Get information about the currently authenticated user."""
     uid = user.get("uid")
     # Get user data from Firestore
-    user_data = firebase_service.get_document("users", uid)
+    user_data = await firebase_service.get_document("users", uid)
     if not user_data:
         # If user data doesn't exist in Firestore, get it from Auth
         try:
@@ -93,14 +94,14 @@ async def get_current_user_info(user = Depends(get_current_user)):
                 "role": "user",  # Default role
                 "created_at": firebase_service.get_server_timestamp()
             }
-            firebase_service.create_document("users", user_data, uid)
+            await firebase_service.create_document("users", user_data, uid)
         except Exception as e:
             raise HTTPException(status_code=404, detail=f"User not found: {str(e)}")
     
     # Return user info
-    return {
+    return FastJSONResponse({
         "uid": uid,
         "email": user_data.get("email"),
         "display_name": user_data.get("display_name"),
         "role": user_data.get("role", "user")
-    }
+    })
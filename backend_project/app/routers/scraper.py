@@ -2,14 +2,15 @@
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from app.services.scraper_service import scrape_all_universities
 from app.services.qau_scraper import scrape_qau_university, store_qau_in_firestore
-from app.services.firebase_service import FirebaseService
+from app.services.async_firebase_service import AsyncFirebaseService
 from app.utils.auth_middleware import get_admin_user
+from app.utils.responses import FastJSONResponse
 from firebase_admin import firestore
 import time
 import logging
 
 router = APIRouter()
-firebase_service = FirebaseService()
+firebase_service = AsyncFirebaseService()
 logger = logging.getLogger(__name__)
 
 @router.post("/")
@@ -31,12 +32,12 @@ async def trigger_scraper(
         "triggered_by": admin.get("uid")
     }
     
-    firebase_service.create_document("scrape_tasks", task_data, task_id)
+    await firebase_service.create_document("scrape_tasks", task_data, task_id)
     
     # Run the scraping process in the background
     background_tasks.add_task(run_scraper, task_id)
     
-    return {"message": "Scraping task started", "task_id": task_id}
+    return FastJSONResponse({"message": "Scraping task started", "task_id": task_id})
 
 @router.get("/{task_id}")
 async def get_scrape_task_status(
@@ -44,18 +45,18 @@ async def get_scrape_task_status(
     admin = Depends(get_admin_user)  # Only admins can check task status
 ):
     """Get the status of a scraping task."""
-    task = firebase_service.get_document("scrape_tasks", task_id)
+    task = await firebase_service.get_document("scrape_tasks", task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Scrape task not found")
-    return task
+    return FastJSONResponse(task)
 
 @router.get("/")
 async def get_all_scrape_tasks(
     admin = Depends(get_admin_user)  # Only admins can get all tasks
 ):
     """Get all scraping tasks."""
-    tasks = firebase_service.query_collection("scrape_tasks")
-    return {"tasks": tasks}
+    tasks = await firebase_service.query_collection("scrape_tasks")
+    return FastJSONResponse({"tasks": tasks})
 
 def run_scraper(task_id: str):
     """Run the scraper and update the task status."""
@@ -66,19 +67,19 @@ def run_scraper(task_id: str):
         end_time = time.time()
         
         # Update the task status to completed
-        firebase_service.update_document("scrape_tasks", task_id, {
+        firebase_service.sync.update_document("scrape_tasks", task_id, {
             "status": "completed",
             "completed_at": firestore.SERVER_TIMESTAMP,
             "universities_scraped": len(universities),
             "execution_time_seconds": end_time - start_time
-        })
+        }, critical=False)
     except Exception as e:
         # Update the task status to failed
-        firebase_service.update_document("scrape_tasks", task_id, {
+        firebase_service.sync.update_document("scrape_tasks", task_id, {
             "status": "failed",
             "error": str(e),
             "completed_at": firestore.SERVER_TIMESTAMP
-        }) 
+        }, critical=False) 
 
 @router.post("/qau")
 async def trigger_qau_scraper(
@@ -99,12 +100,12 @@ async def trigger_qau_scraper(
         "university": "Quaid-i-Azam University (QAU)"
     }
     
-    firebase_service.create_document("scrape_tasks", task_data, task_id)
+    await firebase_service.create_document("scrape_tasks", task_data, task_id)
     
     # Run the QAU scraping process in the background
     background_tasks.add_task(run_qau_scraper, task_id)
     
-    return {"message": "QAU scraping task started", "task_id": task_id}
+    return FastJSONResponse({"message": "QAU scraping task started", "task_id": task_id})
 
 def run_qau_scraper(task_id: str):
     """Run the QAU scraper and update the task status."""
@@ -120,29 +121,29 @@ def run_qau_scraper(task_id: str):
             
             # Update task status
             end_time = time.time()
-            firebase_service.update_document("scrape_tasks", task_id, {
+            firebase_service.sync.update_document("scrape_tasks", task_id, {
                 "status": "completed",
                 "completed_at": firestore.SERVER_TIMESTAMP,
                 "universities_scraped": 1,
                 "execution_time_seconds": end_time - start_time,
                 "university_id": doc_id
-            })
+            }, critical=False)
             logger.info(f"QAU scraper task {task_id} completed successfully")
         else:
             # Update task status to failed
-            firebase_service.update_document("scrape_tasks", task_id, {
+            firebase_service.sync.update_document("scrape_tasks", task_id, {
                 "status": "failed",
                 "error": "Failed to scrape QAU data",
                 "completed_at": firestore.SERVER_TIMESTAMP
-            })
+            }, critical=False)
             logger.error(f"QAU scraper task {task_id} failed to retrieve data")
     except Exception as e:
         # Update the task status to failed
-        firebase_service.update_document("scrape_tasks", task_id, {
+        firebase_service.sync.update_document("scrape_tasks", task_id, {
             "status": "failed",
             "error": str(e),
             "completed_at": firestore.SERVER_TIMESTAMP
-        })
+        }, critical=False)
         logger.error(f"Error in QAU scraper task {task_id}: {e}")
 
 # Add a new public endpoint with no auth middleware
@@ -165,9 +166,9 @@ async def trigger_qau_scraper_direct(
         "university": "Quaid-i-Azam University (QAU)"
     }
     
-    firebase_service.create_document("scrape_tasks", task_data, task_id)
+    await firebase_service.create_document("scrape_tasks", task_data, task_id)
     
     # Run the QAU scraping process in the background
     background_tasks.add_task(run_qau_scraper, task_id)
     
-    return {"message": "QAU scraping task started", "task_id": task_id}
\ No newline at end of file
+    return FastJSONResponse({"message": "QAU scraping task started", "task_id": task_id})
\ No newline at end of file
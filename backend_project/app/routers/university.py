@@ -1,139 +1,108 @@
 # app/routers/university.py
-from fastapi import APIRouter, HTTPException, Body, Query, Depends, status
+from fastapi import APIRouter, HTTPException, Body, Query, Depends, Request, status
 from typing import Optional, List, Dict, Any
-from app.services.firebase_service import FirebaseService
+from app.services.async_firebase_service import AsyncFirebaseService
 from app.models.university import UniversityData, UniversityFilter
 from app.utils.auth import get_current_user, get_admin_user, User
+from app.utils.responses import FastJSONResponse
+from app.utils.response_cache import response_cache
+from app.services.deadline_index import deadline_index
+from app.services.pagination import ordered
+from app.utils.deadlines import with_deadline_iso
 import logging
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-firebase_service = FirebaseService()
+firebase_service = AsyncFirebaseService()
 
 # ========== NON-PARAMETERIZED ROUTES (MUST COME FIRST) ==========
 
 @router.get("/", status_code=status.HTTP_200_OK)
 async def get_universities(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),  # Reduced maximum limit from 100 to 50
     deadlineWithin: Optional[int] = Query(None, description="Filter universities with deadlines within X days"),
     sort: Optional[str] = Query(None, description="Sort by field (e.g., 'deadline')"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user: Optional[User] = Depends(get_current_user)
 ):
-    """Get all universities with pagination."""
+    """
+    Get all universities with pagination.
+    
+    Without deadline filtering or sorting, pages are read with a Firestore
+    cursor (about `limit` reads per page); pass the returned next_cursor to get
+    the following page. Filtered or sorted listings, and pages requested by
+    number without a cursor, are paged in memory. Both are in document ID
+    order (then by deadline when sorting), so cursor and page-number walks
+    see the same pages. Encoded pages are cached until the catalog changes.
+    """
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
     try:
         if limit > 25:
             logger.warning(f"Large page size requested ({limit}). This may hit Firebase quota limits.")
             
-        # Try to use cached data first
-        universities = firebase_service.get_all_documents("universities")
+        # Keyset pagination when nothing has to be computed over the whole catalog
+        if deadlineWithin is None and not sort and (cursor or page == 1):
+            try:
+                result = await firebase_service.get_page("universities", limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            total = result["total"]
+            if total is None:
+                # Aggregation count: one read per 1000 universities, cached briefly
+                total = await firebase_service.count_documents("universities")
+            return response_cache.store(key, {
+                "universities": result["items"],
+                "next_cursor": result["next_cursor"],
+                "total": total,
+                "page": page,
+                "limit": limit,
+                "pages": (total + limit - 1) // limit
+            }, request)
+            
+        # Try to use cached data first; in the keyset listing's (ID) order
+        universities = ordered(await firebase_service.get_all_documents("universities"))
+        
+        # Deadlines are parsed once per catalog version into a sorted index
+        by_deadline = bool(sort) and sort.lower() == 'deadline'
+        if deadlineWithin is not None or by_deadline:
+            index = deadline_index(universities)
         
         # Filter by deadline if requested
         if deadlineWithin is not None:
             try:
                 today = datetime.now()
                 max_date = today + timedelta(days=deadlineWithin)
-                
-                # Filter universities with deadlines within the specified period
-                filtered_unis = []
-                for uni in universities:
-                    # Get deadline from direct property or from basic_info
-                    deadline = uni.get("deadline")
-                    if not deadline and "basic_info" in uni:
-                        deadline = uni["basic_info"].get("Deadline to Apply")
-                    
-                    # Skip if no deadline found
-                    if not deadline:
-                        continue
-                    
-                    # Try to parse the deadline
-                    try:
-                        # Convert string deadline to datetime
-                        deadline_date = None
-                        if isinstance(deadline, str):
-                            # Handle different date formats
-                            formats_to_try = [
-                                "%Y-%m-%d",  # ISO format
-                                "%d-%m-%Y",  # DD-MM-YYYY
-                                "%d %b %Y",  # DD Mon YYYY
-                            ]
-                            
-                            for fmt in formats_to_try:
-                                try:
-                                    deadline_date = datetime.strptime(deadline, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                            
-                            # If no format matched, try parsing as ISO
-                            if not deadline_date:
-                                deadline_date = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
-                        
-                        # Check if deadline is within range
-                        if deadline_date and deadline_date >= today and deadline_date <= max_date:
-                            filtered_unis.append(uni)
-                    except Exception as parse_error:
-                        logger.warning(f"Could not parse deadline '{deadline}' for university {uni.get('name')}: {str(parse_error)}")
-                
-                universities = filtered_unis
-                
+                universities = index.within(today, max_date, by_deadline=by_deadline)
             except Exception as filter_error:
                 logger.error(f"Error filtering by deadline: {str(filter_error)}")
                 # Don't apply the filter if there's an error
-        
-        # Sort if requested
-        if sort:
-            try:
-                if sort.lower() == 'deadline':
-                    # Create a helper function to get deadline from university data
-                    def get_deadline_date(uni):
-                        deadline = uni.get("deadline")
-                        if not deadline and "basic_info" in uni:
-                            deadline = uni["basic_info"].get("Deadline to Apply")
-                        
-                        if not deadline:
-                            # Return a far future date for universities without deadlines
-                            return datetime.max
-                        
-                        try:
-                            # Try different date formats
-                            formats_to_try = [
-                                "%Y-%m-%d",
-                                "%d-%m-%Y",
-                                "%d %b %Y",
-                            ]
-                            
-                            for fmt in formats_to_try:
-                                try:
-                                    return datetime.strptime(deadline, fmt)
-                                except ValueError:
-                                    continue
-                            
-                            # Last resort - try ISO format
-                            return datetime.fromisoformat(deadline.replace('Z', '+00:00'))
-                        except:
-                            # Return max date on error
-                            return datetime.max
-                    
-                    # Sort by deadline (ascending)
-                    universities = sorted(universities, key=get_deadline_date)
-            except Exception as sort_error:
-                logger.error(f"Error sorting: {str(sort_error)}")
-                # Don't sort if there's an error
+                if by_deadline:
+                    universities = index.ordered()
+        elif by_deadline:
+            # Sort by deadline (ascending), universities without one last
+            universities = index.ordered()
         
         # Basic pagination
         start_idx = (page - 1) * limit
         end_idx = start_idx + limit
         paginated = universities[start_idx:end_idx] if universities else []
         
-        return {
+        return response_cache.store(key, {
             "universities": paginated,
+            "next_cursor": None,
             "total": len(universities),
             "page": page,
             "limit": limit,
             "pages": (len(universities) + limit - 1) // limit  # Ceiling division
-        }
+        }, request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching universities: {str(e)}")
         raise HTTPException(
@@ -148,7 +117,7 @@ async def create_or_update_university(
 ):
     """Create or update a university document."""
     # Check if university with same name already exists
-    existing_unis = firebase_service.find_document("universities", "name", "==", university.name)
+    existing_unis = await firebase_service.find_document("universities", "name", "==", university.name)
     
     # Convert Pydantic model to dict
     uni_data = university.model_dump()
@@ -157,22 +126,27 @@ async def create_or_update_university(
     from firebase_admin import firestore
     uni_data["updated_at"] = firestore.SERVER_TIMESTAMP
     uni_data["updated_by"] = user.get("uid")
+    with_deadline_iso(uni_data)
     
     if existing_unis:
         # Update existing university
         doc_id = existing_unis[0]["id"]
-        firebase_service.update_document("universities", doc_id, uni_data)
-        return {"message": "University updated successfully", "id": doc_id}
+        await firebase_service.update_document("universities", doc_id, uni_data)
+        return FastJSONResponse({"message": "University updated successfully", "id": doc_id}, status_code=201)
     else:
         # Create new university
-        doc_id = firebase_service.create_document("universities", uni_data)
-        return {"message": "University created successfully", "id": doc_id}
+        doc_id = await firebase_service.create_document("universities", uni_data)
+        return FastJSONResponse({"message": "University created successfully", "id": doc_id}, status_code=201)
 
 @router.get("/programs", status_code=status.HTTP_200_OK)
-async def get_programs():
+async def get_programs(request: Request):
     """Get all available programs across universities."""
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
     try:
-        universities = firebase_service.get_all_documents("universities")
+        universities = await firebase_service.get_all_documents("universities", fields=["programs"])
         logger.info(f"Fetched {len(universities)} universities for programs")
         
         # Extract all unique programs
@@ -205,11 +179,11 @@ async def get_programs():
         
         result = sorted(list(all_programs))
         logger.info(f"Successfully extracted {len(result)} unique programs")
-        return result
+        return response_cache.store(key, result, request)
     except Exception as e:
         logger.error(f"Error fetching programs: {str(e)}")
         # Return default programs as fallback
-        return [
+        return FastJSONResponse([
             "Computer Science", 
             "Engineering",
             "Business Administration",
@@ -218,13 +192,17 @@ async def get_programs():
             "Arts & Humanities",
             "Social Sciences",
             "Natural Sciences"
-        ]
+        ])
 
 @router.get("/locations", status_code=status.HTTP_200_OK)
-async def get_locations():
+async def get_locations(request: Request):
     """Get all available university locations."""
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
     try:
-        universities = firebase_service.get_all_documents("universities")
+        universities = await firebase_service.get_all_documents("universities", fields=["basic_info.Location"])
         
         # Extract all unique locations
         locations = set()
@@ -234,18 +212,18 @@ async def get_locations():
                 # Clean and normalize location
                 locations.add(location.strip())
         
-        return sorted(list(locations))
+        return response_cache.store(key, sorted(list(locations)), request)
     except Exception as e:
         logger.error(f"Error fetching locations: {str(e)}")
         # Return default locations as fallback
-        return [
+        return FastJSONResponse([
             "Islamabad",
             "Lahore",
             "Karachi",
             "Peshawar",
             "Quetta",
             "Faisalabad"
-        ]
+        ])
 
 @router.post("/search", status_code=status.HTTP_200_OK)
 async def search_universities(
@@ -256,7 +234,7 @@ async def search_universities(
     Advanced search for universities with multiple criteria.
     """
     try:
-        universities = firebase_service.get_all_documents("universities")
+        universities = await firebase_service.get_all_documents("universities")
         
         # Extract search criteria
         query = search_data.get("query", "").lower()
@@ -274,7 +252,7 @@ async def search_universities(
             
             filtered.append(uni)
         
-        return filtered
+        return FastJSONResponse(filtered)
     except Exception as e:
         logger.error(f"Error searching universities: {str(e)}")
         raise HTTPException(
@@ -282,24 +260,70 @@ async def search_universities(
             detail="Error searching universities"
         )
 
+@router.get("/batch", status_code=status.HTTP_200_OK)
+async def get_universities_batch(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated university IDs (max 50)"),
+    current_user: Optional[User] = Depends(get_current_user)
+):
+    """Get several universities by ID in a single request (e.g. for comparison views)."""
+    university_ids = [uid.strip() for uid in ids.split(",") if uid.strip()]
+    if not university_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one university ID is required"
+        )
+    if len(university_ids) > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A maximum of 50 university IDs can be requested at once"
+        )
+
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    try:
+        documents = await firebase_service.get_documents("universities", university_ids)
+
+        universities = []
+        missing = []
+        for university_id, university in documents.items():
+            if university:
+                universities.append({**university, "id": university_id})
+            else:
+                missing.append(university_id)
+
+        return response_cache.store(key, {"universities": universities, "missing": missing}, request)
+    except Exception as e:
+        logger.error(f"Error fetching universities batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch universities"
+        )
+
 # ========== PARAMETERIZED ROUTES (MUST COME AFTER) ==========
 
 @router.get("/{university_id}", status_code=status.HTTP_200_OK)
 async def get_university(
+    request: Request,
     university_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Get details for a specific university."""
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
     try:
-        university = firebase_service.get_document("universities", university_id)
+        university = await firebase_service.get_document("universities", university_id)
         if not university:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"University with ID {university_id} not found"
             )
-        # Add ID to the response
-        university["id"] = university_id
-        return university
+        # Add ID to the response (the cached document is read-only)
+        return response_cache.store(key, {**university, "id": university_id}, request)
     except HTTPException:
         raise
     except Exception as e:
@@ -316,24 +340,29 @@ async def delete_university(
 ):
     """Delete a university document."""
     # Check if university exists
-    uni = firebase_service.get_document("universities", univ_id)
+    uni = await firebase_service.get_document("universities", univ_id)
     if not uni:
         raise HTTPException(status_code=404, detail="University not found")
     
     # Delete the university
-    firebase_service.delete_document("universities", univ_id)
-    return {"message": "University deleted successfully"}
+    await firebase_service.delete_document("universities", univ_id)
+    return FastJSONResponse({"message": "University deleted successfully"})
 
 # New endpoints for university-specific data
 
 @router.get("/{university_id}/programs", status_code=status.HTTP_200_OK)
 async def get_university_programs(
+    request: Request,
     university_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Get programs for a specific university."""
+    cache_key = response_cache.key(request, "universities")
+    cached = response_cache.get(cache_key, request)
+    if cached is not None:
+        return cached
     try:
-        university = firebase_service.get_document("universities", university_id)
+        university = await firebase_service.get_document("universities", university_id)
         if not university:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -358,22 +387,27 @@ async def get_university_programs(
                     "id": f"{category.lower()}-{program_name.lower().replace(' ', '-')}"
                 })
         
-        return {"programs": programs}
+        return response_cache.store(cache_key, {"programs": programs}, request)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching programs for university {university_id}: {str(e)}")
         # Return empty array as fallback
-        return {"programs": []}
+        return FastJSONResponse({"programs": []})
 
 @router.get("/{university_id}/admissions", status_code=status.HTTP_200_OK)
 async def get_university_admissions(
+    request: Request,
     university_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Get admissions information for a specific university."""
+    cache_key = response_cache.key(request, "universities")
+    cached = response_cache.get(cache_key, request)
+    if cached is not None:
+        return cached
     try:
-        university = firebase_service.get_document("universities", university_id)
+        university = await firebase_service.get_document("universities", university_id)
         if not university:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -404,22 +438,27 @@ async def get_university_admissions(
                         "details": value
                     })
         
-        return {"admissions": admissions}
+        return response_cache.store(cache_key, {"admissions": admissions}, request)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching admissions for university {university_id}: {str(e)}")
         # Return empty array as fallback
-        return {"admissions": []}
+        return FastJSONResponse({"admissions": []})
 
 @router.get("/{university_id}/scholarships", status_code=status.HTTP_200_OK)
 async def get_university_scholarships(
+    request: Request,
     university_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Get scholarship information for a specific university."""
+    cache_key = response_cache.key(request, "universities")
+    cached = response_cache.get(cache_key, request)
+    if cached is not None:
+        return cached
     try:
-        university = firebase_service.get_document("universities", university_id)
+        university = await firebase_service.get_document("universities", university_id)
         if not university:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -432,7 +471,7 @@ async def get_university_scholarships(
         
         # If scholarships is already an array, use it directly
         if isinstance(scholarships_data, list):
-            scholarships = scholarships_data
+            scholarships = list(scholarships_data)
         # If scholarships is a dictionary, convert to array
         elif isinstance(scholarships_data, dict):
             for name, details in scholarships_data.items():
@@ -455,22 +494,27 @@ async def get_university_scholarships(
                         "details": value
                     })
         
-        return {"scholarships": scholarships}
+        return response_cache.store(cache_key, {"scholarships": scholarships}, request)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching scholarships for university {university_id}: {str(e)}")
         # Return empty array as fallback
-        return {"scholarships": []}
+        return FastJSONResponse({"scholarships": []})
 
 @router.get("/{university_id}/facilities", status_code=status.HTTP_200_OK)
 async def get_university_facilities(
+    request: Request,
     university_id: str,
     current_user: Optional[User] = Depends(get_current_user)
 ):
     """Get facilities information for a specific university."""
+    cache_key = response_cache.key(request, "universities")
+    cached = response_cache.get(cache_key, request)
+    if cached is not None:
+        return cached
     try:
-        university = firebase_service.get_document("universities", university_id)
+        university = await firebase_service.get_document("universities", university_id)
         if not university:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -483,7 +527,7 @@ async def get_university_facilities(
         
         # If facilities is already an array, use it directly
         if isinstance(facilities_data, list):
-            facilities = facilities_data
+            facilities = list(facilities_data)
         # If facilities is a dictionary, convert to array
         elif isinstance(facilities_data, dict):
             for name, details in facilities_data.items():
@@ -506,10 +550,10 @@ async def get_university_facilities(
                         "details": value
                     })
         
-        return {"facilities": facilities}
+        return response_cache.store(cache_key, {"facilities": facilities}, request)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching facilities for university {university_id}: {str(e)}")
         # Return empty array as fallback
-        return {"facilities": []}
+        return FastJSONResponse({"facilities": []})
@@ -7,6 +7,7 @@ import os
 import sys
 import logging
 from app.utils.text_processing import clean_university_name
+from app.services.bulk_writer import BulkWriter
 
 # Setup logging
 logging.basicConfig(
@@ -74,6 +75,7 @@ def clean_university_names():
         # Count for reporting
         total_count = 0
         updated_count = 0
+        operations = []
         
         for uni in universities:
             total_count += 1
@@ -90,8 +92,22 @@ def clean_university_names():
             # Only update if the name has changed
             if cleaned_name != original_name:
                 logger.info(f"Cleaning name: '{original_name}' -> '{cleaned_name}'")
-                universities_ref.document(uni.id).update({"name": cleaned_name})
-                updated_count += 1
+                operations.append({
+                    "type": "update",
+                    "collection": "universities",
+                    "doc_id": uni.id,
+                    # updated_at lets warm-started replicas pick the change up
+                    "data": {"name": cleaned_name, "updated_at": firestore.SERVER_TIMESTAMP}
+                })
+            
+        # Write all renamed universities in parallel batches
+        if operations:
+            results = BulkWriter(db).commit(operations)
+            for result in results:
+                if result["success"]:
+                    updated_count += 1
+                else:
+                    logger.error(f"Failed to update university {result['doc_id']}: {result['error']}")
             
         logger.info(f"Processing complete. Checked {total_count} universities, updated {updated_count} names.")
         
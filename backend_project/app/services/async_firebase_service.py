@@ -0,0 +1,184 @@
+# app/services/async_firebase_service.py
+import os
+import asyncio
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from app.services.catalog_replica import get_replica
+from app.services.firebase_service import FirebaseService, MISS, containing
+
+logger = logging.getLogger(__name__)
+
+# Threads running FirebaseService calls for async routes. They mostly wait on
+# Firestore, so there are more of them than the default executor's
+# min(32, cpus + 4), which would cap the number of requests waiting at once.
+FIRESTORE_IO_THREADS = int(os.getenv("FIRESTORE_IO_THREADS", "64"))
+
+_io_executor = ThreadPoolExecutor(max_workers=FIRESTORE_IO_THREADS, thread_name_prefix="firestore-io")
+
+class AsyncFirebaseService:
+    """
+    Awaitable counterpart of FirebaseService for use in async route handlers.
+
+    Every decision (live replica, cache, stale-while-revalidate, quota
+    degradation, write-through) is made by the wrapped FirebaseService, which
+    stays available as `.sync` for background tasks and scripts. Answers
+    available from memory are returned directly on the event loop; anything
+    that does I/O - Firestore or storage backend reads and writes, retry
+    backoff, and lookups in the shared SQLite cache tier - runs the
+    FirebaseService method on a pool of FIRESTORE_IO_THREADS worker threads,
+    so a request waiting on I/O never blocks the event loop. Concurrent
+    awaits of the same read share one worker thread.
+
+    The Firestore AsyncClient is not used: it would need a second copy of
+    the read, retry and write-through logic, and the local storage backends
+    and the emulator mock have no async client.
+    """
+
+    def __init__(self, sync_service: FirebaseService = None):
+        self.sync = sync_service or FirebaseService()
+        self._flights = self.sync._flights
+        # Cache lookups that can reach the shared tier query SQLite
+        self._shared_tier = self.sync._cache.l2 is not None
+
+    async def _run_sync(self, method: str, *args, **kwargs):
+        """Run a FirebaseService method on the I/O threads (keeping context variables, like asyncio.to_thread)."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(contextvars.copy_context().run, getattr(self.sync, method), *args, **kwargs)
+        return await loop.run_in_executor(_io_executor, call)
+
+    def _cached(self, lookup: str, collection: str, *args):
+        """
+        Run a FirebaseService `_cached_*` lookup on the event loop if it is
+        answered from memory. With a shared cache tier and no live replica it
+        could query SQLite, so MISS is returned and the worker thread running
+        the read does the lookup instead.
+        """
+        if self._shared_tier and get_replica(collection) is None:
+            return MISS
+        return getattr(self.sync, lookup)(collection, *args)
+
+    async def _read(self, collection: str, method: str, *args):
+        """Run a FirebaseService read in a worker thread, once for all concurrent callers with the same arguments."""
+        key = f"{collection}:{method}:{args}"
+        return await self._flights.do_async(key, lambda: self._run_sync(method, collection, *args))
+
+    def get_server_timestamp(self):
+        """Return a server timestamp field value for use in documents."""
+        return self.sync.get_server_timestamp()
+
+    async def create_document(self, collection: str, data: dict, doc_id: str = None, critical: bool = True) -> str:
+        """Create a document in the specified collection. Returns document ID. See FirebaseService.create_document."""
+        return await self._run_sync("create_document", collection, data, doc_id, critical)
+
+    async def get_document(self, collection: str, doc_id: str) -> dict:
+        """Retrieve a document by ID."""
+        cached = self._cached("_cached_document", collection, doc_id)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "get_document", doc_id)
+
+    async def get_documents(self, collection: str, ids: list) -> dict:
+        """Retrieve several documents by ID in one round-trip. See FirebaseService.get_documents."""
+        ids = list(dict.fromkeys(ids))
+        cached = self._cached("_cached_documents", collection, ids)
+        if cached is MISS or cached[1]:
+            return await self._run_sync("get_documents", collection, ids)
+        return {doc_id: cached[0].get(doc_id) for doc_id in ids}
+
+    async def update_document(self, collection: str, doc_id: str, data: dict, critical: bool = True):
+        """Update fields of a document. See FirebaseService.create_document for `critical`."""
+        return await self._run_sync("update_document", collection, doc_id, data, critical)
+
+    async def delete_document(self, collection: str, doc_id: str):
+        """Delete a document."""
+        return await self._run_sync("delete_document", collection, doc_id)
+
+    async def query_collection(self, collection: str, field: str = None, op: str = None, value=None) -> list:
+        """Query all documents or by a field filter."""
+        cached = self._cached("_cached_query", collection, "query", field, op, value)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "query_collection", field, op, value)
+
+    async def find_document(self, collection: str, field: str, op: str, value) -> list:
+        """Find documents with a field matching a value, returning dicts with 'id' included."""
+        cached = self._cached("_cached_query", collection, "find", field, op, value)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "find_document", field, op, value)
+
+    async def query_collection_with_ids(self, collection: str, field: str = None, op: str = None, value=None) -> list:
+        """Query documents and include document IDs in the results."""
+        cached = self._cached("_cached_query", collection, "query_with_ids", field, op, value)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "query_collection_with_ids", field, op, value)
+
+    async def get_all_documents(self, collection: str, fields: list = None) -> list:
+        """
+        Get all documents from a collection with their IDs
+
+        Args:
+            collection: Collection name
+            fields: Optional field paths to fetch; see FirebaseService.get_all_documents
+
+        Returns:
+            List of documents with their IDs
+        """
+        cached = self._cached("_cached_all_documents", collection, fields)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "get_all_documents", fields)
+
+    async def get_page(self, collection: str, limit: int, cursor: str = None, order_by: str = None) -> dict:
+        """Get one page of a collection with keyset pagination. See FirebaseService.get_page."""
+        cached = self._cached("_cached_page", collection, limit, cursor, order_by)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "get_page", limit, cursor, order_by)
+
+    async def count_documents(self, collection: str, filters: list = None) -> int:
+        """Count documents with a Firestore aggregation query. See FirebaseService.count_documents."""
+        filters = [tuple(f) for f in filters or []]
+        cached = self._cached("_cached_count", collection, filters)
+        if cached is not MISS:
+            return cached
+        return await self._read(collection, "count_documents", filters)
+
+    async def batch_operation(self, operations: list) -> list:
+        """Perform multiple writes in parallel batches. See FirebaseService.batch_operation."""
+        return await self._run_sync("batch_operation", operations)
+
+    async def find_documents_containing(self, collection: str, field: str, value: str) -> list:
+        """Find documents where field contains the value (case insensitive)."""
+        try:
+            return containing(await self.get_all_documents(collection), field, value)
+        except Exception as e:
+            logger.error(f"Error finding documents containing '{value}' in {collection}.{field}: {str(e)}")
+            return []
+
+    async def store_chatbot_feedback(self, message_id: str, user_id: str, is_helpful: bool, feedback_text: str = None):
+        """Store feedback for a chatbot message"""
+        await self._run_sync("store_chatbot_feedback", message_id, user_id, is_helpful, feedback_text)
+
+    async def store_chatbot_query(self, query: str, user_id: str, conversation_id: str = None):
+        """Store a chatbot query for analytics. Returns the document ID."""
+        return await self._run_sync("store_chatbot_query", query, user_id, conversation_id)
+
+    def clear_cache(self, collection: str = None):
+        """Clear the cache for a specific collection or all collections"""
+        self.sync.clear_cache(collection)
+
+    def get_cache_stats(self) -> dict:
+        """Return hit/miss/eviction statistics for the cache."""
+        return self.sync.get_cache_stats()
+
+    def get_single_flight_stats(self) -> dict:
+        """Return how many fetches ran and how many concurrent callers they saved."""
+        return self.sync.get_single_flight_stats()
+
+    def get_quota_status(self) -> dict:
+        """Return the daily Firestore budget usage and degradation state."""
+        return self.sync.get_quota_status()
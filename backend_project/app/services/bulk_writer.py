@@ -0,0 +1,155 @@
+# app/services/bulk_writer.py
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app.services.quota_governor import quota as default_quota, unmetered
+from app.services.retry_policy import RetryPolicy
+from app.services.storage_backend import is_local_backend
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+VALID_OPERATION_TYPES = ("create", "set", "update", "delete")
+
+
+class BulkWriter:
+    """
+    Commits a list of write operations as several Firestore batches.
+
+    Operations use the same dict format as FirebaseService.batch_operation:
+    {"type": "create" | "set" | "update" | "delete", "collection": ..., "doc_id": ..., "data": {...}}
+
+    The operations are split into chunks of at most MAX_BATCH_WRITES writes,
+    chunks are committed concurrently (bounded by max_workers) and only the
+    chunks that fail with a transient error are retried. Each chunk is atomic,
+    so every operation in a failed chunk is reported as failed. If a document
+    is written by more than one chunk, the chunks are committed one after the
+    other instead, so its writes land in the order they were given.
+
+    Commits go through a RetryPolicy like every other Firestore call: capped
+    backoff, the collection's circuit breaker, and quota rejections reported
+    to the quota governor.
+    """
+
+    def __init__(self, db, chunk_size: int = MAX_BATCH_WRITES, max_workers: int = 4,
+                 retry: RetryPolicy = None, quota=None):
+        self.db = db
+        self.chunk_size = max(1, min(chunk_size, MAX_BATCH_WRITES))
+        self.max_workers = max(1, max_workers)
+        self.retry = retry or RetryPolicy()
+        self.quota = quota or (unmetered if is_local_backend(db) else default_quota)
+
+    def _prepare(self, operations: list):
+        """
+        Validate operations and split them into chunks.
+
+        Returns:
+            (results, chunks) where results has one entry per operation and
+            chunks is a list of lists of (index, doc_ref, operation)
+        """
+        results = []
+        valid = []
+        for index, op in enumerate(operations):
+            op_type = op.get("type")
+            collection = op.get("collection")
+            doc_id = op.get("doc_id")
+            result = {
+                "index": index,
+                "type": op_type,
+                "collection": collection,
+                "doc_id": doc_id,
+                "success": False,
+                "error": None,
+            }
+            results.append(result)
+
+            if not collection or op_type not in VALID_OPERATION_TYPES:
+                result["error"] = "Invalid operation: a collection and a valid type are required"
+                continue
+            if op_type in ("update", "delete") and not doc_id:
+                result["error"] = f"Invalid operation: '{op_type}' requires a doc_id"
+                continue
+
+            col_ref = self.db.collection(collection)
+            doc_ref = col_ref.document(doc_id) if doc_id else col_ref.document()
+            # Auto-generated IDs are assigned client-side, so report them
+            result["doc_id"] = doc_ref.id
+            valid.append((index, doc_ref, op))
+
+        chunks = [valid[i:i + self.chunk_size] for i in range(0, len(valid), self.chunk_size)]
+        return results, chunks
+
+    @staticmethod
+    def _spans_chunks(chunks: list) -> bool:
+        """True if some document is written by more than one chunk."""
+        seen = {}
+        for number, chunk in enumerate(chunks):
+            for _, doc_ref, op in chunk:
+                if seen.setdefault((op.get("collection"), doc_ref.id), number) != number:
+                    return True
+        return False
+
+    def _build_batch(self, chunk: list):
+        """Add a chunk's writes to a new batch."""
+        batch = self.db.batch()
+        for _, doc_ref, op in chunk:
+            op_type = op.get("type")
+            if op_type in ("create", "set"):
+                batch.set(doc_ref, op.get("data", {}))
+            elif op_type == "update":
+                batch.update(doc_ref, op.get("data", {}))
+            elif op_type == "delete":
+                batch.delete(doc_ref)
+        return batch
+
+    @staticmethod
+    def _record(results: list, chunk: list, error: Exception = None):
+        for index, _, _ in chunk:
+            results[index]["success"] = error is None
+            results[index]["error"] = str(error) if error is not None else None
+
+    def _commit_chunk(self, chunk: list):
+        """Commit one chunk, retrying transient failures."""
+        collections = {op.get("collection") for _, _, op in chunk}
+        # The breaker of the chunk's collection; mixed chunks aren't tied to one
+        collection = collections.pop() if len(collections) == 1 else None
+        self.retry.run(lambda: self._build_batch(chunk).commit(timeout=self.retry.timeout), collection,
+                       on_quota_error=self.quota.note_exhausted)
+
+    def commit(self, operations: list) -> list:
+        """
+        Commit the operations.
+
+        Returns:
+            One result dict per operation, in order: index, type, collection,
+            doc_id, success and error
+        """
+        results, chunks = self._prepare(operations)
+        if chunks:
+            workers = min(self.max_workers, len(chunks))
+            if self._spans_chunks(chunks):
+                # One worker commits the chunks in the order they were submitted
+                workers = 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self._commit_chunk, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        future.result()
+                        self._record(results, chunk)
+                    except Exception as e:
+                        self._record(results, chunk, e)
+                        logger.error(f"Batch of {len(chunk)} write(s) failed: {str(e)}")
+
+        self._log_summary(results, len(chunks))
+        return results
+
+    @staticmethod
+    def _log_summary(results: list, batches: int):
+        succeeded = sum(1 for result in results if result["success"])
+        if succeeded == len(results):
+            logger.info(f"Committed {succeeded} write(s) in {batches} batch(es)")
+        else:
+            logger.warning(f"Committed {succeeded}/{len(results)} write(s) in {batches} batch(es)")
@@ -0,0 +1,484 @@
+# app/services/cache_service.py
+import os
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from app.services.shared_cache import open_shared_store
+from app.utils.frozen import freeze
+from app.services.catalog_record import COMPACT_COLLECTIONS, compact_cached
+from app.services.collection_versions import versions
+
+logger = logging.getLogger(__name__)
+
+# Default time-to-live (seconds) for collections without an explicit policy
+DEFAULT_TTL = 300
+
+# Per-collection TTL policies. The university catalog changes rarely (scraper runs,
+# admin edits) while applications and scrape task status change constantly.
+COLLECTION_TTLS = {
+    "universities": 1800,
+    "users": 120,
+    "applications": 30,
+    "scrape_tasks": 10,
+    "scrape_jobs": 10,
+    "scrape_batch_jobs": 10,
+}
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "4096"))
+DEFAULT_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # 64MB
+DEFAULT_STRIPES = 16
+
+# How often (seconds) a cache with a shared tier checks for writes made by other workers
+SHARED_SYNC_INTERVAL = 1.0
+
+
+def collection_of(key: str) -> str:
+    """Return the collection part of a cache key ("collection:...")."""
+    return key.split(":", 1)[0]
+
+
+def estimate_size(value) -> int:
+    """Roughly estimate the memory held by a cached value, in bytes."""
+    size = 0
+    stack = [value]
+    seen = set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+class CacheEntry:
+    """
+    A single cached value with its bookkeeping.
+
+    The value is frozen (see app.utils.frozen) so every reader can share it
+    without copying and none of them can modify it in place.
+
+    `meta` describes what the value is so writes can patch it in place, e.g.
+    {"kind": "doc", "id": ...} or {"kind": "list", "with_ids": True, "filter": (field, op, value)}.
+    """
+    __slots__ = ("key", "value", "stored_at", "ttl", "size", "meta")
+
+    def __init__(self, key: str, value, ttl: float, size: int, meta: dict = None):
+        self.key = key
+        self.value = freeze(value)
+        self.stored_at = time.monotonic()
+        self.ttl = ttl
+        self.size = size
+        self.meta = meta
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    @property
+    def expired(self) -> bool:
+        return self.age >= self.ttl
+
+
+class _Stripe:
+    """One lock-protected LRU segment of the cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+
+class CacheService:
+    """
+    Bounded, thread-safe LRU cache with per-collection TTL policies.
+
+    Keys are striped across several independently locked LRU segments so that
+    request threads and the scheduler thread don't contend on a single lock.
+    The total number of entries and the estimated bytes held are bounded
+    globally; when either bound is exceeded the least recently used entries
+    are evicted. Expired entries are kept until evicted so they can still be
+    served as a fallback when Firestore is unavailable.
+
+    Values are stored as read-only FrozenDict/FrozenList structures and
+    handed out without copying; callers build modified copies instead.
+
+    With an `l2` SharedCacheStore, misses are looked up in the store shared
+    by all workers on the host before reporting a miss, stores are written
+    through to it, and entries of collections changed by another worker are
+    dropped from memory (see SharedCacheStore for the generation scheme).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_policies: dict = None, default_ttl: float = DEFAULT_TTL, stripes: int = DEFAULT_STRIPES,
+                 l2=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_policies = dict(COLLECTION_TTLS if ttl_policies is None else ttl_policies)
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        # Global accounting and the collection -> keys index
+        self._totals_lock = threading.Lock()
+        self._entry_count = 0
+        self._bytes = 0
+        self._collection_keys = {}
+        # Serializes read-modify-replace patches of cached entries (see write_through.py)
+        self.write_lock = threading.RLock()
+        # Optional second level shared across processes
+        self.l2 = l2
+        self._sync_lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._generations = l2.generations() if l2 is not None else {}
+
+    def ttl_for(self, collection: str) -> float:
+        """Return the TTL (seconds) configured for a collection."""
+        return self.ttl_policies.get(collection, self.default_ttl)
+
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _account(self, key: str, size_delta: int, count_delta: int):
+        """Update global totals and the collection index (totals lock must not be held)."""
+        with self._totals_lock:
+            self._bytes += size_delta
+            self._entry_count += count_delta
+            collection = collection_of(key)
+            if count_delta > 0:
+                self._collection_keys.setdefault(collection, set()).add(key)
+            elif count_delta < 0:
+                keys = self._collection_keys.get(collection)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._collection_keys[collection]
+
+    def _sync_generations(self):
+        """Drop in-memory entries of collections another worker has changed since we last looked."""
+        if self.l2 is None or time.monotonic() - self._last_sync < SHARED_SYNC_INTERVAL:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = time.monotonic()
+            for collection, generation in self.l2.generations().items():
+                if self._generations.get(collection) != generation:
+                    self._generations[collection] = generation
+                    versions.bump(collection)
+                    dropped = self._drop_local(collection)
+                    if dropped:
+                        logger.debug(f"Dropped {dropped} cached {collection} entries changed by another worker")
+        finally:
+            self._sync_lock.release()
+
+    def _note_generation(self, collection: str, generation: int):
+        """Remember the generation our own write produced so we don't drop our own entries."""
+        if generation is None:
+            return
+        with self._sync_lock:
+            # A gap means another worker wrote too; leave it for _sync_generations to notice
+            if generation == self._generations.get(collection, 0) + 1:
+                self._generations[collection] = generation
+
+    def _promote(self, key: str):
+        """Copy an entry from the shared tier into memory. Returns the CacheEntry or None."""
+        row = self.l2.get(key)
+        if row is None:
+            return None
+        entry = self._entry_from_row(row)
+        self._store(entry)
+        return entry
+
+    def _entry_from_row(self, row) -> CacheEntry:
+        """Build the in-memory entry of a shared-tier row, compacted like set() would."""
+        value = self._compact(row.key, row.value, row.meta)
+        entry = CacheEntry(row.key, value, row.ttl, estimate_size(value), row.meta)
+        entry.stored_at = time.monotonic() - row.age
+        return entry
+
+    def _lookup(self, key: str):
+        """Find an entry in memory, then in the shared tier. Returns (stripe, entry or None)."""
+        self._sync_generations()
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None:
+                stripe.entries.move_to_end(key)
+                return stripe, entry
+        if self.l2 is not None:
+            return stripe, self._promote(key)
+        return stripe, None
+
+    def get_entry(self, key: str):
+        """
+        Return the raw CacheEntry for a key (fresh or expired), or None.
+        Callers decide what to do with an expired entry; serving it should be
+        reported with note_stale_hit().
+        """
+        stripe, entry = self._lookup(key)
+        with stripe.lock:
+            if entry is None:
+                stripe.misses += 1
+            else:
+                stripe.hits += 1
+        return entry
+
+    def note_stale_hit(self, key: str):
+        """Record that an expired value was served for a key."""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            stripe.stale_hits += 1
+
+    def get(self, key: str, allow_stale: bool = False):
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+            allow_stale: Return the value even if its TTL has expired
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        stripe, entry = self._lookup(key)
+        with stripe.lock:
+            if entry is None:
+                stripe.misses += 1
+                return None
+            if entry.expired and not allow_stale:
+                stripe.misses += 1
+                stripe.expirations += 1
+                return None
+            stripe.hits += 1
+            if entry.expired:
+                stripe.stale_hits += 1
+            return entry.value
+
+    def _store(self, entry: CacheEntry):
+        """Insert an entry in memory, evicting least recently used entries if over budget."""
+        stripe = self._stripe(entry.key)
+        with stripe.lock:
+            previous = stripe.entries.pop(entry.key, None)
+            stripe.entries[entry.key] = entry
+        if previous is not None:
+            self._account(entry.key, entry.size - previous.size, 0)
+        else:
+            self._account(entry.key, entry.size, 1)
+        self._evict(protect=entry.key)
+
+    @staticmethod
+    def _compact(key: str, value, meta: dict):
+        """Store documents of catalog collections as compact CatalogRecords."""
+        if collection_of(key) in COMPACT_COLLECTIONS:
+            return compact_cached(value, meta)
+        return value
+
+    def set(self, key: str, value, ttl: float = None, meta: dict = None, bump: bool = False):
+        """
+        Store a value, evicting least recently used entries if over budget.
+
+        With bump=True the value replaces data that was just written (rather
+        than freshly read), so other workers drop their copies of the collection.
+
+        Returns:
+            The stored read-only copy of value; return it to callers instead of
+            value so concurrent readers share one copy
+        """
+        collection = collection_of(key)
+        if ttl is None:
+            ttl = self.ttl_for(collection)
+        value = self._compact(key, value, meta)
+        entry = CacheEntry(key, value, ttl, estimate_size(value), meta)
+        self._store(entry)
+        if self.l2 is not None:
+            generation = self.l2.put(key, collection, entry.value, ttl, meta=meta, bump=bump)
+            if bump:
+                self._note_generation(collection, generation)
+        return entry.value
+
+    def replace(self, key: str, value) -> bool:
+        """
+        Swap the value of an existing entry, keeping its age, TTL and meta.
+        Returns False if the key is no longer cached.
+        """
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+        if entry is None:
+            return False
+        value = self._compact(key, value, entry.meta)
+        size = estimate_size(value)
+        with stripe.lock:
+            if stripe.entries.get(key) is not entry:
+                return False
+            patched = CacheEntry(key, value, entry.ttl, size, entry.meta)
+            patched.stored_at = entry.stored_at
+            stripe.entries[key] = patched
+        self._account(key, size - entry.size, 0)
+        self._evict(protect=key)
+        if self.l2 is not None:
+            collection = collection_of(key)
+            generation = self.l2.put(key, collection, patched.value, entry.ttl, age=patched.age, meta=entry.meta, bump=True)
+            self._note_generation(collection, generation)
+        return True
+
+    def _delete_local(self, key: str) -> bool:
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.pop(key, None)
+        if entry is None:
+            return False
+        self._account(key, -entry.size, -1)
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Remove a key. Returns True if it was present."""
+        removed = self._delete_local(key)
+        if self.l2 is not None:
+            collection = collection_of(key)
+            self._note_generation(collection, self.l2.delete(key, collection))
+        return removed
+
+    def keys_for_collection(self, collection: str) -> list:
+        """Return the cached keys belonging to a collection."""
+        with self._totals_lock:
+            return list(self._collection_keys.get(collection, ()))
+
+    def entries_for_write(self, collection: str, doc_id: str) -> list:
+        """
+        Return the in-memory CacheEntry objects a write to collection/doc_id can
+        affect - the document's own entry and every result (list, projection,
+        page, count) of the collection - without touching LRU order or stats.
+
+        The affected rows only present in the shared tier are dropped from it
+        rather than loaded, and the collection's generation is advanced, so
+        other workers stop serving their copies even if this one holds none.
+        """
+        doc_key = f"{collection}:{doc_id}"
+        entries = []
+        for key in self.keys_for_collection(collection):
+            stripe = self._stripe(key)
+            with stripe.lock:
+                entry = stripe.entries.get(key)
+            if entry is None:
+                continue
+            if key == doc_key or (entry.meta or {}).get("kind") != "doc":
+                entries.append(entry)
+        if self.l2 is not None:
+            generation = self.l2.drop_for_write(collection, doc_key, keep=[entry.key for entry in entries])
+            self._note_generation(collection, generation)
+        return entries
+
+    def _drop_local(self, collection: str) -> int:
+        removed = 0
+        for key in self.keys_for_collection(collection):
+            if self._delete_local(key):
+                removed += 1
+        return removed
+
+    def invalidate_collection(self, collection: str) -> int:
+        """Remove every cached entry of a collection. Returns the number removed."""
+        removed = self._drop_local(collection)
+        if self.l2 is not None:
+            self._note_generation(collection, self.l2.invalidate_collection(collection))
+        return removed
+
+    def clear(self):
+        """Remove every entry."""
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+        with self._totals_lock:
+            self._entry_count = 0
+            self._bytes = 0
+            self._collection_keys.clear()
+        if self.l2 is not None:
+            self.l2.clear()
+            with self._sync_lock:
+                self._generations = self.l2.generations()
+
+    def _over_budget(self) -> bool:
+        with self._totals_lock:
+            return self._entry_count > self.max_entries or self._bytes > self.max_bytes
+
+    def _evict(self, protect: str = None):
+        """Evict LRU entries round-robin across stripes until within budget."""
+        if not self._over_budget():
+            return
+        start = hash(protect) % len(self._stripes) if protect else 0
+        # Bounded number of passes so an oversized single entry can't spin forever
+        for _ in range(self.max_entries + 1):
+            if not self._over_budget():
+                return
+            evicted = False
+            for offset in range(len(self._stripes)):
+                stripe = self._stripes[(start + offset) % len(self._stripes)]
+                with stripe.lock:
+                    victim = None
+                    for key in stripe.entries:
+                        if key != protect:
+                            victim = stripe.entries.pop(key)
+                            stripe.evictions += 1
+                            break
+                if victim is not None:
+                    self._account(victim.key, -victim.size, -1)
+                    evicted = True
+                    if not self._over_budget():
+                        return
+            if not evicted:
+                return
+
+    def stats(self) -> dict:
+        """Return cache statistics."""
+        hits = misses = expirations = evictions = stale_hits = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                hits += stripe.hits
+                misses += stripe.misses
+                expirations += stripe.expirations
+                evictions += stripe.evictions
+                stale_hits += stripe.stale_hits
+        with self._totals_lock:
+            entries = self._entry_count
+            size = self._bytes
+            per_collection = {name: len(keys) for name, keys in self._collection_keys.items()}
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "expirations": expirations,
+            "evictions": evictions,
+            "stale_hits": stale_hits,
+            "collections": per_collection,
+            "shared": self.l2.stats() if self.l2 is not None else None,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> CacheService:
+    """
+    Return the cache shared by every FirebaseService in this process, creating
+    it on first use. It is backed by the host-wide shared tier when
+    SHARED_CACHE_PATH is set.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CacheService(l2=open_shared_store())
+        return _default_cache
@@ -0,0 +1,189 @@
+# app/services/catalog_record.py
+import os
+import sys
+import zlib
+from collections.abc import Mapping
+
+from app.utils.frozen import FrozenDict, FrozenList, freeze
+
+# Collections whose cached and replicated documents are stored as CatalogRecords
+COMPACT_COLLECTIONS = {
+    name.strip() for name in os.getenv("CATALOG_COMPACT_COLLECTIONS", "universities").split(",") if name.strip()
+}
+
+# Descriptions at least this long (characters) are kept zlib-compressed; 0 disables compression
+COMPRESS_MIN_LENGTH = int(os.getenv("CATALOG_COMPRESS_MIN_LENGTH", "512"))
+
+# Strings up to this long are interned; longer ones are unlikely to repeat across records
+INTERN_MAX_LENGTH = 256
+
+# Document fields held in their own slot; anything else goes to `extra`
+FIELDS = ("id", "name", "description", "basic_info", "programs", "apply_link", "url")
+
+
+class _Missing:
+    """Marks a field the document doesn't have (e.g. in a projection)."""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "MISSING"
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class _Compressed(bytes):
+    """A zlib-compressed UTF-8 description."""
+    __slots__ = ()
+
+
+def _compact(value):
+    """Intern short strings and freeze containers, recursively."""
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+    if isinstance(value, dict):
+        return FrozenDict({_compact(k): _compact(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return FrozenList(_compact(v) for v in value)
+    return value
+
+
+def _compress(description):
+    if COMPRESS_MIN_LENGTH and isinstance(description, str) and len(description) >= COMPRESS_MIN_LENGTH:
+        packed = zlib.compress(description.encode("utf-8"), 6)
+        if len(packed) < len(description):
+            return _Compressed(packed)
+    return description
+
+
+def _footprint(value) -> int:
+    """Bytes held by value, not counting interned strings shared with other records."""
+    if isinstance(value, str):
+        return sys.getsizeof(value) if len(value) > INTERN_MAX_LENGTH else 0
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_footprint(v) for v in value.values())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(_footprint(v) for v in value)
+    if value is MISSING or value is None:
+        return 0
+    return sys.getsizeof(value)
+
+
+class CatalogRecord(Mapping):
+    """
+    Compact, read-only form of a catalog document.
+
+    Behaves like the (frozen) dict it was built from - `record["name"]`,
+    `record.get("basic_info", {})`, `{**record, "id": ...}`, iteration and JSON
+    encoding all work - but the well-known fields live in slots, short
+    strings (program names, categories, locations, basic_info keys) are
+    interned so every record shares one copy, and long descriptions are kept
+    zlib-compressed until read.
+    """
+    __slots__ = ("id", "name", "_description", "basic_info", "programs", "apply_link", "url", "_extra")
+
+    def __init__(self, doc: Mapping):
+        values = dict(doc)
+        self.id = _compact(values.pop("id", MISSING))
+        self.name = _compact(values.pop("name", MISSING))
+        self._description = _compress(values.pop("description", MISSING))
+        self.basic_info = _compact(values.pop("basic_info", MISSING))
+        self.programs = _compact(values.pop("programs", MISSING))
+        self.apply_link = values.pop("apply_link", MISSING)
+        self.url = values.pop("url", MISSING)
+        self._extra = _compact(values) if values else None
+
+    @property
+    def description(self):
+        value = self._description
+        if isinstance(value, _Compressed):
+            return zlib.decompress(value).decode("utf-8")
+        return value
+
+    def _slot(self, key: str):
+        if key == "description":
+            return self._description
+        return getattr(self, key)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = self._slot(key)
+            if value is MISSING:
+                raise KeyError(key)
+            return self.description if key == "description" else value
+        if self._extra is not None:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in FIELDS:
+            return self._slot(key) is not MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in FIELDS:
+            if self._slot(key) is not MISSING:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        count = sum(1 for key in FIELDS if self._slot(key) is not MISSING)
+        return count + (len(self._extra) if self._extra is not None else 0)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sum(
+            _footprint(getattr(self, slot)) for slot in CatalogRecord.__slots__
+        )
+
+    def __reduce__(self):
+        # Pickled compressed; strings are re-interned when loaded
+        return (_restore, tuple(getattr(self, slot) for slot in CatalogRecord.__slots__))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"CatalogRecord(id={self.id!r}, name={self.name!r})"
+
+
+def _restore(doc_id, name, description, basic_info, programs, apply_link, url, extra):
+    record = CatalogRecord.__new__(CatalogRecord)
+    record.id = _compact(doc_id)
+    record.name = _compact(name)
+    record._description = _Compressed(description) if isinstance(description, bytes) else description
+    record.basic_info = _compact(basic_info)
+    record.programs = _compact(programs)
+    record.apply_link = apply_link
+    record.url = url
+    record._extra = _compact(extra) if extra is not None else None
+    return record
+
+
+def compact(doc):
+    """Return doc as a CatalogRecord (None and existing records are returned as they are)."""
+    if doc is None or isinstance(doc, CatalogRecord):
+        return doc
+    return CatalogRecord(doc)
+
+
+def compact_cached(value, meta: dict = None):
+    """
+    Convert a cache value of a compact collection, based on its meta kind:
+    documents and lists of documents become CatalogRecords, pages get their
+    items converted, anything else (counts...) is frozen as usual.
+    """
+    kind = (meta or {}).get("kind")
+    if kind == "doc" and isinstance(value, Mapping):
+        return compact(value)
+    if kind in ("list", "projection") and isinstance(value, list):
+        return FrozenList(compact(doc) for doc in value)
+    if kind == "page" and isinstance(value, dict):
+        return freeze({**value, "items": FrozenList(compact(doc) for doc in value["items"])})
+    return value
@@ -0,0 +1,421 @@
+# app/services/catalog_replica.py
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from app.services.metrics_service import metrics
+from app.services.collection_versions import versions
+from collections.abc import Mapping
+from app.utils.frozen import FrozenList, freeze
+from app.services.catalog_record import COMPACT_COLLECTIONS, compact
+
+logger = logging.getLogger(__name__)
+
+# Collections mirrored in-process by a Firestore snapshot listener
+REPLICATED_COLLECTIONS = [
+    name.strip() for name in os.getenv("FIREBASE_REPLICATED_COLLECTIONS", "universities").split(",") if name.strip()
+]
+
+# Fields every catalog writer stamps with the write time; a replica seeded from a
+# snapshot catches up by listening only to documents where one is newer than it
+CHANGE_FIELDS = [
+    name.strip() for name in os.getenv("CATALOG_CHANGE_FIELDS", "updated_at,scraped_at").split(",") if name.strip()
+]
+
+# Changes this long before a snapshot are read again, to absorb clock skew
+SNAPSHOT_OVERLAP = timedelta(minutes=5)
+
+# Seconds to wait for the change listeners' first delivery before verifying the count
+CATCH_UP_TIMEOUT = 60
+
+# A replica following only changes reloads the whole collection once its contents
+# were last read in full this many hours ago (0 disables), so edits made without
+# stamping a change field don't persist in it (or in the snapshots taken of it)
+CATALOG_FULL_RESYNC_HOURS = float(os.getenv("CATALOG_FULL_RESYNC_HOURS", "24"))
+
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+_MISSING = object()
+
+
+def utc_time(moment) -> datetime:
+    """
+    Return a listener's read time as an aware UTC datetime. Naive datetimes are
+    local time; anything that isn't a time (e.g. the emulator mock's) is now.
+    """
+    if isinstance(moment, str):
+        try:
+            moment = datetime.fromisoformat(moment.replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.now(timezone.utc)
+    if not isinstance(moment, datetime):
+        return datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def get_field(doc: dict, field: str, default=None):
+    """Get a (possibly dotted, e.g. "basic_info.Location") field from a document."""
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, Mapping) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def project(doc: dict, fields: list) -> dict:
+    """
+    Return only the given (possibly dotted) fields of a document, keeping their
+    nesting, like a Firestore select(). The 'id' is kept if present.
+    """
+    result = {"id": doc["id"]} if "id" in doc else {}
+    for path in fields:
+        value = get_field(doc, path, _MISSING)
+        if value is _MISSING:
+            continue
+        parts = path.split(".")
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return result
+
+
+def matches(doc: dict, field: str, op: str, value) -> bool:
+    """Evaluate a single Firestore-style where() filter against a document."""
+    field_value = get_field(doc, field)
+    try:
+        if op == "==":
+            return field_value == value
+        if op == "!=":
+            return field_value is not None and field_value != value
+        if field_value is None:
+            return False
+        if op == "<":
+            return field_value < value
+        if op == "<=":
+            return field_value <= value
+        if op == ">":
+            return field_value > value
+        if op == ">=":
+            return field_value >= value
+        if op == "in":
+            return field_value in value
+        if op == "not-in":
+            return field_value not in value
+        if op == "array-contains":
+            return isinstance(field_value, list) and value in field_value
+        if op == "array-contains-any":
+            return isinstance(field_value, list) and any(v in field_value for v in value)
+    except TypeError:
+        return False
+    return False
+
+
+class CollectionReplica:
+    """
+    In-process replica of a Firestore collection kept up to date by an
+    on_snapshot listener.
+
+    The listener delivers the full collection once and then only the
+    added/modified/removed documents, so reads served from the replica cost
+    no Firestore operations and reflect changes within seconds.
+
+    A replica can instead be seeded from a snapshot file (see catalog_snapshot)
+    and started with `since`: it then listens only to documents whose
+    CHANGE_FIELDS are newer than the snapshot, and falls back to a full
+    listener if an aggregation count shows it is missing documents (e.g.
+    deletions the change listeners can't see) or once its contents were last
+    read in full more than CATALOG_FULL_RESYNC_HOURS ago.
+    """
+
+    def __init__(self, db, collection: str):
+        self.collection = collection
+        self._db = db
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watches = []
+        self._resync = False
+        self.incremental = False
+        self._snapshot = None
+        self._projections = {}
+        self.version = 0
+        self.synced_at = None
+        # When the documents were last read in full (rather than kept up by change listeners)
+        self.full_sync_at = None
+
+    def seed(self, documents: list, as_of, full_sync_at=None):
+        """
+        Load documents (with their 'id') read at as_of, e.g. from a snapshot
+        file. The replica serves reads from them right away.
+
+        Args:
+            documents: The documents
+            as_of: When they were read
+            full_sync_at: When the collection they were kept from was last read
+                in full (defaults to as_of)
+        """
+        with self._lock:
+            self._docs = {doc["id"]: self._compact(doc) for doc in documents}
+            self.version += 1
+            self._snapshot = None
+            self._projections = {}
+            self.synced_at = as_of
+            self.full_sync_at = full_sync_at or as_of
+        versions.bump(self.collection)
+        self._ready.set()
+        logger.info(f"Seeded '{self.collection}' replica with {len(documents)} document(s)")
+
+    def start(self, since=None):
+        """
+        Register the snapshot listener(s).
+
+        Args:
+            since: Time the seeded documents were read; if given, only documents
+                changed after it are read, then the document count is verified
+        """
+        from app.services.storage_backend import is_local_backend
+
+        if self._watches:
+            return
+        if since is None or not CHANGE_FIELDS or is_local_backend(self._db):
+            self.resync()
+            logger.info(f"Started live replica of '{self.collection}'")
+            return
+        self.incremental = True
+        cutoff = since - SNAPSHOT_OVERLAP
+        delivered = []
+        for field in CHANGE_FIELDS:
+            first_delivery = threading.Event()
+            delivered.append(first_delivery)
+            query = self._db.collection(self.collection).where(field, ">", cutoff)
+            self._watches.append(query.on_snapshot(self._change_listener(first_delivery)))
+        threading.Thread(target=self._catch_up, args=(delivered,), daemon=True,
+                         name=f"replica-catch-up-{self.collection}").start()
+        logger.info(f"Started live replica of '{self.collection}' from changes since {cutoff.isoformat()}")
+
+    def _change_listener(self, first_delivery: threading.Event):
+        def on_snapshot(col_snapshot, changes, read_time):
+            self._on_snapshot(col_snapshot, changes, read_time)
+            first_delivery.set()
+        return on_snapshot
+
+    def _catch_up(self, delivered: list):
+        """Verify the document count once every change listener has delivered."""
+        if not all(event.wait(CATCH_UP_TIMEOUT) for event in delivered):
+            logger.warning(f"Change listeners of '{self.collection}' are slow; verifying anyway")
+        try:
+            self.verify()
+        except Exception as e:
+            logger.error(f"Could not verify '{self.collection}' replica: {str(e)}")
+
+    def verify(self) -> bool:
+        """
+        Compare the replica with an aggregation count of the collection (one
+        read per 1000 documents) and resynchronize it in full if they differ,
+        or if a replica following only changes was last read in full more
+        than CATALOG_FULL_RESYNC_HOURS ago.
+
+        Returns:
+            True if the replica was left as it is
+        """
+        results = self._db.collection(self.collection).count(alias="count").get()
+        remote = results[0][0].value
+        metrics.record_count_reads(self.collection, remote, route="listener")
+        local = len(self)
+        if remote != local:
+            logger.warning(f"'{self.collection}' replica has {local} document(s), database has {remote}; resyncing")
+            self.resync()
+            return False
+        if self.incremental and CATALOG_FULL_RESYNC_HOURS > 0 and self.full_sync_at is not None:
+            age = datetime.now(timezone.utc) - self.full_sync_at
+            if age > timedelta(hours=CATALOG_FULL_RESYNC_HOURS):
+                logger.info(f"'{self.collection}' replica was last read in full {age} ago; resyncing")
+                self.resync()
+                return False
+        return True
+
+    def resync(self):
+        """Replace the change listeners with a full listener that reloads every document."""
+        self._unsubscribe()
+        self.incremental = False
+        with self._lock:
+            self._resync = True
+        self._watches = [self._db.collection(self.collection).on_snapshot(self._on_snapshot)]
+
+    def _unsubscribe(self):
+        watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.unsubscribe()
+
+    def stop(self):
+        """Unsubscribe the snapshot listener(s). The replica stops serving reads."""
+        self._unsubscribe()
+        self._ready.clear()
+
+    @property
+    def ready(self) -> bool:
+        """True once the initial snapshot has been received."""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until the initial snapshot arrives (or timeout)."""
+        return self._ready.wait(timeout)
+
+    def _compact(self, data: dict):
+        """Freeze a document, as a compact CatalogRecord for catalog collections."""
+        if self.collection in COMPACT_COLLECTIONS:
+            return compact(data)
+        return freeze(data)
+
+    def _on_snapshot(self, col_snapshot, changes, read_time):
+        """Apply add/modify/remove deltas delivered by the listener."""
+        read_time = utc_time(read_time)
+        try:
+            with self._lock:
+                if self._resync:
+                    # First delivery of a full listener: it holds every document
+                    self._docs = {}
+                    self._resync = False
+                    self.full_sync_at = read_time
+                for change in changes:
+                    doc = change.document
+                    if change.type.name == "REMOVED":
+                        self._docs.pop(doc.id, None)
+                    else:
+                        data = dict(doc.to_dict() or {})
+                        data["id"] = doc.id
+                        self._docs[doc.id] = self._compact(data)
+                if changes:
+                    self.version += 1
+                    self._snapshot = None
+                    self._projections = {}
+                self.synced_at = read_time
+            if changes:
+                versions.bump(self.collection)
+            # Listener deliveries are billed one read per changed document
+            metrics.record_reads(self.collection, len(changes), route="listener")
+            if changes and self.ready:
+                logger.info(f"Applied {len(changes)} change(s) to '{self.collection}' replica")
+            self._ready.set()
+        except Exception as e:
+            logger.error(f"Error applying changes to '{self.collection}' replica: {str(e)}")
+
+    def documents(self) -> list:
+        """Return all documents (with their 'id') as a shared read-only list."""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = FrozenList(self._docs.values())
+            return self._snapshot
+
+    def projected(self, fields: list) -> list:
+        """Return all documents reduced to the given fields (and 'id'), cached until the next change."""
+        key = tuple(sorted(fields))
+        with self._lock:
+            cached = self._projections.get(key)
+            version = self.version
+        if cached is not None:
+            return cached
+        result = freeze([project(doc, fields) for doc in self.documents()])
+        with self._lock:
+            # Don't keep a projection built from documents that changed meanwhile
+            if self.version == version:
+                self._projections[key] = result
+        return result
+
+    def get(self, doc_id: str):
+        """Return a single document, or None if it doesn't exist."""
+        with self._lock:
+            return self._docs.get(doc_id)
+
+    def find(self, field: str, op: str, value) -> list:
+        """Return documents matching a where() filter."""
+        return [doc for doc in self.documents() if matches(doc, field, op, value)]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._docs)
+
+
+def get_replica(collection: str):
+    """Return the running replica of a collection if it has received its initial snapshot."""
+    replica = _replicas.get(collection)
+    if replica is not None and replica.ready:
+        return replica
+    return None
+
+
+def _load_snapshot(replica):
+    """Seed a replica from its snapshot file; returns the snapshot time or None."""
+    from app.services.catalog_snapshot import SnapshotError, read_snapshot, snapshot_path
+
+    path = snapshot_path(replica.collection)
+    try:
+        header, documents = read_snapshot(path)
+    except SnapshotError as e:
+        logger.info(f"Starting '{replica.collection}' replica without a snapshot: {str(e)}")
+        return None
+    replica.seed(documents, header["as_of"], header.get("full_sync_at"))
+    return header["as_of"]
+
+
+def start_replicas(db, collections: list = None, wait: float = 0, snapshots: bool = False) -> dict:
+    """
+    Start live replicas for the given collections (defaults to REPLICATED_COLLECTIONS).
+    Replicas are shared process-wide, so every FirebaseService instance reads the same copy.
+
+    Args:
+        db: Firestore client
+        collections: Collection names to replicate
+        wait: Seconds to wait for each initial snapshot
+        snapshots: Seed replicas from their snapshot files and only read later changes
+
+    Returns:
+        Dict of collection name to CollectionReplica
+    """
+    started = {}
+    for collection in collections or REPLICATED_COLLECTIONS:
+        with _replicas_lock:
+            replica = _replicas.get(collection)
+            if replica is None:
+                replica = CollectionReplica(db, collection)
+                _replicas[collection] = replica
+        try:
+            since = _load_snapshot(replica) if snapshots and not replica.ready else None
+            replica.start(since=since)
+            if wait:
+                replica.wait_ready(wait)
+            started[collection] = replica
+        except Exception as e:
+            logger.error(f"Failed to start live replica of '{collection}': {str(e)}")
+            with _replicas_lock:
+                _replicas.pop(collection, None)
+    return started
+
+
+def verify_replicas():
+    """
+    Check every replica that follows only changes against a count of its
+    collection, to notice deletions (see CollectionReplica.verify).
+    """
+    for replica in list(_replicas.values()):
+        if replica.ready and replica.incremental:
+            try:
+                replica.verify()
+            except Exception as e:
+                logger.error(f"Could not verify '{replica.collection}' replica: {str(e)}")
+
+
+def stop_replicas():
+    """Stop every running replica."""
+    with _replicas_lock:
+        replicas = list(_replicas.values())
+        _replicas.clear()
+    for replica in replicas:
+        try:
+            replica.stop()
+        except Exception as e:
+            logger.warning(f"Error stopping '{replica.collection}' replica: {str(e)}")
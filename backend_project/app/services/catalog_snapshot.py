@@ -0,0 +1,197 @@
+# app/services/catalog_snapshot.py
+"""
+Snapshot files of replicated collections, used to warm-start the replicas.
+
+A snapshot is gzip-compressed JSON Lines: a header line describing the file
+({"format", "version", "collection", "as_of", "full_sync_at", "count",
+"created_at"}) and then one document (with its 'id') per line. `as_of` is
+the time the documents were read; on boot the replica is seeded from the
+file and only documents changed since then are read from Firestore.
+`full_sync_at` is when the collection was last read in full, which bounds
+how long the replica follows only changes (see CATALOG_FULL_RESYNC_HOURS).
+"""
+import os
+import gzip
+import json
+import logging
+import tempfile
+from datetime import datetime, timezone
+
+from app.services.metrics_service import metrics
+from app.services.catalog_replica import REPLICATED_COLLECTIONS, get_replica
+from app.services.storage_backend import encode_document, decode_document
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "findmyuni-collection-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Directory holding one <collection>.jsonl.gz snapshot per replicated collection
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "data/snapshots")
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or of an unknown version."""
+
+
+def snapshot_path(collection: str, path: str = None) -> str:
+    """Return the snapshot file of a collection (path if given)."""
+    return path or os.path.join(CATALOG_SNAPSHOT_DIR, f"{collection}.jsonl.gz")
+
+
+def _utc(moment: datetime) -> datetime:
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def write_snapshot(collection: str, documents, as_of: datetime, path: str = None,
+                   full_sync_at: datetime = None) -> dict:
+    """
+    Write documents to a snapshot file, replacing the previous one atomically.
+
+    Args:
+        collection: Collection the documents belong to
+        documents: Documents, each with its 'id'
+        as_of: When the documents were read
+        path: Target file (defaults to the collection's file in CATALOG_SNAPSHOT_DIR)
+        full_sync_at: When the collection was last read in full (defaults to as_of)
+
+    Returns:
+        The snapshot header
+    """
+    documents = list(documents)
+    target = snapshot_path(collection, path)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "collection": collection,
+        "as_of": _utc(as_of).isoformat(),
+        "full_sync_at": _utc(full_sync_at or as_of).isoformat(),
+        "count": len(documents),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as out:
+            out.write(json.dumps(header).encode("utf-8") + b"\n")
+            for doc in documents:
+                out.write(encode_document(doc).encode("utf-8") + b"\n")
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    logger.info(f"Wrote snapshot of {len(documents)} '{collection}' documents to {target}")
+    return header
+
+
+def read_snapshot(path: str) -> tuple:
+    """
+    Read a snapshot file.
+
+    Returns:
+        (header, documents) where header["as_of"] and header["full_sync_at"] are datetimes
+
+    Raises:
+        SnapshotError: If the file is missing, truncated or not a supported snapshot
+    """
+    try:
+        with gzip.open(path, "rb") as source:
+            header = json.loads(source.readline())
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise SnapshotError(f"{path} is not a collection snapshot")
+            if header.get("version") != SNAPSHOT_VERSION:
+                raise SnapshotError(f"Unsupported snapshot version {header.get('version')} in {path}")
+            documents = [decode_document(line) for line in source if line.strip()]
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot at {path}")
+    except (OSError, EOFError, ValueError, AttributeError) as e:
+        raise SnapshotError(f"Corrupt snapshot {path}: {str(e)}")
+    if len(documents) != header.get("count") or any("id" not in doc for doc in documents):
+        raise SnapshotError(f"Snapshot {path} is incomplete")
+    header["as_of"] = datetime.fromisoformat(header["as_of"])
+    # Files written before full_sync_at was recorded were read in full as of as_of at best
+    full_sync_at = header.get("full_sync_at")
+    header["full_sync_at"] = datetime.fromisoformat(full_sync_at) if full_sync_at else header["as_of"]
+    return header, documents
+
+
+def export_collection(db, collection: str, path: str = None) -> dict:
+    """
+    Stream a whole collection from the database into its snapshot file.
+    Costs one read per document; prefer export_replica when a replica is running.
+
+    Returns:
+        The snapshot header
+    """
+    as_of = datetime.now(timezone.utc)
+    documents = []
+    for snapshot in db.collection(collection).stream():
+        documents.append({**(snapshot.to_dict() or {}), "id": snapshot.id})
+    metrics.record_reads(collection, len(documents), route="snapshot")
+    return write_snapshot(collection, documents, as_of, path)
+
+
+def export_replica(replica, path: str = None) -> dict:
+    """
+    Write the documents of a running replica to its snapshot file, without
+    reading from the database.
+
+    Returns:
+        The snapshot header
+    """
+    return write_snapshot(replica.collection, replica.documents(), replica.synced_at, path, replica.full_sync_at)
+
+
+def import_snapshot(db, path: str, collection: str = None) -> dict:
+    """
+    Write the documents of a snapshot file into a database (e.g. to seed a
+    SQLite storage backend), overwriting documents with the same ID. The
+    documents are stamped with a new updated_at, so replicas following only
+    changes pick them up.
+
+    Args:
+        db: Firestore client or storage backend
+        path: Snapshot file
+        collection: Target collection (defaults to the one the snapshot was taken of)
+
+    Returns:
+        {"collection": ..., "written": count, "failed": count}
+    """
+    from firebase_admin import firestore
+    from app.services.bulk_writer import BulkWriter
+
+    header, documents = read_snapshot(path)
+    collection = collection or header["collection"]
+    operations = [
+        {
+            "type": "set",
+            "collection": collection,
+            "doc_id": doc["id"],
+            "data": {
+                **{key: value for key, value in doc.items() if key != "id"},
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            },
+        }
+        for doc in documents
+    ]
+    results = BulkWriter(db).commit(operations)
+    failed = sum(1 for result in results if not result.get("success"))
+    return {"collection": collection, "written": len(results) - failed, "failed": failed}
+
+
+def save_replica_snapshots() -> list:
+    """Write a snapshot of every ready replica; returns the headers written."""
+    headers = []
+    for collection in REPLICATED_COLLECTIONS:
+        replica = get_replica(collection)
+        if replica is None or replica.synced_at is None:
+            continue
+        try:
+            headers.append(export_replica(replica))
+        except Exception as e:
+            logger.error(f"Could not write snapshot of '{collection}': {str(e)}")
+    return headers
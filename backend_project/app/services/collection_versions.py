@@ -0,0 +1,43 @@
+# app/services/collection_versions.py
+import threading
+
+
+class CollectionVersions:
+    """
+    Process-wide version numbers of collections' data.
+
+    A collection's version rises whenever its data may have changed: a write
+    through FirebaseService, a change delivered to its replica, another
+    worker's write noticed through the shared cache, or a cache clear.
+    Anything derived from a collection (e.g. encoded responses) can be keyed
+    by the version it was built from and is then never served once the data
+    moves on. Versions are unique across collections, so a sum or tuple of
+    several collections' versions still only grows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._floor = 0
+        self._versions = {}
+
+    def current(self, collection: str) -> int:
+        """Return the version of a collection."""
+        with self._lock:
+            return max(self._versions.get(collection, 0), self._floor)
+
+    def bump(self, collection: str) -> int:
+        """Record that a collection changed; returns its new version."""
+        with self._lock:
+            self._counter += 1
+            self._versions[collection] = self._counter
+            return self._counter
+
+    def bump_all(self):
+        """Record that every collection may have changed (e.g. the whole cache was cleared)."""
+        with self._lock:
+            self._counter += 1
+            self._floor = self._counter
+
+
+versions = CollectionVersions()
@@ -0,0 +1,77 @@
+# app/services/deadline_index.py
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from app.utils.deadlines import deadline_of, document_deadline
+
+logger = logging.getLogger(__name__)
+
+_memo_lock = threading.Lock()
+# (source list, DeadlineIndex) of the last catalog indexed
+_memo = None
+
+
+class DeadlineIndex:
+    """
+    Deadlines of a catalog read once (from deadline_iso where documents have
+    it), as a sorted array of dates.
+
+    `dates[i]` is the deadline of `documents[positions[i]]`; equal deadlines
+    keep catalog order. Range queries are a bisection plus a slice, and the
+    deadline ordering of the whole catalog is built once.
+    """
+
+    def __init__(self, documents: list):
+        self.documents = documents
+        dated = []
+        self.undated = []
+        for position, doc in enumerate(documents):
+            parsed = document_deadline(doc)
+            if parsed is None:
+                deadline = deadline_of(doc)
+                if deadline:
+                    logger.warning(f"Could not parse deadline '{deadline}' for university {doc.get('name')}")
+                self.undated.append(position)
+            else:
+                dated.append((parsed, position))
+        dated.sort()
+        self.dates = [date for date, _ in dated]
+        self.positions = [position for _, position in dated]
+        self._ordered = None
+
+    def within(self, start: datetime, end: datetime, by_deadline: bool = False) -> list:
+        """
+        Return the documents whose deadline is between start and end (inclusive).
+
+        Args:
+            start: Earliest deadline
+            end: Latest deadline
+            by_deadline: Order by deadline instead of catalog order
+        """
+        low = bisect_left(self.dates, start)
+        high = bisect_right(self.dates, end)
+        positions = self.positions[low:high]
+        if not by_deadline:
+            positions = sorted(positions)
+        return [self.documents[position] for position in positions]
+
+    def ordered(self) -> list:
+        """Return the whole catalog by deadline; universities without one come last, in catalog order."""
+        if self._ordered is None:
+            self._ordered = [self.documents[position] for position in self.positions + self.undated]
+        return self._ordered
+
+
+def deadline_index(documents: list) -> DeadlineIndex:
+    """Return the index of a catalog list, reusing the last one if the list is the same object."""
+    global _memo
+    with _memo_lock:
+        memo = _memo
+    if memo is not None and memo[0] is documents:
+        return memo[1]
+    index = DeadlineIndex(documents)
+    with _memo_lock:
+        _memo = (documents, index)
+    return index
@@ -2,146 +2,452 @@
 from firebase_admin import firestore
 import logging
 import re
-import time
-import random
-from functools import lru_cache
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services.cache_service import CacheService, get_default_cache
+from app.services.catalog_replica import get_replica, matches, project
+from app.services.single_flight import SingleFlight, get_default_flights
+from app.services.bulk_writer import BulkWriter
+from app.services.write_through import apply_write, UnresolvableWrite, resolve_sentinels
+from app.services.metrics_service import metrics
+from app.services.collection_versions import versions
+from app.services.quota_governor import quota, unmetered
+from app.services.retry_policy import RetryPolicy
+from app.services.pagination import DOCUMENT_ID, decode_cursor, encode_cursor, paginate
+from app.services.storage_backend import get_backend, is_local_backend
 
 logger = logging.getLogger(__name__)
 
+# Stale-while-revalidate: once REFRESH_AHEAD_RATIO of an entry's TTL has elapsed it is
+# refreshed in the background; until STALE_WHILE_REVALIDATE_RATIO of the TTL has elapsed
+# the cached value is still served immediately instead of blocking on Firestore.
+REFRESH_AHEAD_RATIO = 0.8
+STALE_WHILE_REVALIDATE_RATIO = 2.0
+
+# Counts are cheap to recompute (one read per 1000 documents) and aren't patched
+# on writes, so they are cached briefly
+COUNT_TTL = 60
+
+# Returned by the _cached_* lookups when the answer needs a Firestore read
+MISS = object()
+
+# Shared by all FirebaseService instances for background cache refreshes
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+def containing(docs: list, field: str, value: str) -> list:
+    """Filter documents whose string field contains value (case insensitive)."""
+    pattern = re.compile(re.escape(value), re.IGNORECASE)
+    return [doc for doc in docs if isinstance(doc.get(field), str) and pattern.search(doc[field])]
+
+
 class FirebaseService:
-    def __init__(self):
-        self.db = firestore.client()
-        self._cache = {}
-        self._cache_timestamp = {}
-        self._cache_expiry = 300  # Cache expiry in seconds (5 minutes)
-
-    def _retry_with_backoff(self, operation, max_retries=3):
-        """Execute operation with exponential backoff retry logic"""
-        retries = 0
-        while True:
-            try:
-                return operation()
-            except Exception as e:
-                retries += 1
-                if "429" in str(e) or "Quota exceeded" in str(e):
-                    if retries > max_retries:
-                        logger.error(f"Max retries reached after quota exceeded: {str(e)}")
-                        raise
-                    wait_time = (2 ** retries) + random.random()
-                    logger.warning(f"Quota exceeded. Retrying after {wait_time:.2f} seconds. Retry {retries}/{max_retries}")
-                    time.sleep(wait_time)
-                else:
-                    raise
-
-    def create_document(self, collection: str, data: dict, doc_id: str = None) -> str:
-        """Create a document in the specified collection. Returns document ID."""
+    def __init__(self, cache: CacheService = None, backend=None):
+        # Firestore client, or a local backend selected with STORAGE_BACKEND (see storage_backend.py)
+        self.db = backend if backend is not None else get_backend()
+        # Routers each create their own service; by default they all share one cache
+        self._cache = cache or get_default_cache()
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        # Concurrent cache misses for the same key share one Firestore fetch
+        self._flights = get_default_flights() if cache is None else SingleFlight()
+        # Daily read/write budget; degrades to stale reads and deferred writes when low
+        self._quota = unmetered if is_local_backend(self.db) else quota
+        # Per-call timeout, capped backoff and per-collection circuit breakers
+        self._retry = RetryPolicy()
+
+    def _retry_with_backoff(self, operation, collection: str = None):
+        """
+        Execute operation, retrying transient failures with capped exponential backoff.
+        Raises CircuitOpenError without calling Firestore while the collection's breaker is open.
+        """
+        return self._retry.run(operation, collection, on_quota_error=self._quota.note_exhausted)
+
+    def _fetch(self, cache_key: str, collection: str, operation):
+        """
+        Run a cache-filling read once per key (single-flight) with retries.
+        If Firestore can't be reached, fall back to the cached value however old it is.
+        """
+        try:
+            return self._flights.do(cache_key, lambda: self._retry_with_backoff(operation, collection))
+        except Exception as e:
+            stale = self._cache.get(cache_key, allow_stale=True)
+            if stale is None:
+                raise
+            logger.warning(f"Serving cached {cache_key} after Firestore error: {str(e)}")
+            return stale
+
+    def create_document(self, collection: str, data: dict, doc_id: str = None, critical: bool = True) -> str:
+        """
+        Create a document in the specified collection. Returns document ID.
+        Non-critical writes (analytics, status updates) are queued instead of
+        sent while the daily write budget is running low.
+        """
+        if not critical and self._quota.defer_writes():
+            doc_id = doc_id or self.db.collection(collection).document().id
+            self._defer_write("set", collection, doc_id, data)
+            return doc_id
+        self._schedule_deferred_flush()
+            
         def op():
             if doc_id:
-                self.db.collection(collection).document(doc_id).set(data)
+                self.db.collection(collection).document(doc_id).set(data, timeout=self._retry.timeout)
                 return doc_id
             else:
                 doc_ref = self.db.collection(collection).document()
-                doc_ref.set(data)
+                doc_ref.set(data, timeout=self._retry.timeout)
                 return doc_ref.id
                 
-        return self._retry_with_backoff(op)
+        new_id = self._retry_with_backoff(op, collection)
+        metrics.record_writes(collection)
+        self._write_through(collection, new_id, "set", data)
+        return new_id
 
     def get_document(self, collection: str, doc_id: str) -> dict:
         """Retrieve a document by ID."""
-        # Check cache first
-        cache_key = f"{collection}:{doc_id}"
-        if cache_key in self._cache and (datetime.now() - self._cache_timestamp.get(cache_key, datetime.min)).total_seconds() < self._cache_expiry:
-            logger.info(f"Cache hit for document {collection}/{doc_id}")
-            return self._cache[cache_key]
+        cached = self._cached_document(collection, doc_id)
+        if cached is not MISS:
+            return cached
             
         # Not in cache, fetch from Firestore
+        cache_key = f"{collection}:{doc_id}"
         def op():
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc = doc_ref.get()
+            doc = doc_ref.get(timeout=self._retry.timeout)
+            metrics.record_reads(collection, 1)
             result = doc.to_dict() if doc.exists else None
             
             # Update cache
             if result:
-                self._cache[cache_key] = result
-                self._cache_timestamp[cache_key] = datetime.now()
+                result = self._cache.set(cache_key, result, meta={"kind": "doc", "id": doc_id})
                 
             return result
             
-        return self._retry_with_backoff(op)
+        return self._fetch(cache_key, collection, op)
 
-    def update_document(self, collection: str, doc_id: str, data: dict):
-        """Update fields of a document."""
-        # Invalidate cache
-        cache_key = f"{collection}:{doc_id}"
-        if cache_key in self._cache:
-            del self._cache[cache_key]
+    def _cached_document(self, collection: str, doc_id: str):
+        """Answer get_document without reads (live replica or cache), or return MISS."""
+        # A live replica is authoritative and costs no reads
+        replica = get_replica(collection)
+        if replica is not None:
+            return replica.get(doc_id)
+        cached = self._cache.get(f"{collection}:{doc_id}", allow_stale=self._quota.serve_stale())
+        if cached is not None:
+            logger.debug(f"Cache hit for document {collection}/{doc_id}")
+            return cached
+        return MISS
+
+    def get_documents(self, collection: str, ids: list) -> dict:
+        """
+        Retrieve several documents by ID in a single round-trip.
+        
+        IDs already in the cache (or the live replica) are served locally; the
+        rest are fetched together with one batched get_all call.
+        
+        Args:
+            collection: Collection name
+            ids: Document IDs
+            
+        Returns:
+            Dict of document ID to document (None for documents that don't exist),
+            in the order the IDs were given
+        """
+        ids = list(dict.fromkeys(ids))
+        results, missing = self._cached_documents(collection, ids)
+        if missing:
+            def operation():
+                col_ref = self.db.collection(collection)
+                refs = [col_ref.document(doc_id) for doc_id in missing]
+                fetched = {}
+                for doc in self.db.get_all(refs, timeout=self._retry.timeout):
+                    data = doc.to_dict() if doc.exists else None
+                    if data:
+                        data = self._cache.set(f"{collection}:{doc.id}", data, meta={"kind": "doc", "id": doc.id})
+                    fetched[doc.id] = data
+                metrics.record_reads(collection, len(refs))
+                return fetched
+                
+            try:
+                results.update(self._retry_with_backoff(operation, collection))
+            except Exception as e:
+                # Fall back to expired cached copies when Firestore can't be reached
+                for doc_id in missing:
+                    stale = self._cache.get(f"{collection}:{doc_id}", allow_stale=True)
+                    if stale is None:
+                        raise
+                    results[doc_id] = stale
+                logger.warning(f"Serving cached {collection} documents after Firestore error: {str(e)}")
+            
+        return {doc_id: results.get(doc_id) for doc_id in ids}
+
+    def _cached_documents(self, collection: str, ids: list) -> tuple:
+        """Split ids into (documents available without reads, IDs to fetch)."""
+        replica = get_replica(collection)
+        if replica is not None:
+            return {doc_id: replica.get(doc_id) for doc_id in ids}, []
+        results = {}
+        missing = []
+        serve_stale = self._quota.serve_stale()
+        for doc_id in ids:
+            cached = self._cache.get(f"{collection}:{doc_id}", allow_stale=serve_stale)
+            if cached is not None:
+                results[doc_id] = cached
+            else:
+                missing.append(doc_id)
+        return results, missing
+
+    def update_document(self, collection: str, doc_id: str, data: dict, critical: bool = True):
+        """Update fields of a document. See create_document for `critical`."""
+        if not critical and self._quota.defer_writes():
+            self._defer_write("update", collection, doc_id, data)
+            return
+        self._schedule_deferred_flush()
             
         def op():
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc_ref.update(data)
+            doc_ref.update(data, timeout=self._retry.timeout)
             
-        self._retry_with_backoff(op)
+        self._retry_with_backoff(op, collection)
+        metrics.record_writes(collection)
+        # Patch the cached copies instead of waiting for them to expire
+        self._write_through(collection, doc_id, "update", data)
 
     def delete_document(self, collection: str, doc_id: str):
         """Delete a document."""
-        # Invalidate cache
-        cache_key = f"{collection}:{doc_id}"
-        if cache_key in self._cache:
-            del self._cache[cache_key]
-            
         def op():
             doc_ref = self.db.collection(collection).document(doc_id)
-            doc_ref.delete()
+            doc_ref.delete(timeout=self._retry.timeout)
             
-        self._retry_with_backoff(op)
+        self._retry_with_backoff(op, collection)
+        metrics.record_writes(collection)
+        self._write_through(collection, doc_id, "delete")
+
+    def _write_through(self, collection: str, doc_id: str, change: str, data: dict = None):
+        """
+        Apply a successful write to the cached document, collection snapshot and
+        query results. Falls back to invalidating the collection if the write
+        can't be applied locally (e.g. Increment/ArrayUnion transforms).
+        """
+        try:
+            apply_write(self._cache, collection, doc_id, change, data)
+        except Exception as e:
+            logger.debug(f"Invalidating cached {collection} after write to {doc_id}: {str(e)}")
+            self._cache.invalidate_collection(collection)
+        versions.bump(collection)
+
+    def _defer_write(self, op_type: str, collection: str, doc_id: str, data: dict):
+        """Queue a non-critical write until the quota allows it, showing it in the cache meanwhile."""
+        try:
+            # Keep the time the write was made rather than the time it is flushed
+            data = resolve_sentinels(data)
+        except UnresolvableWrite:
+            pass
+        self._quota.defer({"type": op_type, "collection": collection, "doc_id": doc_id, "data": data})
+        logger.info(f"Deferred non-critical {op_type} of {collection}/{doc_id} to conserve Firestore quota")
+        self._write_through(collection, doc_id, op_type, data)
+
+    def flush_deferred_writes(self) -> int:
+        """
+        Send writes deferred while the write budget was low, once it allows.
+        Returns the number of writes committed.
+        """
+        operations = self._quota.take_deferred()
+        if not operations:
+            return 0
+        results = self.batch_operation(operations)
+        committed = sum(1 for result in results if result["success"])
+        logger.info(f"Flushed {committed}/{len(operations)} deferred write(s)")
+        return committed
+
+    def _schedule_deferred_flush(self):
+        """Flush deferred writes in the background if there are any and the budget allows."""
+        if self._quota.has_deferred() and not self._quota.defer_writes():
+            self._schedule_refresh("deferred-writes", self.flush_deferred_writes)
 
     def query_collection(self, collection: str, field: str = None, op: str = None, value=None) -> list:
         """Query all documents or by a field filter."""
-        # Build cache key
-        cache_key = f"{collection}:query:{field}:{op}:{value}"
-        if cache_key in self._cache and (datetime.now() - self._cache_timestamp.get(cache_key, datetime.min)).total_seconds() < self._cache_expiry:
-            logger.info(f"Cache hit for query {cache_key}")
-            return self._cache[cache_key]
+        cached = self._cached_query(collection, "query", field, op, value)
+        if cached is not MISS:
+            return cached
+        cache_key = self._query_key(collection, "query", field, op, value)
             
-        def op():
+        def operation():
             col_ref = self.db.collection(collection)
             if field and op and value is not None:
                 query = col_ref.where(field, op, value)
-                result = [doc.to_dict() for doc in query.stream()]
+                result = [doc.to_dict() for doc in query.stream(timeout=self._retry.timeout)]
             else:
-                result = [doc.to_dict() for doc in col_ref.stream()]
+                result = [doc.to_dict() for doc in col_ref.stream(timeout=self._retry.timeout)]
+            metrics.record_query_reads(collection, len(result))
                 
             # Update cache
-            self._cache[cache_key] = result
-            self._cache_timestamp[cache_key] = datetime.now()
-            return result
+            return self._cache.set(cache_key, result, meta={"kind": "list", "with_ids": False})
             
-        return self._retry_with_backoff(op)
+        return self._fetch(cache_key, collection, operation)
 
     def find_document(self, collection: str, field: str, op: str, value) -> list:
         """Find documents with a field matching a value, returning dicts with 'id' included."""
-        # Build cache key
-        cache_key = f"{collection}:find:{field}:{op}:{value}"
-        if cache_key in self._cache and (datetime.now() - self._cache_timestamp.get(cache_key, datetime.min)).total_seconds() < self._cache_expiry:
-            logger.info(f"Cache hit for find {cache_key}")
-            return self._cache[cache_key]
+        cached = self._cached_query(collection, "find", field, op, value)
+        if cached is not MISS:
+            return cached
+        cache_key = self._query_key(collection, "find", field, op, value)
             
         def operation():
             col_ref = self.db.collection(collection)
-            docs = col_ref.where(field, op, value).stream()
+            docs = col_ref.where(field, op, value).stream(timeout=self._retry.timeout)
             result = []
             for doc in docs:
                 d = doc.to_dict()
                 d["id"] = doc.id
                 result.append(d)
+            metrics.record_query_reads(collection, len(result))
                 
             # Update cache
-            self._cache[cache_key] = result
-            self._cache_timestamp[cache_key] = datetime.now()
-            return result
+            return self._cache.set(cache_key, result, meta={"kind": "list", "with_ids": True, "filter": (field, op, value)})
+            
+        return self._fetch(cache_key, collection, operation)
+
+    @staticmethod
+    def _query_key(collection: str, kind: str, field, op, value) -> str:
+        return f"{collection}:{kind}:{field}:{op}:{value}"
+
+    def _cached_query(self, collection: str, kind: str, field, op, value):
+        """
+        Answer a query without reads (live replica or cache), or return MISS.
+        kind is "query", "query_with_ids" or "find" (which always filters).
+        """
+        replica = get_replica(collection)
+        if replica is not None:
+            if kind == "find" or (field and op and value is not None):
+                return replica.find(field, op, value)
+            return replica.documents()
+        cache_key = self._query_key(collection, kind, field, op, value)
+        cached = self._cache.get(cache_key, allow_stale=self._quota.serve_stale())
+        if cached is not None:
+            logger.debug(f"Cache hit for query {cache_key}")
+            return cached
+        return MISS
+
+    def get_page(self, collection: str, limit: int, cursor: str = None, order_by: str = None) -> dict:
+        """
+        Get one page of a collection with keyset pagination.
+        
+        Documents are ordered by `order_by` and then document ID (or by ID
+        alone). The page is read with start_after + limit, so it costs about
+        `limit` reads however large the collection is. If the whole collection
+        is available locally (live replica or cache) the page is cut from it.
+        
+        Args:
+            collection: Collection name
+            limit: Page size
+            cursor: "next_cursor" of the previous page, or None for the first page
+            order_by: Optional field to order by
+            
+        Returns:
+            {"items": [...documents with 'id'], "next_cursor": token or None,
+             "total": number of documents if known without extra reads, else None}
+             
+        Raises:
+            ValueError: If the cursor is malformed or belongs to another ordering
+        """
+        cached = self._cached_page(collection, limit, cursor, order_by)
+        if cached is not MISS:
+            return cached
             
-        return self._retry_with_backoff(operation)
+        after = decode_cursor(cursor, order_by) if cursor else None
+        cache_key = f"{collection}:page:{order_by}:{limit}:{cursor}"
+        def operation():
+            query = self.db.collection(collection)
+            if order_by:
+                query = query.order_by(order_by)
+            query = query.order_by(DOCUMENT_ID)
+            if after is not None:
+                value, doc_id = after
+                position = {DOCUMENT_ID: self.db.collection(collection).document(doc_id)}
+                if order_by:
+                    position[order_by] = value
+                query = query.start_after(position)
+            # One extra document tells whether there is a next page
+            docs = query.limit(limit + 1).stream(timeout=self._retry.timeout)
+            
+            items = []
+            for doc in docs:
+                d = doc.to_dict()
+                d["id"] = doc.id
+                items.append(d)
+            metrics.record_query_reads(collection, len(items))
+            
+            page = {
+                "items": items[:limit],
+                "next_cursor": encode_cursor(order_by, items[limit - 1]) if len(items) > limit else None,
+                "total": None,
+            }
+            return self._cache.set(cache_key, page, meta={"kind": "page"})
+            
+        return self._fetch(cache_key, collection, operation)
+
+    def _cached_page(self, collection: str, limit: int, cursor: str = None, order_by: str = None):
+        """
+        Answer get_page without reads (whole collection local, or page cached), or return MISS.
+
+        Raises:
+            ValueError: If the cursor is malformed or belongs to another ordering
+        """
+        after = decode_cursor(cursor, order_by) if cursor else None
+        local = self._local_collection(collection)
+        if local is not None:
+            return paginate(local, limit, after, order_by)
+        cached = self._cache.get(f"{collection}:page:{order_by}:{limit}:{cursor}", allow_stale=self._quota.serve_stale())
+        return cached if cached is not None else MISS
+
+    def count_documents(self, collection: str, filters: list = None) -> int:
+        """
+        Count the documents of a collection with a Firestore aggregation query.
+        
+        The count is computed on the server and billed one read per 1000
+        matching documents, instead of streaming every document. If the
+        collection is available locally (live replica or cache) it is counted
+        there for free. Results are cached for COUNT_TTL seconds.
+        
+        Args:
+            collection: Collection name
+            filters: Optional list of (field, op, value) where() filters
+            
+        Returns:
+            Number of matching documents
+        """
+        filters = [tuple(f) for f in filters or []]
+        cached = self._cached_count(collection, filters)
+        if cached is not MISS:
+            return cached
+            
+        cache_key = f"{collection}:count:{filters}"
+        def operation():
+            query = self.db.collection(collection)
+            for field, op, value in filters:
+                query = query.where(field, op, value)
+            results = query.count(alias="count").get(timeout=self._retry.timeout)
+            count = int(results[0][0].value)
+            metrics.record_count_reads(collection, count)
+            
+            self._cache.set(cache_key, count, ttl=COUNT_TTL, meta={"kind": "count"})
+            return count
+            
+        return self._fetch(cache_key, collection, operation)
+
+    def _cached_count(self, collection: str, filters: list):
+        """Answer count_documents without reads (local collection or cached count), or return MISS."""
+        local = self._local_collection(collection)
+        if local is not None:
+            return sum(1 for doc in local if all(matches(doc, *f) for f in filters))
+        cached = self._cache.get(f"{collection}:count:{filters}", allow_stale=self._quota.serve_stale())
+        return cached if cached is not None else MISS
+
+    def _local_collection(self, collection: str):
+        """Return the whole collection if it's available without reads (replica or cache), else None."""
+        replica = get_replica(collection)
+        if replica is not None:
+            return replica.documents()
+        return self._cache.get(f"{collection}:all", allow_stale=self._quota.serve_stale())
 
     def get_server_timestamp(self):
         """Return a server timestamp field value for use in documents."""
@@ -149,110 +455,174 @@ class FirebaseService:
 
     def query_collection_with_ids(self, collection: str, field: str = None, op: str = None, value=None) -> list:
         """Query documents and include document IDs in the results."""
-        # Build cache key
-        cache_key = f"{collection}:query_with_ids:{field}:{op}:{value}"
-        if cache_key in self._cache and (datetime.now() - self._cache_timestamp.get(cache_key, datetime.min)).total_seconds() < self._cache_expiry:
-            logger.info(f"Cache hit for query_with_ids {cache_key}")
-            return self._cache[cache_key]
+        cached = self._cached_query(collection, "query_with_ids", field, op, value)
+        if cached is not MISS:
+            return cached
+        cache_key = self._query_key(collection, "query_with_ids", field, op, value)
             
         def operation():
             col_ref = self.db.collection(collection)
             if field and op and value is not None:
                 query = col_ref.where(field, op, value)
-                docs = query.stream()
+                docs = query.stream(timeout=self._retry.timeout)
             else:
-                docs = col_ref.stream()
+                docs = col_ref.stream(timeout=self._retry.timeout)
                 
             result = []
             for doc in docs:
                 d = doc.to_dict()
                 d["id"] = doc.id
                 result.append(d)
+            metrics.record_query_reads(collection, len(result))
                 
             # Update cache
-            self._cache[cache_key] = result
-            self._cache_timestamp[cache_key] = datetime.now()
-            return result
+            where = (field, op, value) if field and op and value is not None else None
+            return self._cache.set(cache_key, result, meta={"kind": "list", "with_ids": True, "filter": where})
             
-        return self._retry_with_backoff(operation)
-
-    def batch_operation(self, operations: list):
-        """Perform a batch operation with multiple writes."""
-        # Invalidate any potentially affected cache entries
-        for op in operations:
-            collection = op.get("collection")
-            # Clear all cache entries for this collection
-            for key in list(self._cache.keys()):
-                if key.startswith(f"{collection}:"):
-                    del self._cache[key]
-                    
-        def operation():
-            batch = self.db.batch()
-            
-            for op in operations:
-                op_type = op.get("type")
-                collection = op.get("collection")
-                doc_id = op.get("doc_id")
-                data = op.get("data", {})
-                
-                if not collection or not op_type:
-                    continue
-                    
-                if op_type == "create":
-                    doc_ref = self.db.collection(collection).document(doc_id) if doc_id else self.db.collection(collection).document()
-                    batch.set(doc_ref, data)
-                elif op_type == "update" and doc_id:
-                    doc_ref = self.db.collection(collection).document(doc_id)
-                    batch.update(doc_ref, data)
-                elif op_type == "delete" and doc_id:
-                    doc_ref = self.db.collection(collection).document(doc_id)
-                    batch.delete(doc_ref)
-                    
-            # Commit the batch
-            return batch.commit()
+        return self._fetch(cache_key, collection, operation)
+
+    def batch_operation(self, operations: list) -> list:
+        """
+        Perform multiple writes.
+        
+        Operations are split into Firestore-sized batches that are committed in
+        parallel (in order when a document is written by several of them);
+        only batches that fail transiently are retried.
+        
+        Args:
+            operations: List of {"type", "collection", "doc_id", "data"} dicts
             
-        return self._retry_with_backoff(operation)
+        Returns:
+            One result per operation with "success", "error" and the "doc_id" written
+        """
+        results = BulkWriter(self.db, retry=self._retry, quota=self._quota).commit(operations)
+        self._write_through_batch(operations, results)
+        return results
+
+    def _write_through_batch(self, operations: list, results: list):
+        """Apply the successful writes of a batch_operation to the cache."""
+        for op, result in zip(operations, results):
+            if result["success"]:
+                metrics.record_writes(result["collection"])
+                change = "set" if result["type"] in ("create", "set") else result["type"]
+                self._write_through(result["collection"], result["doc_id"], change, op.get("data"))
     
-    def get_all_documents(self, collection: str) -> list:
+    def get_all_documents(self, collection: str, fields: list = None) -> list:
         """
         Get all documents from a collection with their IDs
         
         Args:
             collection: Collection name
+            fields: Optional field paths to fetch (e.g. ["basic_info.Location"]).
+                Only these fields are transferred (Firestore select()) and the
+                result is cached separately per projection.
             
         Returns:
             List of documents with their IDs
         """
-        # Check cache first
-        cache_key = f"{collection}:all"
-        if cache_key in self._cache and (datetime.now() - self._cache_timestamp.get(cache_key, datetime.min)).total_seconds() < self._cache_expiry:
-            logger.info(f"Cache hit for all documents in {collection}")
-            return self._cache[cache_key]
+        cached = self._cached_all_documents(collection, fields)
+        if cached is not MISS:
+            return cached
             
+        cache_key = self._all_documents_key(collection, fields)
         try:
-            def operation():
-                col_ref = self.db.collection(collection)
-                docs = col_ref.stream()
-                
-                result = []
-                for doc in docs:
-                    data = doc.to_dict()
-                    data["id"] = doc.id
-                    result.append(data)
-                
-                # Update cache
-                self._cache[cache_key] = result
-                self._cache_timestamp[cache_key] = datetime.now()
-                return result
-                
-            return self._retry_with_backoff(operation)
+            return self._load_all_documents(collection, cache_key, fields)
         except Exception as e:
             logger.error(f"Error getting all documents from {collection}: {str(e)}")
             # Return cached data if available, even if expired
-            if cache_key in self._cache:
+            stale = self._cache.get(cache_key, allow_stale=True)
+            if stale is not None:
                 logger.warning(f"Returning expired cached data for {collection} after error")
-                return self._cache[cache_key]
+                return stale
             return []
+
+    def _cached_all_documents(self, collection: str, fields: list = None):
+        """
+        Answer get_all_documents without waiting on Firestore, or return MISS.
+        A cached copy past its refresh-ahead point is served while a background
+        refresh runs (stale-while-revalidate).
+        """
+        # Served from the live replica when one is running for this collection
+        replica = get_replica(collection)
+        if replica is not None:
+            return replica.projected(fields) if fields else replica.documents()
+            
+        if fields:
+            # A fresh copy of the whole collection already has the fields
+            full = self._cache.get(f"{collection}:all")
+            if full is not None:
+                return [project(doc, fields) for doc in full]
+            
+        cache_key = self._all_documents_key(collection, fields)
+        entry = self._cache.get_entry(cache_key)
+        if entry is None:
+            return MISS
+        if entry.age < entry.ttl * REFRESH_AHEAD_RATIO:
+            logger.debug(f"Cache hit for all documents in {collection}")
+            return entry.value
+        if not self._quota.allow_refresh():
+            # Conserving reads: keep serving what we have, however old
+            if entry.expired:
+                self._cache.note_stale_hit(cache_key)
+            return entry.value
+        if entry.age < entry.ttl * STALE_WHILE_REVALIDATE_RATIO:
+            # Serve what we have and refresh in the background
+            if entry.expired:
+                self._cache.note_stale_hit(cache_key)
+            self._schedule_refresh(cache_key, lambda: self._load_all_documents(collection, cache_key, fields))
+            return entry.value
+        return MISS
+
+    @staticmethod
+    def _all_documents_key(collection: str, fields: list = None) -> str:
+        if fields:
+            return f"{collection}:all:select:{','.join(sorted(fields))}"
+        return f"{collection}:all"
+
+    def _load_all_documents(self, collection: str, cache_key: str, fields: list = None) -> list:
+        """Stream a whole collection (optionally projected) from Firestore and store it in the cache."""
+        def operation():
+            query = self.db.collection(collection)
+            if fields:
+                query = query.select(fields)
+            docs = query.stream(timeout=self._retry.timeout)
+            
+            result = []
+            for doc in docs:
+                data = doc.to_dict()
+                data["id"] = doc.id
+                result.append(data)
+            metrics.record_query_reads(collection, len(result))
+            
+            # Update cache
+            meta = {"kind": "list", "with_ids": True, "filter": None} if not fields else {"kind": "projection", "fields": list(fields)}
+            return self._cache.set(cache_key, result, meta=meta)
+            
+        return self._flights.do(cache_key, lambda: self._retry_with_backoff(operation, collection))
+
+    def _schedule_refresh(self, cache_key: str, loader):
+        """Run loader in the background unless a refresh of cache_key is already running."""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            
+        def run():
+            try:
+                loader()
+                logger.info(f"Background refresh of {cache_key} completed")
+            except Exception as e:
+                logger.warning(f"Background refresh of {cache_key} failed: {str(e)}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+                    
+        try:
+            _refresh_executor.submit(run)
+        except RuntimeError:
+            # Executor shut down (interpreter exiting)
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
     
     def find_documents_containing(self, collection: str, field: str, value: str) -> list:
         """
@@ -269,18 +639,7 @@ class FirebaseService:
         """
         try:
             # Get all documents from the collection (will use cache if available)
-            docs = self.get_all_documents(collection)
-            
-            # Filter on the client side
-            results = []
-            pattern = re.compile(re.escape(value), re.IGNORECASE)
-            
-            for doc in docs:
-                if field in doc and isinstance(doc[field], str):
-                    if pattern.search(doc[field]):
-                        results.append(doc)
-            
-            return results
+            return containing(self.get_all_documents(collection), field, value)
         except Exception as e:
             logger.error(f"Error finding documents containing '{value}' in {collection}.{field}: {str(e)}")
             return []
@@ -304,7 +663,7 @@ class FirebaseService:
                 "timestamp": self.get_server_timestamp()
             }
             
-            self.create_document("chatbot_feedback", data)
+            self.create_document("chatbot_feedback", data, critical=False)
             logger.info(f"Stored chatbot feedback for message {message_id}")
             
         except Exception as e:
@@ -330,7 +689,7 @@ class FirebaseService:
                 "timestamp": self.get_server_timestamp()
             }
             
-            return self.create_document("chatbot_queries", data)
+            return self.create_document("chatbot_queries", data, critical=False)
             
         except Exception as e:
             logger.error(f"Error storing chatbot query: {str(e)}")
@@ -344,13 +703,21 @@ class FirebaseService:
             collection: Collection name (or None to clear all)
         """
         if collection:
-            prefix = f"{collection}:"
-            for key in list(self._cache.keys()):
-                if key.startswith(prefix):
-                    del self._cache[key]
-                    if key in self._cache_timestamp:
-                        del self._cache_timestamp[key]
+            self._cache.invalidate_collection(collection)
+            versions.bump(collection)
         else:
             self._cache.clear()
-            self._cache_timestamp.clear()
+            versions.bump_all()
             logger.info("Cleared all cache")
+
+    def get_cache_stats(self) -> dict:
+        """Return hit/miss/eviction statistics for the cache."""
+        return self._cache.stats()
+
+    def get_single_flight_stats(self) -> dict:
+        """Return how many fetches ran and how many concurrent callers they saved."""
+        return self._flights.stats()
+
+    def get_quota_status(self) -> dict:
+        """Return the daily Firestore budget usage and degradation state."""
+        return self._quota.status()
@@ -0,0 +1,199 @@
+# app/services/metrics_service.py
+import threading
+import contextvars
+from collections import defaultdict
+
+# Route template of the request being handled ("/api/universities/{university_id}").
+# Work outside a request (scheduler, background refreshes, scripts) is labelled "background".
+current_route = contextvars.ContextVar("current_route", default="background")
+
+# Firestore bills one read for a query that returns no documents
+MIN_QUERY_READS = 1
+
+# Aggregation queries (count()) are billed one read per batch of up to 1000 index entries
+COUNT_ENTRIES_PER_READ = 1000
+
+
+def _escape(value) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    Process-wide counters of Firestore usage.
+
+    Document reads and writes are counted per collection and per route so
+    quota usage can be attributed to endpoints; HTTP requests are counted per
+    route so reads per request can be derived.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reads = defaultdict(int)      # (collection, route) -> documents read
+        self.writes = defaultdict(int)     # (collection, route) -> documents written
+        self.requests = defaultdict(int)   # (route, status) -> requests
+        self.retries = defaultdict(int)    # collection -> retried Firestore calls
+        self.breaker_transitions = defaultdict(int)  # (collection, from, to) -> transitions
+        # Objects with note_reads(collection, count) / note_writes(collection, count)
+        self._observers = []
+
+    def add_observer(self, observer):
+        """Forward every recorded read and write to observer (e.g. the quota governor)."""
+        self._observers.append(observer)
+
+    def record_reads(self, collection: str, count: int, route: str = None):
+        """Count documents read from Firestore by the current route."""
+        if count <= 0:
+            return
+        key = (collection, route or current_route.get())
+        with self._lock:
+            self.reads[key] += count
+        for observer in self._observers:
+            observer.note_reads(collection, count)
+
+    def record_query_reads(self, collection: str, returned: int, route: str = None):
+        """Count the reads billed for a query that returned `returned` documents."""
+        self.record_reads(collection, max(MIN_QUERY_READS, returned), route)
+
+    def record_count_reads(self, collection: str, counted: int, route: str = None):
+        """Count the reads billed for an aggregation query that counted `counted` documents."""
+        self.record_reads(collection, max(MIN_QUERY_READS, -(-counted // COUNT_ENTRIES_PER_READ)), route)
+
+    def record_writes(self, collection: str, count: int = 1, route: str = None):
+        """Count documents written to Firestore by the current route."""
+        if count <= 0:
+            return
+        key = (collection, route or current_route.get())
+        with self._lock:
+            self.writes[key] += count
+        for observer in self._observers:
+            observer.note_writes(collection, count)
+
+    def record_request(self, route: str, status: int):
+        with self._lock:
+            self.requests[(route, status)] += 1
+
+    def record_retry(self, collection: str):
+        with self._lock:
+            self.retries[collection] += 1
+
+    def record_breaker_transition(self, collection: str, from_state: str, to_state: str):
+        with self._lock:
+            self.breaker_transitions[(collection, from_state, to_state)] += 1
+
+    def reset(self):
+        with self._lock:
+            self.reads.clear()
+            self.writes.clear()
+            self.requests.clear()
+            self.retries.clear()
+            self.breaker_transitions.clear()
+
+    def snapshot(self) -> dict:
+        """Return a copy of the counters."""
+        with self._lock:
+            return {
+                "reads": dict(self.reads),
+                "writes": dict(self.writes),
+                "requests": dict(self.requests),
+                "retries": dict(self.retries),
+                "breaker_transitions": dict(self.breaker_transitions),
+            }
+
+    def render(self, cache_stats: dict = None, flight_stats: dict = None, quota_status: dict = None,
+               breakers: dict = None, response_cache_stats: dict = None) -> str:
+        """
+        Render the counters, plus cache, single-flight, quota, circuit breaker
+        and response cache statistics, in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+
+        metric("firestore_document_reads_total", "counter", "Documents read from Firestore.",
+               [({"collection": c, "route": r}, n) for (c, r), n in sorted(snapshot["reads"].items())])
+        metric("firestore_document_writes_total", "counter", "Documents written to Firestore.",
+               [({"collection": c, "route": r}, n) for (c, r), n in sorted(snapshot["writes"].items())])
+        metric("http_requests_total", "counter", "HTTP requests handled.",
+               [({"route": r, "status": s}, n) for (r, s), n in sorted(snapshot["requests"].items())])
+        metric("firestore_retries_total", "counter", "Firestore calls retried after a transient failure.",
+               [({"collection": c}, n) for c, n in sorted(snapshot["retries"].items())])
+        metric("circuit_breaker_transitions_total", "counter", "Circuit breaker state changes.",
+               [({"collection": c, "from": f, "to": t}, n)
+                for (c, f, t), n in sorted(snapshot["breaker_transitions"].items())])
+        if breakers is not None:
+            levels = {"closed": 0, "half_open": 1, "open": 2}
+            metric("circuit_breaker_state", "gauge", "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+                   [({"collection": c}, levels[state]) for c, state in sorted(breakers.items())])
+
+        if cache_stats is not None:
+            metric("cache_hits_total", "counter", "Cache lookups served from the cache.", [({}, cache_stats["hits"])])
+            metric("cache_misses_total", "counter", "Cache lookups that missed.", [({}, cache_stats["misses"])])
+            metric("cache_expirations_total", "counter", "Lookups that found an expired entry.", [({}, cache_stats["expirations"])])
+            metric("cache_evictions_total", "counter", "Entries evicted to stay within the size bounds.", [({}, cache_stats["evictions"])])
+            metric("cache_stale_serves_total", "counter", "Expired entries served (stale-while-revalidate or error fallback).", [({}, cache_stats["stale_hits"])])
+            metric("cache_entries", "gauge", "Entries held in the cache.", [({}, cache_stats["entries"])])
+            metric("cache_bytes", "gauge", "Estimated bytes held in the cache.", [({}, cache_stats["bytes"])])
+            metric("cache_max_entries", "gauge", "Configured entry bound.", [({}, cache_stats["max_entries"])])
+            metric("cache_max_bytes", "gauge", "Configured byte bound.", [({}, cache_stats["max_bytes"])])
+            metric("cache_collection_entries", "gauge", "Entries held per collection.",
+                   [({"collection": c}, n) for c, n in sorted(cache_stats["collections"].items())])
+            shared = cache_stats.get("shared")
+            if shared:
+                metric("shared_cache_hits_total", "counter", "Lookups served by the cross-worker cache.", [({}, shared["hits"])])
+                metric("shared_cache_misses_total", "counter", "Lookups that missed the cross-worker cache.", [({}, shared["misses"])])
+                metric("shared_cache_errors_total", "counter", "Cross-worker cache errors.", [({}, shared["errors"])])
+                if shared["rows"] is not None:
+                    metric("shared_cache_rows", "gauge", "Rows in the cross-worker cache.", [({}, shared["rows"])])
+                    metric("shared_cache_bytes", "gauge", "Serialized bytes in the cross-worker cache.", [({}, shared["bytes"])])
+
+        if flight_stats is not None:
+            metric("single_flight_fetches_total", "counter", "Firestore fetches run for cache misses.", [({}, flight_stats["fetches"])])
+            metric("single_flight_coalesced_total", "counter", "Callers that shared another caller's fetch.",
+                   [({"collection": c}, n) for c, n in sorted(flight_stats["coalesced_by_collection"].items())])
+            metric("single_flight_in_flight", "gauge", "Fetches currently running.", [({}, flight_stats["in_flight"])])
+
+        if quota_status is not None:
+            levels = {"normal": 0, "conserve": 1, "critical": 2}
+            metric("quota_used", "gauge", "Firestore operations used today by this worker.",
+                   [({"kind": kind}, quota_status[kind]["used"]) for kind in ("reads", "writes")])
+            metric("quota_budget", "gauge", "This worker's share of the daily Firestore budget.",
+                   [({"kind": kind}, quota_status[kind]["budget"]) for kind in ("reads", "writes")])
+            metric("quota_state", "gauge", "Quota state (0 normal, 1 conserve, 2 critical).",
+                   [({"kind": kind}, levels[quota_status[kind]["state"]]) for kind in ("reads", "writes")])
+            metric("quota_deferred_writes", "gauge", "Non-critical writes waiting for quota.", [({}, quota_status["deferred_writes"])])
+
+        if response_cache_stats is not None:
+            metric("response_cache_hits_total", "counter", "Responses sent from stored encoded bodies.", [({}, response_cache_stats["hits"])])
+            metric("response_cache_misses_total", "counter", "Cacheable responses that had to be built.", [({}, response_cache_stats["misses"])])
+            metric("response_cache_evictions_total", "counter", "Encoded bodies evicted to stay within the size bounds.", [({}, response_cache_stats["evictions"])])
+            metric("response_cache_entries", "gauge", "Encoded bodies held.", [({}, response_cache_stats["entries"])])
+            metric("response_cache_bytes", "gauge", "Bytes of encoded bodies held.", [({}, response_cache_stats["bytes"])])
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def render_metrics() -> str:
+    """Render the metrics of this process, including the default cache."""
+    from app.services.cache_service import get_default_cache
+    from app.services.single_flight import get_default_flights
+    from app.services.quota_governor import quota
+    from app.services.retry_policy import breaker_states
+    from app.utils.response_cache import response_cache
+    return metrics.render(get_default_cache().stats(), get_default_flights().stats(), quota.status(), breaker_states(),
+                          response_cache.stats())
@@ -0,0 +1,102 @@
+# app/services/pagination.py
+import json
+import base64
+import binascii
+import threading
+from bisect import bisect_right
+
+from app.services.catalog_replica import get_field
+
+# Firestore's name for the document ID in order_by()/cursors
+DOCUMENT_ID = "__name__"
+
+_sorted_lock = threading.Lock()
+# order_by -> (source list, sort keys, sorted documents) of the last local pagination
+_sorted_memo = {}
+
+
+def encode_cursor(order_by: str, doc: dict) -> str:
+    """Build the opaque token pointing just after doc."""
+    value = get_field(doc, order_by) if order_by else None
+    payload = json.dumps([order_by, value, doc["id"]], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, order_by: str) -> tuple:
+    """
+    Decode a cursor token into (order value, document ID).
+
+    Raises:
+        ValueError: If the token is malformed or was issued for another ordering
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_order_by, value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error, UnicodeError) as e:
+        raise ValueError(f"Malformed cursor: {str(e)}")
+    if cursor_order_by != order_by or not isinstance(doc_id, str):
+        raise ValueError("Cursor does not belong to this listing")
+    return value, doc_id
+
+
+def _sort_key(doc: dict, order_by: str):
+    if order_by:
+        return (get_field(doc, order_by), doc["id"])
+    return (doc["id"],)
+
+
+def _sorted(documents: list, order_by: str):
+    """Sort documents like the Firestore query would, reusing the last sort of the same list."""
+    with _sorted_lock:
+        memo = _sorted_memo.get(order_by)
+        if memo is not None and memo[0] is documents:
+            return memo[1], memo[2]
+    candidates = documents
+    if order_by:
+        # Firestore leaves out documents without the ordering field
+        candidates = [doc for doc in documents if get_field(doc, order_by) is not None]
+    try:
+        ordered = sorted(candidates, key=lambda doc: _sort_key(doc, order_by))
+    except TypeError:
+        # Mixed value types; order by their text instead
+        ordered = sorted(candidates, key=lambda doc: tuple(str(part) for part in _sort_key(doc, order_by)))
+    keys = [_sort_key(doc, order_by) for doc in ordered]
+    with _sorted_lock:
+        _sorted_memo[order_by] = (documents, keys, ordered)
+    return keys, ordered
+
+
+def ordered(documents: list, order_by: str = None) -> list:
+    """Return documents in the order of the keyset listing (order_by, then ID), sorted once per list."""
+    return _sorted(documents, order_by)[1]
+
+
+def paginate(documents: list, limit: int, after: tuple = None, order_by: str = None) -> dict:
+    """
+    Cut a keyset page out of a locally available collection.
+
+    Args:
+        documents: All documents of the collection (with 'id')
+        limit: Page size
+        after: Decoded cursor (order value, document ID), or None for the first page
+        order_by: Field the listing is ordered by (then by ID); None orders by ID
+
+    Returns:
+        {"items": [...], "next_cursor": token or None, "total": number of documents listed}
+    """
+    keys, ordered = _sorted(documents, order_by)
+    start = 0
+    if after is not None:
+        value, doc_id = after
+        key = (value, doc_id) if order_by else (doc_id,)
+        try:
+            start = bisect_right(keys, key)
+        except TypeError:
+            start = next((i + 1 for i, doc in enumerate(ordered) if doc["id"] == doc_id), 0)
+    items = ordered[start:start + limit]
+    has_more = start + limit < len(ordered)
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(order_by, items[-1]) if has_more and items else None,
+        "total": len(ordered),
+    }
@@ -5,6 +5,8 @@ import logging
 from firebase_admin import firestore
 from datetime import datetime
 
+from app.utils.deadlines import parse_deadline, with_deadline_iso
+
 logger = logging.getLogger(__name__)
 
 def extract_dates_ignore_tables(soup):
@@ -36,7 +38,7 @@ def scrape_qau_university():
         default_iso_deadline = "2025-01-31"
         # Check if the deadline has passed to set admissionOpen flag
         current_date = datetime.now()
-        default_deadline_date = datetime.strptime(default_iso_deadline, "%Y-%m-%d")
+        default_deadline_date = parse_deadline(default_iso_deadline)
         default_admission_open = default_deadline_date > current_date
         
         # Initialize data structure
@@ -53,6 +55,7 @@ def scrape_qau_university():
             "apply_link": "https://qau.edu.pk/admission-notice-for-mphil-ms-programme-spring-semester-2025/",
             "url": "https://qau.edu.pk/",
             "scraped_at": firestore.SERVER_TIMESTAMP,
+            "updated_at": firestore.SERVER_TIMESTAMP,
             "admissionOpen": default_admission_open
         }
         
@@ -103,16 +106,14 @@ def scrape_qau_university():
                                     phd_programs.append(discipline)
                 
                 # Get deadline date from page content
-                dates = extract_dates_ignore_tables(prog_soup)
+                dates = [date for date in map(parse_deadline, set(extract_dates_ignore_tables(prog_soup))) if date]
                 if dates:
-                    raw_deadline = sorted(set(dates))[0]  # Get the earliest date
-                    # Convert DD-MM-YYYY to YYYY-MM-DD for JavaScript compatibility
-                    parts = raw_deadline.split("-")
-                    iso_deadline = f"{parts[2]}-{parts[1]}-{parts[0]}"
+                    deadline_date = min(dates)  # Get the earliest date
+                    # YYYY-MM-DD for JavaScript compatibility
+                    iso_deadline = deadline_date.strftime("%Y-%m-%d")
                     university_data["basic_info"]["Deadline to Apply"] = iso_deadline
                     
                     # Update admission status based on deadline
-                    deadline_date = datetime.strptime(iso_deadline, "%Y-%m-%d")
                     current_date = datetime.now()
                     university_data["admissionOpen"] = deadline_date > current_date
                     logger.info(f"Updated deadline: {iso_deadline}, Admission open: {university_data['admissionOpen']}")
@@ -174,6 +175,7 @@ def store_qau_in_firestore(db, data):
     if not data or not data.get("name"):
         logger.error("No valid QAU data to store in Firestore.")
         return None
+    with_deadline_iso(data)
     
     try:
         # Check if QAU already exists in Firestore
@@ -0,0 +1,225 @@
+# app/services/quota_governor.py
+import os
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from app.services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+# Spark plan limits: 50,000 document reads and 20,000 writes per day
+DAILY_READ_BUDGET = int(os.getenv("FIRESTORE_DAILY_READS", "50000"))
+DAILY_WRITE_BUDGET = int(os.getenv("FIRESTORE_DAILY_WRITES", "20000"))
+
+# Fraction of the budget used at which the governor starts conserving / goes critical
+CONSERVE_AT = float(os.getenv("FIRESTORE_QUOTA_CONSERVE_AT", "0.8"))
+CRITICAL_AT = float(os.getenv("FIRESTORE_QUOTA_CRITICAL_AT", "0.95"))
+
+# The daily quota is shared by every worker; each one governs its share
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+MAX_DEFERRED_WRITES = 1000
+
+# How long (seconds) a quota rejection from Firestore keeps the governor
+# critical; doubled, up to the maximum, each time the next probe is rejected too
+QUOTA_BACKOFF_SECONDS = float(os.getenv("FIRESTORE_QUOTA_BACKOFF_SECONDS", "60"))
+QUOTA_BACKOFF_MAX_SECONDS = float(os.getenv("FIRESTORE_QUOTA_BACKOFF_MAX_SECONDS", "3600"))
+
+NORMAL = "normal"
+CONSERVE = "conserve"
+CRITICAL = "critical"
+
+try:
+    from zoneinfo import ZoneInfo
+    # Firestore quotas reset at midnight Pacific time
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+
+class QuotaGovernor:
+    """
+    Tracks this worker's share of the daily Firestore read/write budget.
+
+    Reads and writes are fed in by the metrics counters. Each budget is in one
+    of three states:
+
+    - normal: everything goes to Firestore as usual
+    - conserve (CONSERVE_AT of the budget used): reads serve expired cache
+      entries instead of refetching, background refreshes stop and
+      non-critical writes are queued until the next quota day
+    - critical (CRITICAL_AT used, or Firestore rejected a request for quota
+      in the last backoff window): as conserve; only cache misses and
+      critical writes reach Firestore
+
+    A rejection may be a short rate-limit burst rather than the daily quota,
+    so it only holds the governor critical for QUOTA_BACKOFF_SECONDS. After
+    that, requests go through again and act as probes; if the first one is
+    rejected too, the next window is twice as long (up to
+    QUOTA_BACKOFF_MAX_SECONDS).
+    """
+
+    def __init__(self, read_budget: int = DAILY_READ_BUDGET, write_budget: int = DAILY_WRITE_BUDGET,
+                 conserve_at: float = CONSERVE_AT, critical_at: float = CRITICAL_AT, workers: int = WORKERS,
+                 max_deferred: int = MAX_DEFERRED_WRITES, backoff: float = QUOTA_BACKOFF_SECONDS,
+                 max_backoff: float = QUOTA_BACKOFF_MAX_SECONDS):
+        self.read_budget = max(1, read_budget // workers)
+        self.write_budget = max(1, write_budget // workers)
+        self.workers = workers
+        self.conserve_at = conserve_at
+        self.critical_at = critical_at
+        self._lock = threading.Lock()
+        self._day = self._today()
+        self._reads = 0
+        self._writes = 0
+        self.base_backoff = backoff
+        self.max_backoff = max(backoff, max_backoff)
+        self._backoff = backoff
+        # time.monotonic() until which Firestore is considered out of quota
+        self._exhausted_until = 0.0
+        self._deferred = deque()
+        self._max_deferred = max_deferred
+        self._dropped = 0
+        self._last_states = (NORMAL, NORMAL)
+
+    @staticmethod
+    def _today():
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    def _roll(self):
+        """Start a new quota day if midnight Pacific has passed (lock must be held)."""
+        today = self._today()
+        if today != self._day:
+            logger.info(f"Firestore quota day rolled over; {self._reads} reads and {self._writes} writes used on {self._day}")
+            self._day = today
+            self._reads = 0
+            self._writes = 0
+            self._exhausted_until = 0.0
+            self._backoff = self.base_backoff
+
+    @property
+    def _exhausted(self) -> bool:
+        return time.monotonic() < self._exhausted_until
+
+    def _state(self, used: int, budget: int) -> str:
+        if self._exhausted or used >= budget * self.critical_at:
+            return CRITICAL
+        if used >= budget * self.conserve_at:
+            return CONSERVE
+        return NORMAL
+
+    def _check_transition(self):
+        """Log when either budget changes state (lock must be held)."""
+        states = (self._state(self._reads, self.read_budget), self._state(self._writes, self.write_budget))
+        if states != self._last_states:
+            logger.warning(f"Firestore quota state changed: reads {self._last_states[0]} -> {states[0]}, "
+                           f"writes {self._last_states[1]} -> {states[1]}")
+            self._last_states = states
+
+    def note_reads(self, collection: str, count: int):
+        with self._lock:
+            self._roll()
+            self._reads += count
+            self._check_transition()
+
+    def note_writes(self, collection: str, count: int):
+        with self._lock:
+            self._roll()
+            self._writes += count
+            self._check_transition()
+
+    def note_exhausted(self):
+        """Firestore rejected a request for quota; stay critical for a backoff window."""
+        with self._lock:
+            self._roll()
+            now = time.monotonic()
+            if now < self._exhausted_until:
+                # Already backing off; requests made meanwhile don't extend it
+                return
+            if self._exhausted_until and now - self._exhausted_until < self._backoff:
+                # The first requests after the last window were rejected too
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+            else:
+                self._backoff = self.base_backoff
+            self._exhausted_until = now + self._backoff
+            logger.warning(f"Firestore rejected a request for quota; conserving for {self._backoff:.0f} seconds")
+            self._check_transition()
+
+    def read_state(self) -> str:
+        with self._lock:
+            self._roll()
+            return self._state(self._reads, self.read_budget)
+
+    def write_state(self) -> str:
+        with self._lock:
+            self._roll()
+            return self._state(self._writes, self.write_budget)
+
+    def serve_stale(self) -> bool:
+        """True if expired cache entries should be served instead of refetched."""
+        return self.read_state() != NORMAL
+
+    def allow_refresh(self) -> bool:
+        """True if background refreshes of cached data may spend reads."""
+        return self.read_state() == NORMAL
+
+    def defer_writes(self) -> bool:
+        """True if non-critical writes should be queued instead of sent."""
+        return self.write_state() != NORMAL
+
+    def defer(self, operation: dict):
+        """Queue a non-critical write (batch_operation format). The oldest is dropped when full."""
+        with self._lock:
+            if len(self._deferred) >= self._max_deferred:
+                dropped = self._deferred.popleft()
+                self._dropped += 1
+                logger.warning(f"Deferred write queue full, dropped {dropped['type']} of "
+                               f"{dropped['collection']}/{dropped['doc_id']}")
+            self._deferred.append(operation)
+
+    def has_deferred(self) -> bool:
+        with self._lock:
+            return bool(self._deferred)
+
+    def take_deferred(self) -> list:
+        """Return and clear the queued writes, or [] while writes are still being conserved."""
+        if self.defer_writes():
+            return []
+        with self._lock:
+            operations = list(self._deferred)
+            self._deferred.clear()
+            return operations
+
+    def status(self) -> dict:
+        """Return the budgets, usage and state for the admin dashboard."""
+        with self._lock:
+            self._roll()
+            return {
+                "day": self._day.isoformat(),
+                "reads": {
+                    "used": self._reads,
+                    "budget": self.read_budget,
+                    "state": self._state(self._reads, self.read_budget),
+                },
+                "writes": {
+                    "used": self._writes,
+                    "budget": self.write_budget,
+                    "state": self._state(self._writes, self.write_budget),
+                },
+                "exhausted": self._exhausted,
+                "exhausted_seconds_left": round(max(0.0, self._exhausted_until - time.monotonic())),
+                "deferred_writes": len(self._deferred),
+                "dropped_writes": self._dropped,
+                "workers": self.workers,
+            }
+
+
+quota = QuotaGovernor()
+metrics.add_observer(quota)
+
+# For local storage backends: no daily budget, never degrades
+unmetered = QuotaGovernor(read_budget=sys.maxsize, write_budget=sys.maxsize, workers=1)
@@ -0,0 +1,229 @@
+# app/services/retry_policy.py
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+
+from app.services.metrics_service import metrics
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - installed with firebase-admin
+    google_exceptions = None
+
+logger = logging.getLogger(__name__)
+
+# Per-attempt timeout (seconds) for a Firestore call
+FIRESTORE_TIMEOUT = float(os.getenv("FIRESTORE_TIMEOUT", "10"))
+
+# Consecutive transient failures that open a collection's breaker, and how long
+# (seconds) it stays open before letting a trial request through
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("FIRESTORE_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("FIRESTORE_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# gRPC status codes worth retrying; anything else (invalid argument, not found
+# on update, permission denied) fails the same way every time
+RETRYABLE_STATUS_CODES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "ABORTED")
+
+# The same errors as raised by google-api-core, plus dropped connections
+RETRYABLE_EXCEPTIONS = (ConnectionError,)
+if google_exceptions is not None:
+    RETRYABLE_EXCEPTIONS += (
+        google_exceptions.TooManyRequests,  # includes ResourceExhausted
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.Aborted,
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Firestore while a collection's breaker is open."""
+
+
+def status_code(error: Exception):
+    """Return the gRPC status code name of a Firestore error (e.g. "UNAVAILABLE"), or None."""
+    code = getattr(error, "grpc_status_code", None)
+    if code is None and callable(getattr(error, "code", None)):
+        # A raw grpc.RpcError
+        try:
+            code = error.code()
+        except Exception:
+            code = None
+    return getattr(code, "name", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Return True for transient Firestore errors."""
+    return isinstance(error, RETRYABLE_EXCEPTIONS) or status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True if Firestore rejected the request for quota (429 / RESOURCE_EXHAUSTED)."""
+    if google_exceptions is not None and isinstance(error, google_exceptions.TooManyRequests):
+        return True
+    return status_code(error) == "RESOURCE_EXHAUSTED"
+
+
+def is_transient(error: Exception) -> bool:
+    """Timeouts and errors worth retrying (quota, unavailable, deadline exceeded...)."""
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or is_retryable(error)
+
+
+class CircuitBreaker:
+    """
+    Per-collection circuit breaker.
+
+    After `failure_threshold` consecutive transient failures the breaker opens
+    and calls fail fast with CircuitOpenError (callers serve cached data). After
+    `reset_timeout` seconds one trial call is let through (half-open); its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _transition(self, state: str):
+        """Change state (lock must be held)."""
+        if state == self._state:
+            return
+        previous, self._state = self._state, state
+        metrics.record_breaker_transition(self.name, previous, state)
+        if state == OPEN:
+            logger.warning(f"Circuit breaker for '{self.name}' opened after {self._failures} failure(s); "
+                           f"serving cached data for {self.reset_timeout:.0f} seconds")
+        else:
+            logger.info(f"Circuit breaker for '{self.name}' {previous} -> {state}")
+
+    def allow(self) -> bool:
+        """Return True if a call may go to Firestore now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+                self._trial_in_flight = True
+                return True
+            # Half-open: only the trial call goes through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for a collection."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> dict:
+    """Return {collection: state} for every breaker created so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.state for breaker in breakers}
+
+
+class RetryPolicy:
+    """
+    Retries transient Firestore failures with capped, jittered exponential
+    backoff, guarded by the collection's circuit breaker.
+
+    Non-transient errors (not found, invalid argument, permission denied) are
+    raised immediately and don't count against the breaker.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 4.0,
+                 timeout: float = FIRESTORE_TIMEOUT):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry `attempt` (1-based): capped exponential with jitter."""
+        return min(self.max_delay, self.base_delay * (2 ** (attempt - 1))) * (0.5 + random.random() / 2)
+
+    def _failed(self, error: Exception, attempt: int, collection: str, breaker: CircuitBreaker, on_quota_error) -> float:
+        """
+        Record a failed attempt. Returns the delay before the next attempt, or
+        raises when the error shouldn't (or can't) be retried.
+        """
+        reason = str(error) or type(error).__name__
+        if not is_transient(error):
+            if breaker is not None:
+                # Firestore answered; the backend is healthy
+                breaker.record_success()
+            raise error
+        if breaker is not None:
+            breaker.record_failure()
+        if is_quota_error(error) and on_quota_error is not None:
+            on_quota_error()
+        if attempt > self.max_retries:
+            logger.error(f"Giving up on {collection or 'Firestore'} after {attempt} attempt(s): {reason}")
+            raise error
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker for '{collection}' is open") from error
+        delay = self.delay(attempt)
+        metrics.record_retry(collection or "unknown")
+        logger.warning(f"Firestore call on {collection or 'unknown'} failed ({reason}). "
+                       f"Retrying after {delay:.2f} seconds. Retry {attempt}/{self.max_retries}")
+        return delay
+
+    def run(self, operation, collection: str = None, on_quota_error=None):
+        """Call operation() with retries. The per-attempt timeout is passed to Firestore by the caller."""
+        breaker = get_breaker(collection) if collection else None
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker for '{collection}' is open")
+        attempt = 0
+        while True:
+            try:
+                result = operation()
+            except Exception as e:
+                attempt += 1
+                time.sleep(self._failed(e, attempt, collection, breaker, on_quota_error))
+                continue
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -18,12 +18,19 @@ import traceback
 # Handle imports differently based on how the script is run
 try:
     from app.utils.text_processing import clean_university_name
+    from app.utils.deadlines import with_deadline_iso
+    from app.services.bulk_writer import BulkWriter
 except ModuleNotFoundError:
     # When running as a standalone script, adjust import path
     sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     try:
         from app.utils.text_processing import clean_university_name
+        from app.utils.deadlines import with_deadline_iso
+        from app.services.bulk_writer import BulkWriter
     except ModuleNotFoundError:
+        # Without the app package, universities are stored one at a time
+        BulkWriter = None
+        
         # If still fails, define a simple fallback function
         def clean_university_name(name):
             if not name:
@@ -32,6 +39,10 @@ except ModuleNotFoundError:
             name = name.strip()
             return name
 
+        # Without deadline_iso, readers parse the raw deadline instead
+        def with_deadline_iso(data):
+            return data
+
 # Setup logging
 logger = logging.getLogger("scraper")
 if not logger.handlers:
@@ -127,6 +138,7 @@ def scrape_university_page(url):
             "apply_link": "",
             "url": url,
             "scraped_at": firestore.SERVER_TIMESTAMP,
+            "updated_at": firestore.SERVER_TIMESTAMP,
             "admissionOpen": True  # Default to true for new/updated universities
         }
 
@@ -227,15 +239,51 @@ def scrape_university_page(url):
         print(f"Error parsing {url}: {e}")
         return None
 
+# Scraped universities are written in batches of this size
+STORE_BATCH_SIZE = 25
+
+def university_doc_id(data):
+    """Derive the document ID from the university URL (e.g., 67f51adc67c7579713621086 from /university/67f51adc67c7579713621086)."""
+    url_parts = data["url"].split("/")
+    return url_parts[-1] if url_parts[-1] else str(uuid.uuid4())
+
+def store_many_in_firestore(universities):
+    """
+    Store several scraped universities using parallel batched writes.
+    Returns the document IDs in the same order (None where storing failed).
+    """
+    if BulkWriter is None:
+        return [store_in_firestore(data) for data in universities]
+    
+    valid = [with_deadline_iso(data) for data in universities if data and data.get("name")]
+    operations = [
+        {"type": "set", "collection": "universities", "doc_id": university_doc_id(data), "data": data}
+        for data in valid
+    ]
+    
+    try:
+        results = BulkWriter(db).commit(operations)
+    except Exception as e:
+        print(f"Error storing data in Firestore: {e}")
+        return [None] * len(universities)
+    
+    stored = {}
+    for data, result in zip(valid, results):
+        if result["success"]:
+            print(f"Successfully stored data for {data['name']} in Firestore (ID: {result['doc_id']})")
+            stored[id(data)] = result["doc_id"]
+        else:
+            print(f"Error storing data for {data['name']} in Firestore: {result['error']}")
+    return [stored.get(id(data)) for data in universities]
+
 def store_in_firestore(data):
     if not data or not data.get("name"):
         print("No valid data to store in Firestore.")
         return None
     
     try:
-        # Extract document ID from URL (e.g., 67f51adc67c7579713621086 from /university/67f51adc67c7579713621086)
-        url_parts = data["url"].split("/")
-        doc_id = url_parts[-1] if url_parts[-1] else str(uuid.uuid4())
+        doc_id = university_doc_id(data)
+        with_deadline_iso(data)
 
         # Store in Firestore
         doc_ref = db.collection("universities").document(doc_id)
@@ -319,18 +367,27 @@ def scrape_all_universities():
             print("No university links found. Exiting.")
             return []
 
-        # Process each university link
+        def flush(pending):
+            for data, doc_id in zip(pending, store_many_in_firestore(pending)):
+                if doc_id:
+                    data["id"] = doc_id
+                    scraped_universities.append(data)
+            pending.clear()
+
+        # Process each university link, storing results in batches
+        pending = []
         for i, link in enumerate(links, start=1):
             print(f"--- Processing {i}/{len(links)}: {link} ---")
             data = scrape_university_page(link)
             if data:
-                doc_id = store_in_firestore(data)
-                if doc_id:
-                    data["id"] = doc_id
-                    scraped_universities.append(data)
+                pending.append(data)
+                if len(pending) >= STORE_BATCH_SIZE:
+                    flush(pending)
             else:
                 print("No data found or error occurred.")
             print("\n")
+        if pending:
+            flush(pending)
         
         print(f"Scraping completed. Scraped {len(scraped_universities)} universities.")
         return scraped_universities
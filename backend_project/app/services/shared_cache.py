@@ -0,0 +1,336 @@
+# app/services/shared_cache.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from app.services.storage_backend import encode_document, decode_document
+
+logger = logging.getLogger(__name__)
+
+# Path of the SQLite file shared by all workers on the host; empty disables the tier
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_MAX_ROWS = int(os.getenv("SHARED_CACHE_MAX_ROWS", "20000"))
+
+# Rows are kept past their TTL (for stale fallbacks) until this many TTLs have elapsed
+STALE_ROW_TTLS = 2.0
+
+# Prune expired and excess rows every PRUNE_INTERVAL writes
+PRUNE_INTERVAL = 500
+
+# Bumped when the layout of the store changes; files of another version are emptied on open
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    kind TEXT,
+    version INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    ttl REAL NOT NULL,
+    meta TEXT,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_collection ON entries (collection);
+CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at);
+CREATE TABLE IF NOT EXISTS generations (
+    collection TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+
+class SharedRow:
+    """An entry read back from the shared store."""
+    __slots__ = ("key", "value", "age", "ttl", "meta", "version")
+
+    def __init__(self, key, value, age, ttl, meta, version):
+        self.key = key
+        self.value = value
+        self.age = age
+        self.ttl = ttl
+        self.meta = meta
+        self.version = version
+
+
+class SharedCacheStore:
+    """
+    Second-level cache shared by every process on the host.
+
+    Entries live in a SQLite database in WAL mode (readers never block the
+    writer) with the file memory-mapped, so a worker that misses its own
+    in-memory cache can pick up what a sibling worker already fetched instead
+    of reading Firestore again. Values and meta are stored as JSON (see
+    storage_backend.encode_document), never as pickles, so whoever can write
+    the file can't make the workers run code; the reading cache rebuilds the
+    read-only containers and CatalogRecords.
+
+    Every collection has a generation number that is bumped whenever one of
+    its documents is written or its entries are patched, deleted or
+    invalidated, and rows record the generation they were written under.
+    Workers poll the generations to find out that their in-memory copies of
+    a collection are outdated.
+
+    The store is best-effort: any SQLite error is logged and treated as a miss.
+    """
+
+    def __init__(self, path: str, max_rows: int = SHARED_CACHE_MAX_ROWS, mmap_size: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_rows = max_rows
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._migrate(self._connection())
+
+    @staticmethod
+    def _migrate(conn):
+        """Create the tables, dropping those of a store written with another SCHEMA_VERSION (it's only a cache)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS entries")
+                conn.execute("DROP TABLE IF EXISTS generations")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections can't be shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _error(self, action: str, e: Exception):
+        self._count("errors")
+        logger.warning(f"Shared cache {action} failed: {str(e)}")
+
+    @staticmethod
+    def _bump(conn, collection: str) -> int:
+        conn.execute(
+            "INSERT INTO generations (collection, generation) VALUES (?, 1) "
+            "ON CONFLICT(collection) DO UPDATE SET generation = generation + 1",
+            (collection,),
+        )
+        return conn.execute("SELECT generation FROM generations WHERE collection = ?", (collection,)).fetchone()[0]
+
+    @staticmethod
+    def _generation(conn, collection: str) -> int:
+        row = conn.execute("SELECT generation FROM generations WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def _row(self, row) -> SharedRow:
+        key, version, stored_at, ttl, meta, value = row
+        return SharedRow(
+            key,
+            decode_document(value),
+            max(0.0, time.time() - stored_at),
+            ttl,
+            decode_document(meta) if meta is not None else None,
+            version,
+        )
+
+    def get(self, key: str):
+        """Return the SharedRow for key (possibly expired), or None."""
+        try:
+            row = self._connection().execute(
+                "SELECT key, version, stored_at, ttl, meta, value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self._count("hits")
+            return self._row(row)
+        except (sqlite3.Error, ValueError) as e:
+            self._error("read", e)
+            return None
+
+    def drop_for_write(self, collection: str, key: str, keep=()) -> int:
+        """
+        Remove the rows a write to the document at key makes outdated - its own
+        row and every result row (lists, projections, pages, counts) of the
+        collection - except the keys in keep, and advance the collection's
+        generation. Rows are selected by their kind, without being loaded.
+
+        Returns:
+            The new generation, or None on error
+        """
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM entries WHERE collection = ? AND (key = ? OR kind IS NOT 'doc') "
+                    "AND key NOT IN (SELECT value FROM json_each(?))",
+                    (collection, key, json.dumps(list(keep))),
+                )
+                generation = self._bump(conn, collection)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return generation
+        except sqlite3.Error as e:
+            self._error("delete", e)
+            return None
+
+    def put(self, key: str, collection: str, value, ttl: float, age: float = 0.0, meta: dict = None, bump: bool = False) -> int:
+        """
+        Store a value. With bump=True the write is a change to existing data and
+        the collection's generation is advanced so other workers drop their copies.
+
+        Returns:
+            The collection generation after the write, or None on error
+        """
+        try:
+            payload = encode_document(value)
+            meta_payload = encode_document(meta) if meta is not None else None
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = self._bump(conn, collection) if bump else self._generation(conn, collection)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, collection, kind, version, stored_at, ttl, meta, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, collection, (meta or {}).get("kind"), generation, time.time() - age, ttl,
+                     meta_payload, payload),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._error("write", e)
+            return None
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_INTERVAL == 0
+        if prune:
+            self.prune()
+        return generation
+
+    def delete(self, key: str, collection: str) -> int:
+        """Remove a key and advance its collection's generation. Returns the new generation."""
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                generation = self._bump(conn, collection)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return generation
+        except sqlite3.Error as e:
+            self._error("delete", e)
+            return None
+
+    def invalidate_collection(self, collection: str) -> int:
+        """Remove every row of a collection and advance its generation. Returns the new generation."""
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries WHERE collection = ?", (collection,))
+                generation = self._bump(conn, collection)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return generation
+        except sqlite3.Error as e:
+            self._error("invalidate", e)
+            return None
+
+    def clear(self):
+        """Remove every row and advance the generation of every known collection."""
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM entries")
+                conn.execute("UPDATE generations SET generation = generation + 1")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._error("clear", e)
+
+    def generations(self) -> dict:
+        """Return {collection: generation} for every collection written so far."""
+        try:
+            return dict(self._connection().execute("SELECT collection, generation FROM generations").fetchall())
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return {}
+
+    def prune(self):
+        """Drop rows past their stale window, then the oldest rows beyond max_rows."""
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM entries WHERE stored_at + ttl * ? < ?", (STALE_ROW_TTLS, time.time()))
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+        except sqlite3.Error as e:
+            self._error("prune", e)
+
+    def stats(self) -> dict:
+        """Return shared store statistics."""
+        try:
+            rows, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            rows = size = None
+        with self._lock:
+            return {
+                "path": self.path,
+                "rows": rows,
+                "bytes": size,
+                "max_rows": self.max_rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+            }
+
+
+def open_shared_store(path: str = SHARED_CACHE_PATH):
+    """Open the shared store at path, or return None if it is disabled or can't be opened."""
+    if not path:
+        return None
+    try:
+        store = SharedCacheStore(path)
+        logger.info(f"Shared cache tier enabled at {path}")
+        return store
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Shared cache tier disabled, could not open {path}: {str(e)}")
+        return None
@@ -0,0 +1,133 @@
+# app/services/single_flight.py
+import asyncio
+import logging
+import threading
+from collections import deque
+
+from app.services.cache_service import collection_of
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight fetch that other callers can wait on."""
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Per-key request coalescing.
+
+    The first caller for a key runs the fetch; callers arriving while it is in
+    flight block until it finishes and share its result (or its exception)
+    instead of issuing their own Firestore reads.
+    """
+
+    def __init__(self, history: int = 50):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._waiters_async = {}
+        self.fetches = 0
+        self.coalesced = 0
+        self._coalesced_by_collection = {}
+        # (key, callers saved) for the most recent fetches that saved at least one read
+        self._recent = deque(maxlen=history)
+
+    def do(self, key: str, fn):
+        """Run fn() for key, or wait for the fetch already in flight and return its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            call.event.set()
+            self._record(key, waiters)
+
+    async def do_async(self, key: str, fn):
+        """
+        Awaitable variant of do(): fn is a coroutine function run once per key at a time.
+
+        fn is expected to run a fetch that records itself (e.g. a FirebaseService
+        read in a worker thread, which goes through do()), so only the callers
+        sharing it are counted here. It runs as its own task: a caller that is
+        cancelled (e.g. its client disconnected) only stops waiting, and the
+        fetch goes on for the other callers.
+        """
+        task = self._async_calls.get(key)
+        if task is not None:
+            with self._lock:
+                self._waiters_async[key] = self._waiters_async.get(key, 0) + 1
+        else:
+            task = asyncio.ensure_future(self._run_async(key, fn))
+            # Mark the exception as retrieved when every caller stopped waiting
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._async_calls[key] = task
+        return await asyncio.shield(task)
+
+    async def _run_async(self, key: str, fn):
+        """Run the fetch of do_async and retire it when done."""
+        try:
+            return await fn()
+        finally:
+            del self._async_calls[key]
+            self._record(key, self._waiters_async.pop(key, 0), fetched=False)
+
+    def _record(self, key: str, waiters: int, fetched: bool = True):
+        """Record a finished fetch and the number of callers it served."""
+        with self._lock:
+            if fetched:
+                self.fetches += 1
+            if waiters:
+                self.coalesced += waiters
+                collection = collection_of(key)
+                self._coalesced_by_collection[collection] = self._coalesced_by_collection.get(collection, 0) + waiters
+                self._recent.append((key, waiters))
+        if waiters:
+            logger.info(f"Fetch of {key} was shared with {waiters} concurrent caller(s)")
+
+    def stats(self) -> dict:
+        """Return the number of fetches run and the callers they saved."""
+        with self._lock:
+            return {
+                "fetches": self.fetches,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_by_collection": dict(self._coalesced_by_collection),
+                "recent": [{"key": key, "saved": saved} for key, saved in self._recent],
+            }
+
+
+_default_flights = SingleFlight()
+
+
+def get_default_flights() -> SingleFlight:
+    """Return the SingleFlight shared by every FirebaseService using the default cache."""
+    return _default_flights
@@ -0,0 +1,838 @@
+# app/services/storage_backend.py
+import os
+import json
+import uuid
+import base64
+import sqlite3
+import logging
+import threading
+from enum import Enum
+from datetime import datetime, timezone
+from collections.abc import Mapping
+
+from app.services.catalog_replica import get_field, matches, project
+from app.services.write_through import apply_update, resolve_sentinels
+from app.utils.frozen import freeze
+
+logger = logging.getLogger(__name__)
+
+# Where documents live: "firestore" (default), "memory" or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore").strip().lower()
+SQLITE_STORAGE_PATH = os.getenv("SQLITE_STORAGE_PATH", "data/storage.db")
+
+# Fields the SQLite backend indexes (per collection)
+INDEXED_FIELDS = ("name", "user_id", "status", "deadline", "deadline_iso")
+
+# Firestore's name for the document ID in order_by()/cursors
+DOCUMENT_ID = "__name__"
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+# Refresh the SQLite planner statistics every ANALYZE_INTERVAL written documents;
+# without them SQLite prefers the primary key over the field indexes
+ANALYZE_INTERVAL = 500
+
+# How often the SQLite backend looks for writes made by other processes, and how
+# many changes it keeps for them to catch up from
+SQLITE_CHANGE_POLL_SECONDS = float(os.getenv("SQLITE_CHANGE_POLL_SECONDS", "1.0"))
+SQLITE_CHANGE_LOG_SIZE = 10000
+
+
+class DocumentNotFound(Exception):
+    """update() of a document that doesn't exist (Firestore's NOT_FOUND)."""
+
+
+class DocumentExists(Exception):
+    """create() of a document that already exists (Firestore's ALREADY_EXISTS)."""
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+
+
+class DocumentChange:
+    """One change delivered to an on_snapshot() listener."""
+    __slots__ = ("type", "document")
+
+    def __init__(self, change_type: ChangeType, document):
+        self.type = change_type
+        self.document = document
+
+
+class DocumentSnapshot:
+    """A document as read from a backend."""
+    __slots__ = ("reference", "_data")
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str):
+        return get_field(self._data or {}, field)
+
+
+class AggregationResult:
+    __slots__ = ("alias", "value")
+
+    def __init__(self, alias: str, value):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    """count() over a query; get() returns [[AggregationResult]] like Firestore."""
+
+    def __init__(self, query, alias: str = None):
+        self.query = query
+        self.alias = alias or "count"
+
+    def get(self, **kwargs):
+        return [[AggregationResult(self.alias, self.query.backend._count(self.query))]]
+
+
+class Query:
+    """
+    Firestore-style query: where / order_by / start_after / limit / select.
+    Queries are immutable; every method returns a new query. Ordering is
+    ascending and always ends with the document ID, as in Firestore.
+    """
+
+    def __init__(self, backend, collection: str, filters: tuple = (), orders: tuple = (),
+                 cursor: tuple = None, max_results: int = None, field_paths: tuple = None):
+        self.backend = backend
+        self.collection = collection
+        self.filters = filters
+        self.orders = orders
+        self.cursor = cursor
+        self.max_results = max_results
+        self.field_paths = field_paths
+
+    def _copy(self, **changes):
+        values = {
+            "filters": self.filters,
+            "orders": self.orders,
+            "cursor": self.cursor,
+            "max_results": self.max_results,
+            "field_paths": self.field_paths,
+        }
+        values.update(changes)
+        return Query(self.backend, self.collection, **values)
+
+    def where(self, field: str, op: str, value):
+        return self._copy(filters=self.filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = None):
+        if direction is not None and str(direction).upper().startswith("DESC"):
+            raise ValueError("Only ascending order is supported by this storage backend")
+        return self._copy(orders=self.orders + (field,))
+
+    def start_after(self, values):
+        """Start after a document snapshot or a {field: value} dict of the ordering fields."""
+        return self._copy(cursor=values)
+
+    def limit(self, count: int):
+        return self._copy(max_results=count)
+
+    def select(self, field_paths):
+        return self._copy(field_paths=tuple(field_paths))
+
+    def count(self, alias: str = None):
+        return AggregationQuery(self, alias)
+
+    def stream(self, **kwargs):
+        return self.backend._run(self)
+
+    def get(self, **kwargs):
+        return self.stream()
+
+    def ordering(self) -> tuple:
+        """The ordering fields, ending with the document ID."""
+        if DOCUMENT_ID in self.orders:
+            return self.orders
+        return self.orders + (DOCUMENT_ID,)
+
+    def cursor_values(self) -> tuple:
+        """Values of the start_after() cursor for a prefix of ordering(), or None."""
+        if self.cursor is None:
+            return None
+        values = []
+        for field in self.ordering():
+            if isinstance(self.cursor, DocumentSnapshot):
+                value = self.cursor.id if field == DOCUMENT_ID else self.cursor.get(field)
+            elif field in self.cursor:
+                value = self.cursor[field]
+                if field == DOCUMENT_ID:
+                    value = getattr(value, "id", value)
+            else:
+                break
+            values.append(value)
+        return tuple(values)
+
+
+class CollectionReference(Query):
+    def __init__(self, backend, collection: str):
+        super().__init__(backend, collection)
+
+    @property
+    def id(self) -> str:
+        return self.collection
+
+    def document(self, doc_id: str = None):
+        if doc_id is None:
+            doc_id = uuid.uuid4().hex[:20]
+        return DocumentReference(self.backend, self.collection, doc_id)
+
+    def on_snapshot(self, callback):
+        return self.backend._watch(self.collection, callback)
+
+
+class DocumentReference:
+    __slots__ = ("backend", "collection", "id")
+
+    def __init__(self, backend, collection: str, doc_id: str):
+        self.backend = backend
+        self.collection = collection
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self.collection}/{self.id}"
+
+    def get(self, **kwargs):
+        return self.backend.get_all([self])[0]
+
+    def set(self, data: dict, merge: bool = False, **kwargs):
+        self.backend._commit([("set", self, data, merge)])
+
+    def create(self, data: dict, **kwargs):
+        self.backend._commit([("create", self, data, False)])
+
+    def update(self, data: dict, **kwargs):
+        self.backend._commit([("update", self, data, False)])
+
+    def delete(self, **kwargs):
+        self.backend._commit([("delete", self, None, False)])
+
+
+class WriteBatch:
+    """Writes applied atomically by commit()."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._writes = []
+
+    def set(self, reference, data: dict, merge: bool = False):
+        self._writes.append(("set", reference, data, merge))
+
+    def create(self, reference, data: dict):
+        self._writes.append(("create", reference, data, False))
+
+    def update(self, reference, data: dict):
+        self._writes.append(("update", reference, data, False))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+
+    def commit(self, **kwargs):
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_WRITES} writes")
+        self.backend._commit(self._writes)
+        return [None] * len(self._writes)
+
+
+class _Watch:
+    def __init__(self, backend, collection: str, callback):
+        self._backend = backend
+        self._collection = collection
+        self._callback = callback
+
+    def unsubscribe(self):
+        self._backend._unwatch(self._collection, self._callback)
+
+
+def _merge(current: dict, data: dict) -> dict:
+    """set(..., merge=True): deep-merge maps, replace everything else."""
+    merged = dict(current)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), Mapping):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _sort_key(query: Query, doc_id: str, data: dict) -> tuple:
+    return tuple(doc_id if field == DOCUMENT_ID else get_field(data, field) for field in query.ordering())
+
+
+def evaluate(query: Query, documents, filters: tuple = None) -> list:
+    """
+    Run a query over (doc_id, data) pairs in Python: filter, order (documents
+    missing an ordering field are left out, as in Firestore), apply the
+    cursor and the limit. Returns the matching (doc_id, data) pairs.
+    """
+    filters = query.filters if filters is None else filters
+    fields = [field for field in query.orders if field != DOCUMENT_ID]
+    selected = [
+        (doc_id, data) for doc_id, data in documents
+        if all(matches(data, *f) for f in filters) and all(get_field(data, field) is not None for field in fields)
+    ]
+    try:
+        selected.sort(key=lambda item: _sort_key(query, *item))
+    except TypeError:
+        # Mixed value types; order by their text instead
+        selected.sort(key=lambda item: tuple(str(part) for part in _sort_key(query, *item)))
+    after = query.cursor_values()
+    if after:
+        def past_cursor(item):
+            try:
+                return _sort_key(query, *item)[:len(after)] > after
+            except TypeError:
+                return False
+        selected = [item for item in selected if past_cursor(item)]
+    if query.max_results is not None:
+        selected = selected[:query.max_results]
+    return selected
+
+
+class StorageBackend:
+    """
+    Storage behind FirebaseService.
+
+    A backend exposes the part of the Firestore client API that
+    FirebaseService, BulkWriter and the live replica use - collection(),
+    document references, where/order_by/start_after/limit/select/count
+    queries, get_all(), batch() and on_snapshot() - so the service works
+    unchanged on top of Firestore or a local store.
+
+    Local backends implement _read, _run, _count and _apply. Writes resolve
+    SERVER_TIMESTAMP and DELETE_FIELD; other transforms (Increment,
+    ArrayUnion...) are rejected. Snapshot listeners are notified in-process
+    after every commit; SQLiteBackend also delivers commits made by other
+    processes on the same database.
+    """
+
+    name = None
+
+    def __init__(self):
+        self._watchers = {}
+        self._watch_lock = threading.Lock()
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references, **kwargs) -> list:
+        """Read several documents; returns one snapshot per reference, in order."""
+        references = list(references)
+        found = self._read(references)
+        return [DocumentSnapshot(ref, found.get((ref.collection, ref.id))) for ref in references]
+
+    def close(self):
+        pass
+
+    def _read(self, references: list) -> dict:
+        """Return {(collection, doc_id): data} for the references that exist."""
+        raise NotImplementedError
+
+    def _run(self, query: Query) -> list:
+        """Run a query; returns DocumentSnapshots."""
+        raise NotImplementedError
+
+    def _count(self, query: Query) -> int:
+        return len(self._run(query))
+
+    def _apply(self, writes: list) -> list:
+        """Apply writes atomically; returns [(collection, doc_id, ChangeType, new data or None)]."""
+        raise NotImplementedError
+
+    def _snapshots(self, query: Query, rows) -> list:
+        snapshots = []
+        for doc_id, data in rows:
+            if query.field_paths is not None:
+                data = project(data, query.field_paths)
+            snapshots.append(DocumentSnapshot(DocumentReference(self, query.collection, doc_id), data))
+        return snapshots
+
+    @staticmethod
+    def _next_state(kind: str, reference, current, data, merge: bool):
+        """The document after one write, or None if it is deleted."""
+        if kind == "delete":
+            return None
+        if kind == "update":
+            if current is None:
+                raise DocumentNotFound(f"No document to update: {reference.path}")
+            return apply_update(current, data)
+        if kind == "create" and current is not None:
+            raise DocumentExists(f"Document already exists: {reference.path}")
+        resolved = resolve_sentinels(dict(data))
+        if merge and current is not None:
+            return _merge(current, resolved)
+        return resolved
+
+    def _commit(self, writes: list):
+        changes = self._apply(writes)
+        self._notify(changes)
+
+    def _watch(self, collection: str, callback):
+        """Register a listener and deliver the current documents as ADDED."""
+        with self._watch_lock:
+            self._watchers.setdefault(collection, []).append(callback)
+        current = self._run(self.collection(collection))
+        changes = [DocumentChange(ChangeType.ADDED, snapshot) for snapshot in current]
+        callback([], changes, datetime.now(timezone.utc))
+        return _Watch(self, collection, callback)
+
+    def _unwatch(self, collection: str, callback):
+        with self._watch_lock:
+            callbacks = self._watchers.get(collection, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def _notify(self, changes: list):
+        by_collection = {}
+        for collection, doc_id, change_type, data in changes:
+            snapshot = DocumentSnapshot(DocumentReference(self, collection, doc_id), data)
+            by_collection.setdefault(collection, []).append(DocumentChange(change_type, snapshot))
+        for collection, delivered in by_collection.items():
+            with self._watch_lock:
+                callbacks = list(self._watchers.get(collection, []))
+            for callback in callbacks:
+                try:
+                    callback([], delivered, datetime.now(timezone.utc))
+                except Exception as e:
+                    logger.error(f"Snapshot listener on '{collection}' failed: {str(e)}")
+
+
+class MemoryBackend(StorageBackend):
+    """Documents held in process memory (lost on restart). Useful for tests and benchmarks."""
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._collections = {}
+
+    def _read(self, references: list) -> dict:
+        with self._lock:
+            found = {}
+            for ref in references:
+                data = self._collections.get(ref.collection, {}).get(ref.id)
+                if data is not None:
+                    found[(ref.collection, ref.id)] = data
+            return found
+
+    def _run(self, query: Query) -> list:
+        with self._lock:
+            documents = list(self._collections.get(query.collection, {}).items())
+        return self._snapshots(query, evaluate(query, documents))
+
+    def _apply(self, writes: list) -> list:
+        with self._lock:
+            staged = {}
+            changes = []
+            for kind, reference, data, merge in writes:
+                key = (reference.collection, reference.id)
+                current = staged[key] if key in staged else self._collections.get(key[0], {}).get(key[1])
+                new = self._next_state(kind, reference, current, data, merge)
+                staged[key] = None if new is None else freeze(new)
+                if new is not None:
+                    changes.append((key[0], key[1], ChangeType.ADDED if current is None else ChangeType.MODIFIED, staged[key]))
+                elif current is not None:
+                    changes.append((key[0], key[1], ChangeType.REMOVED, None))
+            for (collection, doc_id), data in staged.items():
+                documents = self._collections.setdefault(collection, {})
+                if data is None:
+                    documents.pop(doc_id, None)
+                else:
+                    documents[doc_id] = data
+            return changes
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"{type(value).__name__} can't be stored")
+
+
+def _json_object(obj: dict):
+    if len(obj) == 1:
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__bytes__" in obj:
+            return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def encode_document(data: dict) -> str:
+    """Serialize a document to compact JSON, keeping datetimes and bytes recoverable."""
+    return json.dumps(data, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_document(text: str) -> dict:
+    """Parse a document serialized by encode_document."""
+    return json.loads(text, object_hook=_json_object)
+
+
+def _json_path(field: str) -> str:
+    """SQL string literal of the JSON path of a (dotted) field."""
+    parts = []
+    for part in field.split("."):
+        if part.isidentifier():
+            parts.append(part)
+        else:
+            parts.append('"' + part.replace('"', '\\"') + '"')
+    path = "$." + ".".join(parts)
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _field_sql(field: str) -> str:
+    """SQL for a field's value. Indexes and queries must produce identical text to share an index."""
+    if field == DOCUMENT_ID:
+        return "id"
+    return f"json_extract(data, {_json_path(field)})"
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _filter_sql(field: str, op: str, value):
+    """Translate a where() filter to (clause, params), or None to evaluate it in Python."""
+    expr = _field_sql(field)
+    if op in ("in", "not-in", "array-contains-any"):
+        if not isinstance(value, (list, tuple)) or not value or not all(_is_scalar(v) and v is not None for v in value):
+            return None
+        marks = ", ".join("?" * len(value))
+        if op == "in":
+            return f"{expr} IN ({marks})", list(value)
+        if op == "not-in":
+            return f"{expr} IS NOT NULL AND {expr} NOT IN ({marks})", list(value)
+        if field == DOCUMENT_ID:
+            return None
+        path = _json_path(field)
+        return (f"json_type(data, {path}) = 'array' AND EXISTS "
+                f"(SELECT 1 FROM json_each(data, {path}) AS item WHERE item.value IN ({marks}))", list(value))
+    if not _is_scalar(value):
+        return None
+    if value is None:
+        if op != "==" or field == DOCUMENT_ID:
+            return None
+        return f"json_type(data, {_json_path(field)}) = 'null'", []
+    if op == "==":
+        return f"{expr} = ?", [value]
+    if op == "!=":
+        return f"{expr} IS NOT NULL AND {expr} != ?", [value]
+    if op in ("<", "<=", ">", ">="):
+        return f"{expr} {op} ?", [value]
+    if op == "array-contains" and field != DOCUMENT_ID:
+        path = _json_path(field)
+        return (f"json_type(data, {path}) = 'array' AND EXISTS "
+                f"(SELECT 1 FROM json_each(data, {path}) AS item WHERE item.value = ?)", [value])
+    return None
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL
+);
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Documents stored as JSON in a local SQLite database (WAL mode).
+
+    INDEXED_FIELDS get expression indexes on (collection, field), so equality
+    and range filters and ordering on them don't scan the collection. Filters
+    on other fields are evaluated by SQLite's JSON functions; filters it can't
+    express (e.g. on timestamps) are applied in Python.
+
+    Every commit also appends the changed document IDs to a `changes` log
+    (the last SQLITE_CHANGE_LOG_SIZE are kept). Once a listener is
+    registered, a thread checks PRAGMA data_version every
+    SQLITE_CHANGE_POLL_SECONDS and delivers the logged changes committed by
+    other processes (other SQLiteBackend instances), so a replica kept by
+    one worker sees the writes of scripts and the other workers.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_STORAGE_PATH):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._writes_lock = threading.Lock()
+        self._writes = 0
+        # Bumped by analyze(); connections of other threads reload the statistics when it changes
+        self._stats_version = 0
+        # Tags this instance's entries in the change log; the poller skips them
+        self._origin = uuid.uuid4().hex
+        self._poller = None
+        self._stopped = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SQLITE_SCHEMA)
+        for field in INDEXED_FIELDS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS documents_by_{field} ON documents (collection, {_field_sql(field)})")
+        self.analyze()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections can't be shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Sample at most this many index rows when gathering statistics
+            conn.execute("PRAGMA analysis_limit=1000")
+            self._local.conn = conn
+            self._local.stats_version = self._stats_version
+        elif self._local.stats_version != self._stats_version:
+            self._local.stats_version = self._stats_version
+            conn.execute("ANALYZE sqlite_schema")
+        return conn
+
+    def analyze(self):
+        """Gather the statistics the query planner uses to pick an index."""
+        try:
+            self._connection().execute("ANALYZE")
+            self._stats_version += 1
+            self._local.stats_version = self._stats_version
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite ANALYZE failed: {str(e)}")
+
+    def close(self):
+        self._stopped.set()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _read(self, references: list) -> dict:
+        found = {}
+        by_collection = {}
+        for ref in references:
+            by_collection.setdefault(ref.collection, []).append(ref.id)
+        conn = self._connection()
+        for collection, ids in by_collection.items():
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT id, data FROM documents WHERE collection = ? AND id IN ({', '.join('?' * len(chunk))})",
+                    [collection] + chunk,
+                ).fetchall()
+                for doc_id, data in rows:
+                    found[(collection, doc_id)] = decode_document(data)
+        return found
+
+    def _where(self, query: Query):
+        """Split the query's filters into SQL (clauses, params) and the ones left for Python."""
+        clauses = ["collection = ?"]
+        params = [query.collection]
+        residual = []
+        for field, op, value in query.filters:
+            translated = _filter_sql(field, op, value)
+            if translated is None:
+                residual.append((field, op, value))
+            else:
+                clauses.append(translated[0])
+                params.extend(translated[1])
+        return clauses, params, tuple(residual)
+
+    def _run(self, query: Query) -> list:
+        clauses, params, residual = self._where(query)
+        after = query.cursor_values()
+        if residual or (after and not all(_is_scalar(v) for v in after)):
+            # Let Python do the rest once SQL has narrowed the candidates
+            rows = self._connection().execute(
+                f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)}", params
+            ).fetchall()
+            documents = [(doc_id, decode_document(data)) for doc_id, data in rows]
+            return self._snapshots(query, evaluate(query, documents, residual))
+
+        ordering = [_field_sql(field) for field in query.ordering()]
+        for field in query.orders:
+            if field != DOCUMENT_ID:
+                clauses.append(f"{_field_sql(field)} IS NOT NULL")
+        if after:
+            columns = ordering[:len(after)]
+            clauses.append(f"({', '.join(columns)}) > ({', '.join('?' * len(after))})")
+            params.extend(after)
+        sql = f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)} ORDER BY {', '.join(ordering)}"
+        if query.max_results is not None:
+            sql += " LIMIT ?"
+            params.append(query.max_results)
+        rows = self._connection().execute(sql, params).fetchall()
+        return self._snapshots(query, [(doc_id, decode_document(data)) for doc_id, data in rows])
+
+    def _count(self, query: Query) -> int:
+        clauses, params, residual = self._where(query)
+        if residual or query.cursor is not None or query.orders or query.max_results is not None:
+            return len(self._run(query))
+        sql = f"SELECT COUNT(*) FROM documents WHERE {' AND '.join(clauses)}"
+        return self._connection().execute(sql, params).fetchone()[0]
+
+    def _apply(self, writes: list) -> list:
+        conn = self._connection()
+        changes = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for kind, reference, data, merge in writes:
+                row = conn.execute(
+                    "SELECT data FROM documents WHERE collection = ? AND id = ?", (reference.collection, reference.id)
+                ).fetchone()
+                current = decode_document(row[0]) if row else None
+                new = self._next_state(kind, reference, current, data, merge)
+                if new is None:
+                    if current is not None:
+                        conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?",
+                                     (reference.collection, reference.id))
+                        changes.append((reference.collection, reference.id, ChangeType.REMOVED, None))
+                    continue
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                    (reference.collection, reference.id, encode_document(new)),
+                )
+                change = ChangeType.ADDED if current is None else ChangeType.MODIFIED
+                changes.append((reference.collection, reference.id, change, new))
+            conn.executemany(
+                "INSERT INTO changes (origin, collection, id) VALUES (?, ?, ?)",
+                [(self._origin, collection, doc_id) for collection, doc_id, _, _ in changes],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._writes_lock:
+            before = self._writes
+            self._writes += len(writes)
+            analyze = before // ANALYZE_INTERVAL != self._writes // ANALYZE_INTERVAL
+        if analyze:
+            conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?",
+                         (SQLITE_CHANGE_LOG_SIZE,))
+            self.analyze()
+        return changes
+
+    def _watch(self, collection: str, callback):
+        with self._watch_lock:
+            if self._poller is None:
+                # Changes logged from here on are delivered; earlier ones are in the listener's first delivery
+                seen = self._connection().execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+                self._poller = threading.Thread(target=self._poll_changes, args=(seen,), daemon=True,
+                                                name="sqlite-changes")
+                self._poller.start()
+        return super()._watch(collection, callback)
+
+    def _poll_changes(self, seen: int):
+        """Deliver changes committed by other processes after `seen` to this instance's listeners."""
+        conn = self._connection()
+        version = None
+        while not self._stopped.wait(SQLITE_CHANGE_POLL_SECONDS):
+            try:
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current == version:
+                    continue
+                version = current
+                seen = self._deliver_changes(conn, seen)
+            except Exception as e:
+                logger.error(f"Reading the SQLite change log failed: {str(e)}")
+
+    def _deliver_changes(self, conn, seen: int) -> int:
+        """Notify the changes logged after `seen` by other processes; returns the last sequence read."""
+        rows = conn.execute("SELECT seq, origin, collection, id FROM changes WHERE seq > ? ORDER BY seq",
+                            (seen,)).fetchall()
+        if not rows:
+            return seen
+        with self._watch_lock:
+            watched = {collection for collection, callbacks in self._watchers.items() if callbacks}
+        oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        references = {}
+        if oldest > seen + 1:
+            # The log was trimmed past what this instance has read: re-deliver the
+            # watched collections whole (documents removed meanwhile are found by
+            # the replica's verification)
+            logger.warning("SQLite change log trimmed before it was read; re-delivering watched collections")
+            for collection in watched:
+                for snapshot in self._run(self.collection(collection)):
+                    references[(collection, snapshot.id)] = snapshot.reference
+        for _, origin, collection, doc_id in rows:
+            if origin != self._origin and collection in watched:
+                references[(collection, doc_id)] = DocumentReference(self, collection, doc_id)
+        found = self._read(list(references.values()))
+        changes = []
+        for key in references:
+            data = found.get(key)
+            changes.append((key[0], key[1], ChangeType.REMOVED if data is None else ChangeType.MODIFIED, data))
+        self._notify(changes)
+        return rows[-1][0]
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(kind: str = None):
+    """
+    Return the process-wide storage backend.
+
+    Args:
+        kind: "firestore", "memory" or "sqlite"; defaults to STORAGE_BACKEND
+
+    Returns:
+        The Firestore client, or the shared MemoryBackend / SQLiteBackend
+    """
+    kind = (kind or STORAGE_BACKEND).lower()
+    if kind == "firestore":
+        # Imported here so the FIREBASE_EMULATOR mock patched in by init_firebase() is picked up
+        from firebase_admin import firestore
+        return firestore.client()
+    with _backends_lock:
+        backend = _backends.get(kind)
+        if backend is None:
+            if kind == "memory":
+                backend = MemoryBackend()
+            elif kind == "sqlite":
+                backend = SQLiteBackend()
+                logger.info(f"Using SQLite storage at {backend.path}")
+            else:
+                raise ValueError(f"Unknown storage backend '{kind}' (expected firestore, memory or sqlite)")
+            _backends[kind] = backend
+        return backend
+
+
+def is_local_backend(db) -> bool:
+    """True for the memory and SQLite backends (no Firestore quota)."""
+    return isinstance(db, StorageBackend)
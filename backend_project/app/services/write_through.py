@@ -0,0 +1,179 @@
+# app/services/write_through.py
+import logging
+from datetime import datetime, timezone
+from firebase_admin import firestore
+from app.services.catalog_replica import matches, project
+
+logger = logging.getLogger(__name__)
+
+# Field transforms whose result can only be known by reading the document back
+_UNRESOLVABLE_TRANSFORMS = ("ArrayUnion", "ArrayRemove", "Increment", "Maximum", "Minimum")
+
+
+class UnresolvableWrite(Exception):
+    """The effect of a write on cached data can't be computed locally."""
+
+
+def resolve_sentinels(value):
+    """Replace write sentinels with the value Firestore will store (approximately)."""
+    if value is firestore.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if type(value).__name__ in _UNRESOLVABLE_TRANSFORMS:
+        raise UnresolvableWrite(type(value).__name__)
+    if isinstance(value, dict):
+        return {k: resolve_sentinels(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_sentinels(v) for v in value]
+    return value
+
+
+def apply_update(document: dict, data: dict) -> dict:
+    """
+    Return a copy of document with an update() applied.
+    Keys may be dotted field paths ("basic_info.Location"); nested maps along
+    the path are copied so the original document is never mutated.
+    """
+    delete_field = getattr(firestore, "DELETE_FIELD", None)
+    updated = dict(document)
+    for path, value in data.items():
+        parts = path.split(".")
+        target = updated
+        for part in parts[:-1]:
+            child = target.get(part)
+            child = dict(child) if isinstance(child, dict) else {}
+            target[part] = child
+            target = child
+        if delete_field is not None and value is delete_field:
+            target.pop(parts[-1], None)
+        else:
+            target[parts[-1]] = resolve_sentinels(value)
+    return updated
+
+
+def _touches(data: dict, field: str) -> bool:
+    """True if an update writes to field (or a parent/child path of it)."""
+    for path in data:
+        if path == field or field.startswith(path + ".") or path.startswith(field + "."):
+            return True
+    return False
+
+
+def _find_base(entries: list, doc_id: str):
+    """Find the current version of a document anywhere in the cached entries."""
+    for entry in entries:
+        meta = entry.meta or {}
+        if meta.get("kind") == "doc" and meta.get("id") == doc_id:
+            return dict(entry.value)
+    for entry in entries:
+        meta = entry.meta or {}
+        if meta.get("kind") == "list" and meta.get("with_ids"):
+            for item in entry.value:
+                if item.get("id") == doc_id:
+                    base = dict(item)
+                    base.pop("id", None)
+                    return base
+    return None
+
+
+def apply_write(cache, collection: str, doc_id: str, change: str, data: dict = None) -> int:
+    """
+    Patch cached entries of a collection after a successful write instead of
+    dropping them.
+
+    The cached document, the cached collection snapshot and every cached
+    filtered result that can be evaluated locally are updated in place
+    (copy-on-write, keeping their age). Entries that can't be patched, such as
+    query results without document IDs, are invalidated.
+
+    Args:
+        cache: CacheService
+        collection: Collection written to
+        doc_id: ID of the written document
+        change: "set" (create/overwrite), "update" or "delete"
+        data: Written fields (for "set" and "update")
+
+    Returns:
+        Number of cache entries patched or invalidated
+    """
+    with cache.write_lock:
+        entries = cache.entries_for_write(collection, doc_id)
+        if not entries and change != "set":
+            return 0
+
+        document = None
+        if change == "set":
+            document = resolve_sentinels(data or {})
+        elif change == "update":
+            base = _find_base(entries, doc_id)
+            if base is not None:
+                document = apply_update(base, data or {})
+            else:
+                # Validate sentinels even when only list items get patched
+                resolve_sentinels(data or {})
+
+        touched = 0
+        doc_key = f"{collection}:{doc_id}"
+        if change == "set":
+            cache.set(doc_key, document, meta={"kind": "doc", "id": doc_id}, bump=True)
+            touched += 1
+
+        for entry in entries:
+            meta = entry.meta or {}
+            kind = meta.get("kind")
+
+            if kind == "doc":
+                if meta.get("id") != doc_id or change == "set":
+                    continue
+                if change == "delete" or document is None:
+                    cache.delete(entry.key)
+                else:
+                    cache.replace(entry.key, document)
+                touched += 1
+                continue
+
+            if kind not in ("list", "projection") or (kind == "list" and not meta.get("with_ids")):
+                # Results we can't patch per document (no IDs, counts...)
+                cache.delete(entry.key)
+                touched += 1
+                continue
+
+            items = entry.value
+            index = next((i for i, item in enumerate(items) if item.get("id") == doc_id), None)
+            where = meta.get("filter")
+
+            if change == "delete":
+                if index is not None:
+                    cache.replace(entry.key, items[:index] + items[index + 1:])
+                    touched += 1
+                continue
+
+            if document is not None:
+                new_item = dict(document)
+                new_item["id"] = doc_id
+            elif index is not None:
+                new_item = apply_update(items[index], data or {})
+            elif where and _touches(data or {}, where[0]):
+                # Unknown document may now match the filter
+                cache.delete(entry.key)
+                touched += 1
+                continue
+            else:
+                continue
+
+            if kind == "projection":
+                new_item = project(new_item, meta["fields"])
+            keep = where is None or matches(new_item, *where)
+            if index is not None and keep:
+                patched = list(items)
+                patched[index] = new_item
+            elif index is not None:
+                patched = items[:index] + items[index + 1:]
+            elif keep:
+                patched = list(items)
+                patched.append(new_item)
+            else:
+                continue
+            cache.replace(entry.key, patched)
+            touched += 1
+
+        return touched
@@ -0,0 +1,117 @@
+# app/utils/compression.py
+"""
+Negotiated response compression.
+
+Responses of at least COMPRESSION_MIN_SIZE bytes with a text-like content
+type are sent gzip- or brotli-compressed, depending on the request's
+Accept-Encoding (brotli preferred when the `brotli` package is installed).
+Bodies held by the response cache are compressed once, at a higher level,
+and the compressed variant is kept next to them; other responses are
+compressed per request at a faster level.
+"""
+import os
+import gzip
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is in requirements.txt
+    brotli = None
+
+# Smaller bodies fit in a few packets anyway; compressing them only costs CPU
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Levels used per request and for bodies compressed once and then reused
+GZIP_LEVEL = 6
+GZIP_CACHED_LEVEL = 9
+BROTLI_QUALITY = 4
+BROTLI_CACHED_QUALITY = 9
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+ENCODINGS = ("br", "gzip")
+
+
+def negotiate(request: Request):
+    """Return the encoding to send ("br", "gzip") per the request's Accept-Encoding, or None."""
+    header = request.headers.get("accept-encoding")
+    if not header:
+        return None
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = None
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Compress body with encoding ("br" or "gzip"); cached selects the slower, denser level."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_CACHED_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag of the encoded variant of a body: a strong ETag may not be shared between encodings."""
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def base_etag(etag: str) -> str:
+    """Strip the encoding suffix added by variant_etag."""
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def add_vary(headers: dict):
+    """Add Accept-Encoding to a header dict's Vary."""
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+def compressible(headers) -> bool:
+    """True if a response with these headers may be compressed."""
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+async def compress_response(request: Request, response):
+    """
+    Compress a response from call_next if the client accepts an encoding and
+    the body is large enough. Responses that are already encoded (e.g. served
+    from the response cache's compressed variants) are returned unchanged.
+    """
+    if response.status_code != 200 or not compressible(response.headers):
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    if len(body) >= COMPRESSION_MIN_SIZE:
+        add_vary(headers)
+        encoding = negotiate(request)
+        if encoding is not None:
+            body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            if "etag" in headers:
+                headers["etag"] = variant_etag(headers["etag"], encoding)
+    return Response(content=body, status_code=response.status_code, headers=headers)
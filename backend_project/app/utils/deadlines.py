@@ -0,0 +1,149 @@
+# app/utils/deadlines.py
+"""
+Deadline normalization.
+
+University deadlines arrive in whatever format the source page uses:
+"2025-01-31", "31-01-2025", "31/01/2025", "31 Jan 2025", "31st January 2025",
+"January 31, 2025", "2025-01-31T17:00:00Z"... Everything that reads them goes
+through this module:
+
+- parse_deadline() tries precompiled patterns for the common numeric formats
+  first, and falls back to a memoized free-text parser for the rest.
+- normalize_deadline() returns the date as "YYYY-MM-DD".
+- with_deadline_iso() stores that as a document's `deadline_iso` field when
+  the document is written (scrapers, imports, the admin create route), so
+  readers only do a fromisoformat on it (see document_deadline()).
+
+Numeric dates other than YYYY-MM-DD are read day first (DD-MM-YYYY, the
+format used by the universities' pages), so "01/02/2025" is 1 February.
+"""
+import re
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from collections.abc import Mapping
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Field holding the normalized deadline
+DEADLINE_ISO_FIELD = "deadline_iso"
+
+# Distinct free-text deadlines remembered by the fallback parser
+DEADLINE_CACHE_SIZE = 4096
+
+# Fast path: YYYY-MM-DD and DD-MM-YYYY (also with / or . separators)
+_YMD = re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+_DMY = re.compile(r"(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})")
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+    "january": 1, "february": 2, "march": 3, "april": 4, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+
+_WEEKDAY = r"(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)[a-z]*,?\s+"
+_ORDINAL = re.compile(r"(\d)(?:st|nd|rd|th)\b")
+# 31 January 2025, 31 Jan, 2025, 31-Jan-2025
+_DAY_MONTH_YEAR = re.compile(rf"(?:{_WEEKDAY})?(\d{{1,2}})(?:\s+of)?[\s\-/]+([a-z]+)\.?,?[\s\-/]+(\d{{4}})")
+# January 31, 2025, Jan 31 2025
+_MONTH_DAY_YEAR = re.compile(rf"(?:{_WEEKDAY})?([a-z]+)\.?\s+(\d{{1,2}}),?\s+(\d{{4}})")
+
+
+def _date(year, month, day) -> Optional[datetime]:
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DEADLINE_CACHE_SIZE)
+def _parse_text(text: str) -> Optional[datetime]:
+    """Parse a deadline not in a numeric format (memoized; scraped pages repeat the same strings)."""
+    text = " ".join(text.lower().split())
+    text = _ORDINAL.sub(r"\1", text)
+    match = _DAY_MONTH_YEAR.fullmatch(text)
+    if match and match.group(2) in MONTHS:
+        return _date(match.group(3), MONTHS[match.group(2)], match.group(1))
+    match = _MONTH_DAY_YEAR.fullmatch(text)
+    if match and match.group(1) in MONTHS:
+        return _date(match.group(3), MONTHS[match.group(1)], match.group(2))
+    # ISO 8601 with a time (and maybe an offset): keep the date, in UTC
+    try:
+        parsed = datetime.fromisoformat(text.upper().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(parsed.year, parsed.month, parsed.day)
+
+
+def parse_deadline(value) -> Optional[datetime]:
+    """
+    Parse a deadline into a datetime at midnight of its date.
+
+    Args:
+        value: The deadline as written by the source
+
+    Returns:
+        The date, or None if value is empty or not a recognizable date
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if not value:
+        return None
+    match = _YMD.fullmatch(value)
+    if match:
+        return _date(*match.groups())
+    match = _DMY.fullmatch(value)
+    if match:
+        day, month, year = match.groups()
+        return _date(year, month, day)
+    return _parse_text(value)
+
+
+def normalize_deadline(value) -> Optional[str]:
+    """Return a deadline as "YYYY-MM-DD", or None if it can't be parsed."""
+    parsed = parse_deadline(value)
+    return parsed.strftime("%Y-%m-%d") if parsed else None
+
+
+def deadline_of(doc) -> Optional[str]:
+    """Return a university's raw deadline: its 'deadline' or basic_info's "Deadline to Apply"."""
+    deadline = doc.get("deadline")
+    if not deadline and isinstance(doc.get("basic_info"), Mapping):
+        deadline = doc["basic_info"].get("Deadline to Apply")
+    return deadline
+
+
+def with_deadline_iso(data: dict) -> dict:
+    """
+    Set data's deadline_iso from its raw deadline before it is written.
+
+    The field is always set (None without a usable deadline), so an update
+    replacing the deadline also replaces a previously normalized value.
+    """
+    deadline = deadline_of(data)
+    data[DEADLINE_ISO_FIELD] = normalize_deadline(deadline)
+    if deadline and data[DEADLINE_ISO_FIELD] is None:
+        logger.warning(f"Could not parse deadline '{deadline}' for university {data.get('name')}")
+    return data
+
+
+def document_deadline(doc) -> Optional[datetime]:
+    """
+    Return a stored university's deadline, from deadline_iso when the document
+    has it and by parsing its raw deadline otherwise (documents written before
+    the field existed).
+    """
+    if DEADLINE_ISO_FIELD in doc:
+        iso = doc[DEADLINE_ISO_FIELD]
+        if not iso:
+            return None
+        try:
+            return datetime.fromisoformat(iso)
+        except (TypeError, ValueError):
+            return parse_deadline(iso)
+    return parse_deadline(deadline_of(doc))
@@ -0,0 +1,98 @@
+# app/utils/frozen.py
+"""
+Read-only containers for data shared between requests.
+
+FrozenDict and FrozenList are dict/list subclasses whose mutating methods
+raise TypeError, so a cached document can be handed to every request without
+copying: reading, iterating, JSON-encoding and isinstance(x, dict) checks work
+as usual, while an accidental `doc["id"] = ...` fails loudly instead of
+corrupting the shared copy. Build a modified copy instead, e.g.
+`{**doc, "id": doc_id}`, or call thaw() for a fully mutable one.
+"""
+from collections.abc import Mapping
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only; copy it before modifying")
+
+
+class FrozenDict(dict):
+    """A dict that can't be modified after creation."""
+    __slots__ = ()
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def __reduce__(self):
+        # dict subclasses are unpickled through __setitem__; rebuild from a plain dict instead
+        return (type(self), (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"FrozenDict({dict.__repr__(self)})"
+
+
+class FrozenList(list):
+    """A list that can't be modified after creation."""
+    __slots__ = ()
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __iadd__ = _read_only
+    __imul__ = _read_only
+    append = _read_only
+    clear = _read_only
+    extend = _read_only
+    insert = _read_only
+    pop = _read_only
+    remove = _read_only
+    reverse = _read_only
+    sort = _read_only
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"FrozenList({list.__repr__(self)})"
+
+
+def freeze(value):
+    """
+    Return a read-only version of value: dicts become FrozenDicts and lists
+    FrozenLists, recursively. Already frozen containers are reused as they
+    are, so refreezing a patched copy of a frozen document only rebuilds
+    what changed. Other values are returned unchanged.
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Return a fully mutable deep copy of a (possibly frozen) value."""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    return value
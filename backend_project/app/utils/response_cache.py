@@ -0,0 +1,166 @@
+# app/utils/response_cache.py
+"""
+Cache of encoded JSON response bodies.
+
+Routes whose output depends only on the request path, the query string and
+some collections (the university catalog) keep the bytes they sent, keyed
+by path, query parameters and the collections' current versions (see
+app/services/collection_versions.py). A repeated request is answered with
+the stored bytes without rebuilding or re-encoding anything (or with a 304
+if the client's If-None-Match holds the body's ETag). Large bodies are
+compressed once per encoding the clients ask for, and the compressed
+variants are kept next to the body (counting towards the byte bound). Any write
+to one of the collections changes the key, so an outdated body is never
+served. Entries also expire after the collection's cache TTL, which bounds
+staleness for changes this process can't see (no replica, no shared cache).
+
+Usage in a route:
+
+    key = response_cache.key(request, "universities")
+    cached = response_cache.get(key, request)
+    if cached is not None:
+        return cached
+    ...
+    return response_cache.store(key, result, request)
+
+Only successful results should be stored; fallbacks returned after an
+error are sent without caching.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services.cache_service import COLLECTION_TTLS, DEFAULT_TTL
+from app.services.collection_versions import versions
+from app.utils.responses import conditional_response, dump_json, etag_for
+from app.utils.compression import COMPRESSION_MIN_SIZE, add_vary, compress, negotiate, variant_etag
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 32MB
+
+
+class CachedBody:
+    """An encoded response body, its ETag, its compressed variants and when it stops being served."""
+    __slots__ = ("body", "etag", "variants", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = etag_for(body)
+        self.variants = {}  # content-encoding -> compressed body
+        self.expires_at = time.monotonic() + ttl
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+
+class ResponseCache:
+    """Bounded LRU of encoded response bodies."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(request: Request, *collections: str) -> tuple:
+        """
+        Build the cache key of a request whose response is derived from collections.
+
+        Take the key before reading any data: if a write lands while the
+        response is being built, the body is stored under the old version and
+        never served again.
+        """
+        return (
+            request.url.path,
+            tuple(sorted(request.query_params.multi_items())),
+            tuple((collection, versions.current(collection)) for collection in collections),
+        )
+
+    def get(self, key: tuple, request: Request):
+        """Return a Response with the stored body (or a 304 for request), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._respond(key, entry, request)
+
+    def store(self, key: tuple, content, request: Request, ttl: float = None) -> Response:
+        """Encode content, keep the bytes under key and answer request with them."""
+        if ttl is None:
+            ttl = min((COLLECTION_TTLS.get(collection, DEFAULT_TTL) for collection, _ in key[2]), default=DEFAULT_TTL)
+        entry = CachedBody(dump_json(content), ttl)
+        body = entry.body
+        # A body taking a large part of the budget would evict everything else
+        if len(body) <= self.max_bytes // 4:
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = entry
+                self._bytes += len(body)
+                self._evict()
+            return self._respond(key, entry, request)
+        # Not kept; the compression middleware compresses it like any other response
+        return conditional_response(request, body, entry.etag)
+
+    def _respond(self, key: tuple, entry: CachedBody, request: Request) -> Response:
+        """Answer request with the entry's body, compressed if the client accepts it."""
+        if len(entry.body) < COMPRESSION_MIN_SIZE:
+            return conditional_response(request, entry.body, entry.etag)
+        headers = {}
+        add_vary(headers)
+        encoding = negotiate(request)
+        if encoding is None:
+            return conditional_response(request, entry.body, entry.etag, headers)
+        variant = entry.variants.get(encoding)
+        if variant is None:
+            variant = compress(entry.body, encoding, cached=True)
+            with self._lock:
+                if self._entries.get(key) is entry and encoding not in entry.variants:
+                    entry.variants[encoding] = variant
+                    self._bytes += len(variant)
+                    self._evict()
+        headers["content-encoding"] = encoding
+        return conditional_response(request, variant, variant_etag(entry.etag, encoding), headers)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+response_cache = ResponseCache()
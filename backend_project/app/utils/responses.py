@@ -0,0 +1,150 @@
+# app/utils/responses.py
+"""
+Fast JSON rendering for API responses.
+
+FastJSONResponse renders with orjson when it is installed (and the standard
+json module otherwise), and understands what documents read through
+FirebaseService contain: Firestore timestamps, write sentinels such as
+SERVER_TIMESTAMP, read-only cached containers and CatalogRecords.
+
+It is the application's default response class, but FastAPI still runs
+its jsonable_encoder pass (which costs more than the encoding for large
+lists) over whatever a route returns unless that is a Response. So every
+JSON route returns FastJSONResponse(...) itself, or model_response(...)
+when it has a response_model.
+"""
+import json
+import base64
+import hashlib
+from enum import Enum
+from decimal import Decimal
+from datetime import date, datetime, time, timezone
+from collections.abc import Mapping
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from firebase_admin import firestore
+from pydantic import BaseModel
+
+from app.utils.compression import base_etag
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(value):
+    """Encode what orjson/json don't handle natively."""
+    if isinstance(value, Mapping):
+        # CatalogRecords and other read-only mappings
+        return dict(value)
+    if isinstance(value, datetime):
+        # Firestore returns DatetimeWithNanoseconds, a datetime subclass
+        return datetime.isoformat(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if value is firestore.SERVER_TIMESTAMP:
+        # Not stored yet; Firestore will write (about) the current time
+        return datetime.now(timezone.utc).isoformat()
+    if type(value).__name__ == "Sentinel":
+        return None
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(content) -> bytes:
+    """Encode content as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dump_json."""
+
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+
+def model_response(model, content, status_code: int = 200, headers: dict = None) -> FastJSONResponse:
+    """
+    Render content as the route's response_model would, validated against
+    model and limited to its fields (a list item by item), without FastAPI's
+    jsonable_encoder pass.
+    """
+    if isinstance(content, list):
+        validated = [model.parse_obj(item) for item in content]
+    else:
+        validated = model.parse_obj(content)
+    return FastJSONResponse(validated, status_code=status_code, headers=headers)
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def version_etag(*parts) -> str:
+    """
+    Strong ETag of a response derived from what identifies the version of
+    its data (e.g. document IDs and their updated_at stamps), so it can be
+    checked before the response is built.
+    """
+    text = "\x1f".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return '"' + hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match lists etag (weak comparison, as RFC
+    9110 asks). Compressed variants of the same body match each other.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = base_etag(etag)
+    return any(base_etag(candidate.strip().removeprefix("W/")) == etag for candidate in header.split(","))
+
+
+def not_modified(request: Request, etag: str, cache_control: str = "no-cache"):
+    """Return an empty 304 Not Modified if the request's If-None-Match holds etag, else None."""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"etag": etag, "cache-control": cache_control})
+    return None
+
+
+def conditional_response(request: Request, body: bytes, etag: str = None, headers: dict = None,
+                         cache_control: str = "no-cache") -> Response:
+    """
+    Answer with body and its ETag, or with an empty 304 Not Modified if the
+    client already holds this version.
+
+    Args:
+        request: The request (its If-None-Match header is checked)
+        body: Encoded JSON body (compressed if headers has a content-encoding)
+        etag: Precomputed ETag of body
+        headers: Extra headers (e.g. those of the response being replaced)
+        cache_control: Cache-Control value; no-cache makes clients revalidate every time
+    """
+    etag = etag or etag_for(body)
+    # Content headers are recomputed for the body actually sent
+    replaced = ("etag", "cache-control", "content-length", "content-type")
+    headers = {name: value for name, value in (headers or {}).items() if name.lower() not in replaced}
+    headers.update({"etag": etag, "cache-control": cache_control})
+    if etag_matches(request, etag):
+        headers.pop("content-encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Storage Backend Benchmark
+
+Runs the same workload (bulk load, reads by ID, indexed filters, keyset
+pages, counts) against the memory and SQLite storage backends, and
+optionally Firestore, and prints the time each step takes.
+
+Usage:
+    python scripts/benchmark_backends.py [--documents 2000] [--sqlite-path /tmp/bench.db] [--firestore]
+
+--firestore runs against the configured Firestore project and spends real
+read/write quota; use it with an emulator or a scratch project.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.storage_backend import MemoryBackend, SQLiteBackend, get_backend
+from app.services.bulk_writer import BulkWriter
+
+COLLECTION = "benchmark_applications"
+STATUSES = ["draft", "submitted", "accepted", "rejected"]
+
+
+def make_documents(count: int) -> list:
+    rng = random.Random(42)
+    return [
+        {
+            "type": "set",
+            "collection": COLLECTION,
+            "doc_id": f"app-{i:06d}",
+            "data": {
+                "name": f"Application {i}",
+                "user_id": f"user-{rng.randrange(count // 10 or 1)}",
+                "status": rng.choice(STATUSES),
+                "deadline": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "notes": "x" * rng.randint(50, 500),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def timed(label: str, func, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<34} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def run(backend, operations: list):
+    col = backend.collection(COLLECTION)
+    ids = [op["doc_id"] for op in operations]
+    sample = random.Random(1).sample(ids, min(50, len(ids)))
+
+    timed(f"bulk load {len(operations)} documents", lambda: BulkWriter(backend).commit(operations))
+    timed("get 50 documents one by one", lambda: [col.document(doc_id).get() for doc_id in sample])
+    timed("get_all 50 documents", lambda: backend.get_all([col.document(doc_id) for doc_id in sample]))
+    timed("where user_id == (indexed)", lambda: col.where("user_id", "==", "user-7").stream(), repeat=20)
+    timed("where status == (indexed)", lambda: col.where("status", "==", "accepted").stream(), repeat=5)
+    timed("where deadline in March (indexed)",
+          lambda: col.where("deadline", ">=", "2026-03-01").where("deadline", "<", "2026-04-01").stream(), repeat=5)
+
+    def page_through():
+        pages = 0
+        query = col.order_by("name").order_by("__name__").limit(50)
+        docs = query.stream()
+        while docs:
+            pages += 1
+            last = docs[-1]
+            docs = query.start_after({"name": last.get("name"), "__name__": last.reference}).stream()
+        return pages
+
+    timed("page through by name (50/page)", page_through)
+    timed("count status == accepted", lambda: col.where("status", "==", "accepted").count().get(), repeat=20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare storage backends on one machine")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(), "findmyuni-benchmark.db"))
+    parser.add_argument("--firestore", action="store_true", help="Also run against Firestore (spends quota)")
+    args = parser.parse_args()
+
+    operations = make_documents(args.documents)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.sqlite_path + suffix):
+            os.remove(args.sqlite_path + suffix)
+
+    backends = [("memory", MemoryBackend()), ("sqlite", SQLiteBackend(args.sqlite_path))]
+    if args.firestore:
+        from app.config.firebase import init_firebase
+        init_firebase()
+        backends.append(("firestore", get_backend("firestore")))
+
+    for name, backend in backends:
+        print(f"\n{name}")
+        run(backend, operations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+JSON Serialization Benchmark
+
+Measures what it costs to turn a list of universities (as the cache hands
+them out: CatalogRecords with Firestore timestamps) into a response body:
+
+- default:  FastAPI's jsonable_encoder + JSONResponse (json.dumps)
+- encoder:  jsonable_encoder + FastJSONResponse (default_response_class)
+- direct:   a route returning FastJSONResponse itself (no jsonable_encoder)
+
+Results are reported per 1000 universities.
+
+Usage:
+    python scripts/benchmark_json.py [--universities 1000] [--repeat 20]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timezone
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.catalog_record import compact
+from app.utils.responses import FastJSONResponse, orjson
+
+CATEGORIES = ["Engineering", "Computer Science", "Business", "Medicine", "Arts", "Natural Sciences"]
+CITIES = ["Islamabad", "Lahore", "Karachi", "Peshawar", "Quetta", "Faisalabad"]
+
+
+def make_universities(count: int) -> list:
+    rng = random.Random(7)
+    universities = []
+    for i in range(count):
+        programs = {
+            category: [f"{n}. BS {category} {rng.randint(1, 40)}" for n in range(1, rng.randint(3, 12))]
+            for category in rng.sample(CATEGORIES, 3)
+        }
+        universities.append(compact({
+            "id": f"uni-{i:05d}",
+            "name": f"University of {rng.choice(CITIES)} {i}",
+            "description": " ".join(rng.choice(CATEGORIES) for _ in range(rng.randint(40, 200))),
+            "basic_info": {
+                "Location": rng.choice(CITIES),
+                "Deadline to Apply": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "Sector": rng.choice(["Public", "Private"]),
+            },
+            "programs": programs,
+            "apply_link": f"https://example.edu/{i}/apply",
+            "url": f"https://example.edu/{i}",
+            "admissionOpen": rng.random() < 0.5,
+            "updated_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        }))
+    return universities
+
+
+def timed(label: str, func, repeat: int, per: float):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        size = len(func())
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<50} {elapsed * 1000 / per:8.2f} ms per 1k   ({size / 1024:.0f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure response serialization cost")
+    parser.add_argument("--universities", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    universities = make_universities(args.universities)
+    per = args.universities / 1000
+    print(f"{args.universities} universities, renderer: {'orjson' if orjson else 'json'}")
+
+    timed("default (jsonable_encoder + json.dumps)",
+          lambda: JSONResponse({"universities": jsonable_encoder(universities)}).body, args.repeat, per)
+    timed("default_response_class (jsonable_encoder + fast)",
+          lambda: FastJSONResponse({"universities": jsonable_encoder(universities)}).body, args.repeat, per)
+    timed("FastJSONResponse returned directly",
+          lambda: FastJSONResponse({"universities": universities}).body, args.repeat, per)
+
+    default = JSONResponse({"universities": jsonable_encoder(universities)}).body
+    direct = FastJSONResponse({"universities": universities}).body
+    print(f"  bodies decode to the same JSON: {json.loads(default) == json.loads(direct)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Catalog Snapshot Tool
+
+Writes, inspects and imports the snapshot files the API seeds its catalog
+replicas from at startup (see app/services/catalog_snapshot.py). Ship a
+fresh snapshot with each deployment so cold starts only read the documents
+changed since it was taken.
+
+Usage:
+    python scripts/catalog_snapshot.py export [--collection universities] [--path FILE]
+    python scripts/catalog_snapshot.py info [--collection universities] [--path FILE]
+    python scripts/catalog_snapshot.py import --path FILE [--collection NAME] [--backend sqlite]
+
+export reads every document of the collection from the configured storage
+backend (one Firestore read per document). import writes the snapshot's
+documents into a storage backend, e.g. to seed a self-hosted SQLite store.
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.storage_backend import get_backend
+from app.services.catalog_snapshot import (
+    SnapshotError, export_collection, import_snapshot, read_snapshot, snapshot_path
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger("catalog_snapshot")
+
+
+def open_backend(kind: str = None):
+    """Return the storage backend, initializing Firebase when it is Firestore."""
+    if (kind or os.getenv("STORAGE_BACKEND", "firestore")).lower() == "firestore":
+        from app.config.firebase import init_firebase
+        init_firebase()
+    return get_backend(kind)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage catalog warm-start snapshots")
+    parser.add_argument("command", choices=["export", "info", "import"])
+    parser.add_argument("--collection", default=None, help="Collection (default: universities)")
+    parser.add_argument("--path", default=None, help="Snapshot file (default: the collection's file)")
+    parser.add_argument("--backend", default=None, help="Storage backend: firestore, memory or sqlite")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            collection = args.collection or "universities"
+            header = export_collection(open_backend(args.backend), collection, args.path)
+            logger.info(f"Exported {header['count']} document(s) of '{collection}' as of {header['as_of']}")
+        elif args.command == "info":
+            path = args.path or snapshot_path(args.collection or "universities")
+            header, _ = read_snapshot(path)
+            for key, value in header.items():
+                print(f"{key}: {value}")
+        else:
+            if not args.path:
+                parser.error("import needs --path")
+            result = import_snapshot(open_backend(args.backend), args.path, args.collection)
+            logger.info(f"Imported {result['written']} document(s) into '{result['collection']}' "
+                        f"({result['failed']} failed)")
+            if result["failed"]:
+                return 1
+    except SnapshotError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
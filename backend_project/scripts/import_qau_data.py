@@ -16,6 +16,8 @@ from datetime import datetime
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.utils.deadlines import normalize_deadline, parse_deadline, with_deadline_iso
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -65,18 +67,17 @@ def initialize_firebase():
 def get_qau_data():
     """Create a QAU data object to insert into Firebase."""
     # Convert date from DD-MM-YYYY to YYYY-MM-DD format for JavaScript compatibility
-    deadline_parts = "31-01-2025".split("-")
-    iso_deadline = f"{deadline_parts[2]}-{deadline_parts[1]}-{deadline_parts[0]}"
+    iso_deadline = normalize_deadline("31-01-2025")
     
     # Check if the deadline has passed to set admissionOpen flag
-    deadline_date = datetime.strptime(iso_deadline, "%Y-%m-%d")
+    deadline_date = parse_deadline(iso_deadline)
     current_date = datetime.now()
     admission_open = deadline_date > current_date
     
     logger.info(f"Deadline date: {deadline_date.strftime('%Y-%m-%d')}, Current date: {current_date.strftime('%Y-%m-%d')}")
     logger.info(f"Admission open status: {admission_open}")
     
-    return {
+    return with_deadline_iso({
         "name": "Quaid-i-Azam University (QAU)",
         "basic_info": {
             "Location": "Islamabad, Pakistan",
@@ -113,8 +114,9 @@ def get_qau_data():
         "phd_apply_link": "https://qau.edu.pk/admission-notice-for-phd-programme-spring-semester-2025/",
         "url": "https://qau.edu.pk/",
         "scraped_at": firestore.SERVER_TIMESTAMP,
+        "updated_at": firestore.SERVER_TIMESTAMP,
         "admissionOpen": admission_open  # Dynamically set based on deadline
-    }
+    })
 
 def main():
     """Main function to import QAU data."""
@@ -3,7 +3,9 @@
 Admission Status Updater
 
 This script automatically updates the admissionOpen flag for all universities
-based on their application deadlines.
+based on their application deadlines. It also writes the normalized
+deadline_iso field of universities stored before it existed (or whose
+deadline changed without it).
 """
 
 import os
@@ -16,6 +18,9 @@ from firebase_admin import credentials, firestore
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.services.bulk_writer import BulkWriter
+from app.utils.deadlines import DEADLINE_ISO_FIELD, normalize_deadline, parse_deadline
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -83,6 +88,7 @@ def update_admission_status():
     updated_count = 0
     error_count = 0
     skipped_count = 0
+    operations = []
     
     for uni in universities:
         uni_data = uni.to_dict()
@@ -99,41 +105,51 @@ def update_admission_status():
                 skipped_count += 1
                 continue
             
-            # Try to parse deadline in various formats
-            deadline_date = None
-            try:
-                # Try YYYY-MM-DD format
-                deadline_date = datetime.strptime(deadline_str, "%Y-%m-%d")
-            except ValueError:
-                try:
-                    # Try DD-MM-YYYY format
-                    parts = deadline_str.split("-")
-                    if len(parts) == 3 and len(parts[0]) == 2 and len(parts[1]) == 2 and len(parts[2]) == 4:
-                        iso_deadline = f"{parts[2]}-{parts[1]}-{parts[0]}"
-                        deadline_date = datetime.strptime(iso_deadline, "%Y-%m-%d")
-                except ValueError:
-                    logger.warning(f"Skipping {uni_name} (ID: {uni_id}) - Could not parse deadline: {deadline_str}")
-                    skipped_count += 1
-                    continue
+            deadline_date = parse_deadline(deadline_str)
+            if deadline_date is None:
+                logger.warning(f"Skipping {uni_name} (ID: {uni_id}) - Could not parse deadline: {deadline_str}")
+                skipped_count += 1
+                continue
             
-            # If we successfully parsed the deadline, check if it's in the future
-            if deadline_date:
-                admission_open = deadline_date > current_date
-                current_status = uni_data.get("admissionOpen", None)
-                
-                # Only update if the status has changed
-                if current_status != admission_open:
-                    logger.info(f"Updating {uni_name} (ID: {uni_id}) - Deadline: {deadline_str}, Setting admission status to: {admission_open}")
-                    universities_ref.document(uni_id).update({"admissionOpen": admission_open})
-                    updated_count += 1
-                else:
-                    logger.debug(f"No change needed for {uni_name} (ID: {uni_id}) - Status already {admission_open}")
-                    skipped_count += 1
+            # Check if the deadline is in the future
+            admission_open = deadline_date > current_date
+            changes = {}
+            
+            # Only update if the status has changed
+            if uni_data.get("admissionOpen", None) != admission_open:
+                logger.info(f"Updating {uni_name} (ID: {uni_id}) - Deadline: {deadline_str}, Setting admission status to: {admission_open}")
+                changes["admissionOpen"] = admission_open
+            iso_deadline = normalize_deadline(deadline_str)
+            if uni_data.get(DEADLINE_ISO_FIELD) != iso_deadline:
+                changes[DEADLINE_ISO_FIELD] = iso_deadline
+            
+            if changes:
+                # updated_at lets warm-started replicas pick the change up
+                changes["updated_at"] = firestore.SERVER_TIMESTAMP
+                operations.append({
+                    "type": "update",
+                    "collection": "universities",
+                    "doc_id": uni_id,
+                    "data": changes
+                })
+            else:
+                logger.debug(f"No change needed for {uni_name} (ID: {uni_id}) - Status already {admission_open}")
+                skipped_count += 1
             
         except Exception as e:
             logger.error(f"Error updating {uni_name} (ID: {uni_id}): {str(e)}")
             error_count += 1
     
+    # Write all status changes in parallel batches
+    if operations:
+        results = BulkWriter(db).commit(operations)
+        for result in results:
+            if result["success"]:
+                updated_count += 1
+            else:
+                logger.error(f"Error updating university {result['doc_id']}: {result['error']}")
+                error_count += 1
+    
     logger.info(f"Admission status update completed: {updated_count} updated, {skipped_count} skipped, {error_count} errors")
     return 0
 
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+
+# Run the app against the in-process storage backend, without Firestore
+# credentials or snapshot files
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("FIREBASE_EMULATOR", "true")
+os.environ.setdefault("CATALOG_SNAPSHOT_WARM_START", "false")
@@ -0,0 +1,66 @@
+# tests/test_async_firebase_service.py
+"""AsyncFirebaseService answers from memory on the event loop and does all I/O on worker threads."""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.async_firebase_service import AsyncFirebaseService
+from app.services.cache_service import CacheService
+from app.services.firebase_service import FirebaseService
+from app.services.metrics_service import current_route
+from app.services.shared_cache import SharedCacheStore
+from app.services.storage_backend import MemoryBackend
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.collection("applications").document("a1").set({"status": "draft", "user_id": "u1"})
+    return backend
+
+
+def test_shared_tier_is_only_read_off_the_event_loop(backend, tmp_path):
+    store = SharedCacheStore(str(tmp_path / "cache.db"))
+    service = AsyncFirebaseService(FirebaseService(cache=CacheService(l2=store), backend=backend))
+    threads = []
+    get = store.get
+
+    def recording_get(key):
+        threads.append(threading.current_thread())
+        return get(key)
+
+    store.get = recording_get
+
+    async def read():
+        first = await service.get_document("applications", "a1")
+        second = await service.get_document("applications", "a1")
+        found = await service.find_document("applications", "user_id", "==", "u1")
+        return first, second, found, threading.current_thread()
+
+    first, second, found, loop_thread = asyncio.run(read())
+    assert first == second == {"status": "draft", "user_id": "u1"}
+    assert [doc["id"] for doc in found] == ["a1"]
+    assert threads and loop_thread not in threads
+
+
+def test_memory_hits_are_answered_on_the_event_loop(backend):
+    sync = FirebaseService(cache=CacheService(), backend=backend)
+    service = AsyncFirebaseService(sync)
+    sync.get_document("applications", "a1")
+    calls = []
+    sync.get_document = lambda *args: calls.append(args)
+
+    assert asyncio.run(service.get_document("applications", "a1")) == {"status": "draft", "user_id": "u1"}
+    assert calls == []
+
+
+def test_worker_threads_keep_the_request_context(backend):
+    service = AsyncFirebaseService(FirebaseService(cache=CacheService(), backend=backend))
+    service.sync.current_route = lambda: current_route.get()
+
+    async def read():
+        current_route.set("GET /api/applications")
+        return await service._run_sync("current_route")
+
+    assert asyncio.run(read()) == "GET /api/applications"
@@ -0,0 +1,54 @@
+# tests/test_bulk_writer.py
+"""Writes to one document land in order, even when they fall into different batches."""
+import threading
+import time
+
+from app.services.bulk_writer import BulkWriter
+from app.services.storage_backend import MemoryBackend
+
+
+def slow_first_chunk(writer):
+    """Delay the first chunk's commit so a concurrently committed chunk would overtake it."""
+    commit_chunk = writer._commit_chunk
+    first = threading.Lock()
+
+    def delayed(chunk):
+        if first.acquire(blocking=False):
+            time.sleep(0.2)
+        commit_chunk(chunk)
+
+    writer._commit_chunk = delayed
+    return writer
+
+
+def test_later_write_in_another_chunk_is_applied_last():
+    db = MemoryBackend()
+    writer = slow_first_chunk(BulkWriter(db, chunk_size=2))
+    operations = [
+        {"type": "set", "collection": "applications", "doc_id": "a1", "data": {"status": "draft"}},
+        {"type": "set", "collection": "applications", "doc_id": "a2", "data": {"status": "draft"}},
+        {"type": "update", "collection": "applications", "doc_id": "a1", "data": {"status": "submitted"}},
+        {"type": "delete", "collection": "applications", "doc_id": "a2"},
+    ]
+
+    results = writer.commit(operations)
+
+    assert all(result["success"] for result in results)
+    assert db.collection("applications").document("a1").get().to_dict() == {"status": "submitted"}
+    assert not db.collection("applications").document("a2").get().exists
+
+
+def test_independent_chunks_are_committed_concurrently():
+    db = MemoryBackend()
+    writer = slow_first_chunk(BulkWriter(db, chunk_size=1))
+    operations = [
+        {"type": "set", "collection": "universities", "doc_id": f"u{i}", "data": {"name": str(i)}}
+        for i in range(4)
+    ]
+
+    started = time.monotonic()
+    results = writer.commit(operations)
+
+    assert all(result["success"] for result in results)
+    # The delayed chunk didn't hold the others back
+    assert time.monotonic() - started < 0.4
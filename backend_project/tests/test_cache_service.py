@@ -0,0 +1,66 @@
+# tests/test_cache_service.py
+"""CacheService expires entries per collection and evicts the least recently used ones."""
+import pytest
+
+from app.services.cache_service import CacheService
+
+
+def age(cache, key, seconds):
+    """Make an entry look seconds older."""
+    cache.get_entry(key).stored_at -= seconds
+
+
+def test_entries_expire_after_their_collection_ttl():
+    cache = CacheService(ttl_policies={"applications": 30, "universities": 1800})
+    cache.set("applications:a1", {"status": "draft"})
+    cache.set("universities:u1", {"name": "Uni"})
+    age(cache, "applications:a1", 31)
+    age(cache, "universities:u1", 31)
+
+    assert cache.get("applications:a1") is None
+    assert cache.get("universities:u1") == {"name": "Uni"}
+    # Expired entries are kept as a fallback until evicted
+    assert cache.get("applications:a1", allow_stale=True) == {"status": "draft"}
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["stale_hits"] == 1
+
+
+def test_explicit_ttl_overrides_the_policy():
+    cache = CacheService(ttl_policies={"applications": 30})
+    cache.set("applications:a1", {"status": "draft"}, ttl=300)
+    age(cache, "applications:a1", 31)
+    assert cache.get("applications:a1") == {"status": "draft"}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CacheService(max_entries=2, stripes=1)
+    cache.set("universities:a", {"name": "A"})
+    cache.set("universities:b", {"name": "B"})
+    cache.get("universities:a")
+    cache.set("universities:c", {"name": "C"})
+
+    assert cache.get("universities:b") is None
+    assert cache.get("universities:a") == {"name": "A"}
+    assert cache.get("universities:c") == {"name": "C"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_is_enforced_across_stripes():
+    cache = CacheService(max_bytes=20_000)
+    for i in range(50):
+        cache.set(f"universities:u{i}", {"description": "x" * 1000})
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 20_000
+    assert 0 < stats["entries"] < 50
+    # The entry just stored is never the one evicted
+    assert cache.get("universities:u49") is not None
+
+
+def test_cached_values_are_read_only():
+    cache = CacheService()
+    value = cache.set("applications:a1", {"documents": {"cv": "cv.pdf"}})
+    with pytest.raises(TypeError):
+        value["status"] = "submitted"
+    with pytest.raises(TypeError):
+        value["documents"]["photo"] = "photo.jpg"
@@ -0,0 +1,54 @@
+# tests/test_catalog_replica.py
+"""A replica seeded from a snapshot catches up and follows changes through query listeners."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config.test_config import MockFirestore
+from app.services.catalog_replica import CollectionReplica
+
+AS_OF = datetime.now(timezone.utc) - timedelta(hours=1)
+BEFORE = AS_OF - timedelta(days=1)
+
+
+@pytest.fixture
+def db():
+    db = MockFirestore()
+    universities = db.collection("universities")
+    universities.document("kept").set({"name": "Kept", "updated_at": BEFORE})
+    universities.document("changed").set({"name": "Changed after the snapshot", "updated_at": AS_OF + timedelta(minutes=10)})
+    return db
+
+
+@pytest.fixture
+def replica(db, monkeypatch):
+    # The count is verified explicitly below rather than from the catch-up thread
+    monkeypatch.setattr(CollectionReplica, "_catch_up", lambda self, delivered: None)
+    replica = CollectionReplica(db, "universities")
+    replica.seed([
+        {"id": "kept", "name": "Kept", "updated_at": BEFORE},
+        {"id": "changed", "name": "Changed before the snapshot", "updated_at": BEFORE},
+    ], AS_OF)
+    replica.start(since=AS_OF)
+    yield replica
+    replica.stop()
+
+
+def test_seeded_replica_reads_only_what_changed_since(replica):
+    assert replica.incremental
+    assert replica.get("kept")["name"] == "Kept"
+    assert replica.get("changed")["name"] == "Changed after the snapshot"
+    assert replica.verify() and replica.incremental
+
+
+def test_later_changes_reach_the_replica(db, replica):
+    universities = db.collection("universities")
+    now = datetime.now(timezone.utc)
+    universities.document("added").set({"name": "Added", "updated_at": now})
+    universities.document("kept").set({"name": "Kept, renamed", "updated_at": now})
+    universities.document("changed").delete()
+
+    assert replica.get("added")["name"] == "Added"
+    assert replica.get("kept")["name"] == "Kept, renamed"
+    assert replica.get("changed") is None
+    assert replica.verify() and replica.incremental
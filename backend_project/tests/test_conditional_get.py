@@ -0,0 +1,73 @@
+# tests/test_conditional_get.py
+"""Clients revalidating with If-None-Match get 304 until the data they hold changes."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.application import firebase_service
+from app.services.storage_backend import get_backend
+from app.utils.auth_middleware import get_current_user
+
+USER = {"uid": "etag-user", "email": "etag@example.com", "role": "user"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    university = get_backend().collection("universities").document("etag-uni")
+    university.set({"name": "ETag University", "programs": {"Engineering": ["1. Civil"]}})
+    app.dependency_overrides[get_current_user] = lambda: USER
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
+    university.delete()
+
+
+def create_application():
+    service = firebase_service.sync
+    return service.create_document("applications", {
+        "user_id": USER["uid"], "university_id": "etag-uni", "program": "Civil", "status": "draft",
+        "created_at": service.get_server_timestamp(), "updated_at": service.get_server_timestamp(),
+    })
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"if-none-match": etag})
+
+
+def test_application_is_not_modified_until_it_is_updated(client):
+    application_id = create_application()
+    url = f"/api/application/{application_id}"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    etag = first.headers["etag"]
+
+    unchanged = revalidate(client, url, etag)
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    service = firebase_service.sync
+    service.update_document("applications", application_id, {
+        "notes": "Updated", "updated_at": service.get_server_timestamp(),
+    })
+    changed = revalidate(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.json()["notes"] == "Updated"
+    assert changed.headers["etag"] != etag
+
+
+def test_application_list_etag_covers_membership_and_filter(client):
+    url = "/api/application/"
+    etag = client.get(url).headers["etag"]
+    assert revalidate(client, url, etag).status_code == 304
+    assert revalidate(client, url + "?status=submitted", etag).status_code == 200
+
+    create_application()
+    assert revalidate(client, url, etag).status_code == 200
+
+
+def test_university_detail_routes_answer_revalidation(client):
+    url = "/api/universities/etag-uni/programs"
+    first = client.get(url)
+    assert first.json() == {"programs": [{"name": "Civil", "category": "Engineering", "id": "engineering-civil"}]}
+    assert revalidate(client, url, first.headers["etag"]).status_code == 304
@@ -0,0 +1,49 @@
+# tests/test_deadline_index.py
+"""The deadline index answers deadlineWithin and sort=deadline from one pass over the catalog."""
+from datetime import datetime
+
+from app.services.deadline_index import DeadlineIndex, deadline_index
+
+CATALOG = [
+    {"id": "late", "deadline_iso": "2025-03-01"},
+    {"id": "none", "deadline_iso": None},
+    {"id": "early", "deadline": "15-01-2025"},
+    {"id": "basic-info", "basic_info": {"Deadline to Apply": "1 February 2025"}},
+    {"id": "unparsable", "deadline": "Rolling admissions"},
+    {"id": "same-day", "deadline_iso": "2025-03-01"},
+]
+
+
+def ids(documents):
+    return [doc["id"] for doc in documents]
+
+
+def test_within_includes_both_bounds():
+    index = DeadlineIndex(CATALOG)
+    assert ids(index.within(datetime(2025, 1, 15), datetime(2025, 2, 1))) == ["early", "basic-info"]
+    assert ids(index.within(datetime(2025, 1, 16), datetime(2025, 2, 28))) == ["basic-info"]
+    assert index.within(datetime(2025, 4, 1), datetime(2025, 5, 1)) == []
+
+
+def test_within_keeps_catalog_order_unless_sorting_by_deadline():
+    index = DeadlineIndex(CATALOG)
+    start, end = datetime(2025, 1, 1), datetime(2025, 12, 31)
+    assert ids(index.within(start, end)) == ["late", "early", "basic-info", "same-day"]
+    assert ids(index.within(start, end, by_deadline=True)) == ["early", "basic-info", "late", "same-day"]
+
+
+def test_ordered_puts_undated_universities_last():
+    index = DeadlineIndex(CATALOG)
+    assert ids(index.ordered()) == ["early", "basic-info", "late", "same-day", "none", "unparsable"]
+    assert index.ordered() is index.ordered()
+
+
+def test_deadline_iso_takes_precedence_over_the_raw_deadline():
+    index = DeadlineIndex([{"id": "u1", "deadline": "31-12-2025", "deadline_iso": "2025-01-31"}])
+    assert index.dates == [datetime(2025, 1, 31)]
+
+
+def test_index_is_reused_for_the_same_catalog_list():
+    catalog = list(CATALOG)
+    assert deadline_index(catalog) is deadline_index(catalog)
+    assert deadline_index(list(CATALOG)) is not deadline_index(catalog)
@@ -0,0 +1,53 @@
+# tests/test_deadlines.py
+"""Deadlines in every format the sources use normalize to the same date."""
+import pytest
+
+from app.utils.deadlines import document_deadline, normalize_deadline, with_deadline_iso
+
+
+@pytest.mark.parametrize("deadline", [
+    "2025-01-31",
+    "2025/01/31",
+    "31-01-2025",
+    "31/01/2025",
+    "31.01.2025",
+    "31 Jan 2025",
+    "31-Jan-2025",
+    "31 Jan, 2025",
+    "31st January 2025",
+    "31st of January 2025",
+    "Fri, 31 Jan 2025",
+    "January 31, 2025",
+    "Jan 31 2025",
+    "  31   JANUARY   2025 ",
+    "2025-01-31T17:00:00Z",
+    "2025-01-31T17:00:00+00:00",
+])
+def test_formats_normalize_to_the_same_date(deadline):
+    assert normalize_deadline(deadline) == "2025-01-31"
+
+
+def test_numeric_dates_are_day_first():
+    assert normalize_deadline("01/02/2025") == "2025-02-01"
+    assert normalize_deadline("01-02-2025") == "2025-02-01"
+
+
+def test_datetimes_with_an_offset_keep_their_utc_date():
+    assert normalize_deadline("2025-01-31T23:30:00-05:00") == "2025-02-01"
+    assert normalize_deadline("2025-02-01T02:00:00+05:00") == "2025-01-31"
+
+
+@pytest.mark.parametrize("deadline", [None, "", "   ", "Rolling admissions", "31-02-2025", "Smarch 3, 2025", 20250131])
+def test_unusable_deadlines_give_none(deadline):
+    assert normalize_deadline(deadline) is None
+
+
+def test_deadline_iso_is_written_and_cleared():
+    assert with_deadline_iso({"basic_info": {"Deadline to Apply": "31st January 2025"}})["deadline_iso"] == "2025-01-31"
+    # An update replacing the deadline replaces the normalized value too
+    assert with_deadline_iso({"deadline": "To be announced"})["deadline_iso"] is None
+
+
+def test_stored_documents_without_deadline_iso_are_parsed():
+    assert document_deadline({"deadline": "January 31, 2025"}).isoformat() == "2025-01-31T00:00:00"
+    assert document_deadline({"deadline": "January 31, 2025", "deadline_iso": None}) is None
@@ -0,0 +1,54 @@
+# tests/test_json_responses.py
+"""JSON routes render with FastJSONResponse and never go through FastAPI's jsonable_encoder."""
+import fastapi.routing
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.application import firebase_service
+from app.services.storage_backend import get_backend
+from app.utils.auth_middleware import get_current_user
+
+USER = {"uid": "json-user", "email": "json@example.com", "role": "user"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    university = get_backend().collection("universities").document("json-uni")
+    university.set({"name": "JSON University", "admissions": {"Fall": "Open"}})
+    service = firebase_service.sync
+    application_id = service.create_document("applications", {
+        "user_id": USER["uid"], "university_id": "json-uni", "program": "Law", "status": "draft",
+        "adminNotes": "internal", "created_at": service.get_server_timestamp(),
+        "updated_at": service.get_server_timestamp(),
+    })
+    app.dependency_overrides[get_current_user] = lambda: USER
+    yield TestClient(app), application_id
+    app.dependency_overrides.pop(get_current_user, None)
+    university.delete()
+
+
+@pytest.fixture(autouse=True)
+def no_jsonable_encoder(monkeypatch):
+    def jsonable_encoder(*args, **kwargs):
+        raise AssertionError("jsonable_encoder called")
+
+    monkeypatch.setattr(fastapi.routing, "jsonable_encoder", jsonable_encoder)
+
+
+def test_application_routes_are_validated_without_the_encoder(client):
+    client, application_id = client
+    application = client.get(f"/api/application/{application_id}").json()
+    assert application["id"] == application_id
+    assert application["status"] == "draft"
+    # Still limited to the response model's fields
+    assert "adminNotes" not in application
+
+    applications = client.get("/api/application/").json()
+    assert [item["id"] for item in applications] == [application_id]
+
+
+@pytest.mark.parametrize("url", ["/health", "/api/universities/json-uni", "/api/universities/json-uni/admissions"])
+def test_other_routes_skip_the_encoder(client, url):
+    client, _ = client
+    assert client.get(url).status_code == 200
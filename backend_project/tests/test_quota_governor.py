@@ -0,0 +1,83 @@
+# tests/test_quota_governor.py
+"""Quota rejections hold writes back for a growing backoff window; deferred writes are sent afterwards."""
+import pytest
+
+from app.services import quota_governor
+from app.services.cache_service import CacheService
+from app.services.firebase_service import FirebaseService
+from app.services.quota_governor import CONSERVE, CRITICAL, NORMAL, QuotaGovernor
+from app.services.storage_backend import MemoryBackend
+
+
+class Clock:
+    """Stands in for the time module of the governor."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(quota_governor, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def governor(clock):
+    return QuotaGovernor(read_budget=1000, write_budget=100, workers=1, backoff=60, max_backoff=240)
+
+
+def test_usage_moves_budgets_through_their_states(governor):
+    governor.note_writes("applications", 79)
+    assert governor.write_state() == NORMAL
+    governor.note_writes("applications", 1)
+    assert governor.write_state() == CONSERVE and governor.defer_writes()
+    governor.note_writes("applications", 15)
+    assert governor.write_state() == CRITICAL
+    assert governor.read_state() == NORMAL
+
+
+def test_rejections_back_off_for_longer_until_a_probe_succeeds(governor, clock):
+    governor.note_exhausted()
+    assert governor.write_state() == CRITICAL
+    clock.now += 61
+    assert governor.write_state() == NORMAL
+
+    # The first probe after the window is rejected too: the next window doubles
+    governor.note_exhausted()
+    clock.now += 61
+    assert governor.write_state() == CRITICAL
+    clock.now += 60
+    assert governor.write_state() == NORMAL
+
+    # A rejection long after the last window starts over from the base backoff
+    clock.now += 1000
+    governor.note_exhausted()
+    clock.now += 61
+    assert governor.write_state() == NORMAL
+
+
+def test_deferred_writes_are_flushed_once_the_backoff_ends(governor, clock):
+    backend = MemoryBackend()
+    backend.collection("scrape_tasks").document("t1").set({"status": "started"})
+    service = FirebaseService(cache=CacheService(), backend=backend)
+    service._quota = governor
+    service.get_document("scrape_tasks", "t1")
+
+    governor.note_exhausted()
+    service.update_document("scrape_tasks", "t1", {"status": "completed"}, critical=False)
+
+    # Shown from the cache but not sent while the governor backs off
+    assert service.get_document("scrape_tasks", "t1") == {"status": "completed"}
+    assert backend.collection("scrape_tasks").document("t1").get().to_dict() == {"status": "started"}
+    assert service.flush_deferred_writes() == 0
+    assert governor.status()["deferred_writes"] == 1
+
+    clock.now += 61
+    assert service.flush_deferred_writes() == 1
+    assert backend.collection("scrape_tasks").document("t1").get().to_dict() == {"status": "completed"}
+    assert not governor.has_deferred()
@@ -0,0 +1,86 @@
+# tests/test_shared_cache.py
+"""Workers sharing a SharedCacheStore see each other's entries and writes."""
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import cache_service
+from app.services.cache_service import CacheService
+from app.services.catalog_record import CatalogRecord
+from app.services.shared_cache import SharedCacheStore
+from app.services.write_through import apply_write
+
+DOC_META = {"kind": "doc", "id": "a1"}
+LIST_META = {"kind": "list", "with_ids": True, "filter": None}
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_service, "SHARED_SYNC_INTERVAL", 0)
+    path = str(tmp_path / "cache.db")
+    # Each worker has its own in-memory cache over the same file
+    return CacheService(l2=SharedCacheStore(path)), CacheService(l2=SharedCacheStore(path))
+
+
+def test_entries_are_stored_as_json_and_rebuilt(workers, tmp_path):
+    writer, reader = workers
+    scraped = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    university = {"name": "Uni", "description": "x" * 2000, "scraped_at": scraped, "programs": {"CS": ["BS"]}}
+    writer.set("universities:u1", university, meta={"kind": "doc", "id": "u1"})
+
+    promoted = reader.get("universities:u1")
+    assert isinstance(promoted, CatalogRecord)
+    assert dict(promoted) == university
+    with pytest.raises(TypeError):
+        promoted.programs["CS"].append("MS")
+
+    rows = sqlite3.connect(str(tmp_path / "cache.db")).execute("SELECT meta, value FROM entries").fetchall()
+    for meta, value in rows:
+        json.loads(meta)
+        json.loads(value)
+
+
+def test_filtered_results_are_patched_after_a_round_trip(workers):
+    writer, reader = workers
+    meta = {"kind": "list", "with_ids": True, "filter": ("status", "==", "draft")}
+    writer.set("applications:find:status:==:draft", [{"id": "a1", "status": "draft"}], meta=meta)
+    assert reader.get("applications:find:status:==:draft") == [{"id": "a1", "status": "draft"}]
+
+    apply_write(reader, "applications", "a1", "update", {"status": "submitted"})
+
+    assert writer.get("applications:find:status:==:draft") == []
+
+
+def test_written_document_replaces_other_workers_copies(workers):
+    writer, reader = workers
+    reader.set("applications:a1", {"status": "draft"}, meta=DOC_META)
+    assert reader.get("applications:a1") == {"status": "draft"}
+
+    apply_write(writer, "applications", "a1", "set", {"status": "submitted"})
+
+    assert reader.get("applications:a1") == {"status": "submitted"}
+
+
+def test_update_reaches_workers_when_the_writer_holds_no_copy(workers):
+    writer, reader = workers
+    reader.set("applications:a1", {"status": "draft"}, meta=DOC_META)
+    reader.set("applications:all", [{"id": "a1", "status": "draft"}], meta=LIST_META)
+
+    apply_write(writer, "applications", "a1", "update", {"status": "submitted"})
+
+    # Outdated rows are dropped from the shared tier rather than served again
+    assert reader.get("applications:a1") is None
+    assert reader.get("applications:all") is None
+
+
+def test_write_patches_held_results_and_keeps_other_documents(workers):
+    writer, reader = workers
+    writer.set("applications:all", [{"id": "a1", "status": "draft"}], meta=LIST_META)
+    writer.set("applications:a2", {"status": "draft"}, meta={"kind": "doc", "id": "a2"})
+
+    apply_write(writer, "applications", "a1", "update", {"status": "submitted"})
+
+    assert reader.get("applications:all") == [{"id": "a1", "status": "submitted"}]
+    assert reader.get("applications:a2") == {"status": "draft"}
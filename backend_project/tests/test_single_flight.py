@@ -0,0 +1,100 @@
+# tests/test_single_flight.py
+"""Concurrent cache misses for one key share a single Firestore fetch."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.firebase_service import FirebaseService
+from app.services.single_flight import SingleFlight
+from app.services.storage_backend import MemoryBackend
+
+
+def slow_reads(backend, delay=0.1):
+    """Count the document reads of backend and make each take delay seconds."""
+    reads = []
+    get_all = backend.get_all
+
+    def counted(references, **kwargs):
+        reads.append([reference.id for reference in references])
+        time.sleep(delay)
+        return get_all(references, **kwargs)
+
+    backend.get_all = counted
+    return reads
+
+
+def run_together(count, fn):
+    """Call fn from count threads released at the same time; return their results."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = fn()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_misses_read_the_document_once():
+    backend = MemoryBackend()
+    backend.collection("applications").document("a1").set({"status": "draft"})
+    service = FirebaseService(cache=CacheService(), backend=backend)
+    reads = slow_reads(backend)
+
+    results = run_together(8, lambda: service.get_document("applications", "a1"))
+
+    assert reads == [["a1"]]
+    assert all(result == {"status": "draft"} for result in results)
+    assert service.get_single_flight_stats()["coalesced"] == 7
+
+
+def test_waiting_callers_share_the_leaders_error():
+    flights = SingleFlight()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ConnectionError("unavailable")
+
+    def call():
+        try:
+            flights.do("applications:a1", failing)
+        except ConnectionError as e:
+            return e
+
+    errors = run_together(4, call)
+
+    assert len(calls) == 1
+    assert all(isinstance(error, ConnectionError) for error in errors)
+
+
+def test_async_fetch_outlives_a_cancelled_caller():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": "draft"}
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do_async("applications:a1", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do_async("applications:a1", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == {"status": "draft"}
+    assert len(calls) == 1
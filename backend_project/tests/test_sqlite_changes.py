@@ -0,0 +1,46 @@
+# tests/test_sqlite_changes.py
+"""Listeners on a SQLite database must see the writes of other processes."""
+import threading
+
+import pytest
+
+from app.services import storage_backend
+from app.services.storage_backend import SQLiteBackend
+
+
+@pytest.fixture
+def backends(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_backend, "SQLITE_CHANGE_POLL_SECONDS", 0.05)
+    path = str(tmp_path / "storage.db")
+    # Two instances stand in for two processes: each only notifies its own commits in-process
+    reader, writer = SQLiteBackend(path), SQLiteBackend(path)
+    yield reader, writer
+    reader.close()
+    writer.close()
+
+
+def test_changes_from_another_process_reach_listeners(backends):
+    reader, writer = backends
+    writer.collection("universities").document("a").set({"name": "A"})
+    seen = {}
+    changed = threading.Event()
+
+    def on_snapshot(col_snapshot, changes, read_time):
+        for change in changes:
+            seen[change.document.id] = (change.type.name, change.document.to_dict())
+        changed.set()
+
+    reader.collection("universities").on_snapshot(on_snapshot)
+    assert seen == {"a": ("ADDED", {"name": "A"})}
+
+    changed.clear()
+    writer.collection("universities").document("b").set({"name": "B"})
+    writer.collection("universities").document("a").delete()
+    writer.collection("programs").document("p").set({"name": "P"})
+    for _ in range(40):
+        if changed.wait(0.1) and "a" in seen and seen["a"][0] == "REMOVED" and "b" in seen:
+            break
+        changed.clear()
+    assert seen["b"] == ("MODIFIED", {"name": "B"})
+    assert seen["a"] == ("REMOVED", None)
+    assert "p" not in seen
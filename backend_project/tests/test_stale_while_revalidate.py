@@ -0,0 +1,76 @@
+# tests/test_stale_while_revalidate.py
+"""get_all_documents serves an ageing copy at once and refreshes it in the background."""
+import time
+
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.firebase_service import FirebaseService
+from app.services.storage_backend import MemoryBackend
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    backend.collection("scrape_jobs").document("j1").set({"status": "pending"})
+    return backend
+
+
+@pytest.fixture
+def streams(backend):
+    """Collections queried through backend."""
+    streams = []
+    run = backend._run
+
+    def counted(query):
+        streams.append(query.collection)
+        return run(query)
+
+    backend._run = counted
+    return streams
+
+
+@pytest.fixture
+def service(backend):
+    return FirebaseService(cache=CacheService(ttl_policies={"scrape_jobs": 10}), backend=backend)
+
+
+def age(service, seconds):
+    service._cache.get_entry("scrape_jobs:all").stored_at -= seconds
+
+
+def wait_for_refresh(service):
+    for _ in range(100):
+        with service._refresh_lock:
+            if not service._refreshing:
+                return
+        time.sleep(0.01)
+
+
+def test_ageing_copy_is_served_while_it_refreshes(service, backend, streams):
+    assert [job["status"] for job in service.get_all_documents("scrape_jobs")] == ["pending"]
+    backend.collection("scrape_jobs").document("j1").set({"status": "done"})
+    age(service, 9)
+
+    assert [job["status"] for job in service.get_all_documents("scrape_jobs")] == ["pending"]
+    wait_for_refresh(service)
+
+    assert streams == ["scrape_jobs", "scrape_jobs"]
+    assert [job["status"] for job in service.get_all_documents("scrape_jobs")] == ["done"]
+
+
+def test_fresh_copy_is_served_without_a_refresh(service, streams):
+    service.get_all_documents("scrape_jobs")
+    age(service, 5)
+    service.get_all_documents("scrape_jobs")
+    wait_for_refresh(service)
+    assert streams == ["scrape_jobs"]
+
+
+def test_copy_too_old_to_serve_is_reloaded_first(service, backend, streams):
+    service.get_all_documents("scrape_jobs")
+    backend.collection("scrape_jobs").document("j1").set({"status": "done"})
+    age(service, 25)
+
+    assert [job["status"] for job in service.get_all_documents("scrape_jobs")] == ["done"]
+    assert streams == ["scrape_jobs", "scrape_jobs"]
@@ -0,0 +1,35 @@
+# tests/test_university_details.py
+"""Detail routes build their answers from cached (read-only) universities without modifying them."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.catalog_replica import get_replica
+from app.services.storage_backend import get_backend
+
+
+@pytest.fixture(scope="module")
+def client():
+    university = get_backend().collection("universities").document("details-uni")
+    university.set({
+        "name": "Details University",
+        "scholarships": [],
+        "facilities": [],
+        "basic_info": {"Scholarship": "Need based", "Hostel": "Available", "Sector": "Public"},
+    })
+    replica = get_replica("universities")
+    assert replica is not None and replica.get("details-uni") is not None
+    yield TestClient(app)
+    university.delete()
+
+
+def test_scholarships_fall_back_to_basic_info(client):
+    for _ in range(2):
+        body = client.get("/api/universities/details-uni/scholarships").json()
+        assert body == {"scholarships": [{"name": "Scholarship", "details": "Need based"}]}
+
+
+def test_facilities_fall_back_to_basic_info(client):
+    for _ in range(2):
+        body = client.get("/api/universities/details-uni/facilities").json()
+        assert body == {"facilities": [{"name": "Hostel", "details": "Available"}]}
@@ -0,0 +1,54 @@
+# tests/test_university_pagination.py
+"""Page-number and cursor walks of GET /api/universities/ must list the same universities."""
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.storage_backend import get_backend
+
+UNIVERSITY_IDS = [f"{letter}-uni" for letter in "abcdefghijklmnopqrstuvw"]
+
+
+@pytest.fixture(scope="module")
+def client():
+    universities = get_backend().collection("universities")
+    # Inserted out of ID order, so the replica's order differs from the listing's
+    ids = UNIVERSITY_IDS[:]
+    random.Random(7).shuffle(ids)
+    for doc_id in ids:
+        universities.document(doc_id).set({"name": doc_id.replace("-", " ").title()})
+    return TestClient(app)
+
+
+def walk_by_page(client, limit):
+    ids = []
+    page = 1
+    while True:
+        body = client.get("/api/universities/", params={"page": page, "limit": limit}).json()
+        ids += [university["id"] for university in body["universities"]]
+        if page >= body["pages"]:
+            return ids
+        page += 1
+
+
+def walk_by_cursor(client, limit):
+    ids = []
+    params = {"limit": limit}
+    while True:
+        body = client.get("/api/universities/", params=params).json()
+        ids += [university["id"] for university in body["universities"]]
+        if not body["next_cursor"]:
+            return ids
+        params = {"limit": limit, "cursor": body["next_cursor"]}
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 10, 50])
+def test_page_numbers_list_every_university_once(client, limit):
+    assert walk_by_page(client, limit) == sorted(UNIVERSITY_IDS)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 10, 50])
+def test_cursor_walk_matches_page_numbers(client, limit):
+    assert walk_by_cursor(client, limit) == walk_by_page(client, limit)
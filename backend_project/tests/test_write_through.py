@@ -0,0 +1,105 @@
+# tests/test_write_through.py
+"""Writes patch cached documents and query results instead of dropping them."""
+import pytest
+
+from app.services.cache_service import CacheService
+from app.services.firebase_service import FirebaseService
+from app.services.storage_backend import MemoryBackend
+from app.services.write_through import apply_write
+
+
+class Increment:
+    """Stands in for firestore.Increment, whose result is only known after the write."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+@pytest.fixture
+def backend():
+    backend = MemoryBackend()
+    applications = backend.collection("applications")
+    applications.document("a1").set({"user_id": "u1", "status": "draft"})
+    applications.document("a2").set({"user_id": "u1", "status": "submitted"})
+    return backend
+
+
+@pytest.fixture
+def reads(backend):
+    """Queries run against backend."""
+    reads = []
+    run = backend._run
+
+    def counted(query):
+        reads.append(query.filters)
+        return run(query)
+
+    backend._run = counted
+    return reads
+
+
+@pytest.fixture
+def service(backend):
+    return FirebaseService(cache=CacheService(), backend=backend)
+
+
+def statuses(documents):
+    return {doc["id"]: doc["status"] for doc in documents}
+
+
+def test_update_patches_cached_results_without_reading_again(service, reads):
+    service.get_all_documents("applications")
+    service.find_document("applications", "user_id", "==", "u1")
+
+    service.update_document("applications", "a1", {"status": "submitted"})
+
+    assert statuses(service.get_all_documents("applications")) == {"a1": "submitted", "a2": "submitted"}
+    assert statuses(service.find_document("applications", "user_id", "==", "u1")) == {"a1": "submitted", "a2": "submitted"}
+    assert len(reads) == 2
+
+
+def test_filtered_results_gain_and_lose_documents(service, reads):
+    service.find_document("applications", "status", "==", "draft")
+
+    service.update_document("applications", "a1", {"status": "submitted"})
+    assert service.find_document("applications", "status", "==", "draft") == []
+
+    service.create_document("applications", {"user_id": "u2", "status": "draft"}, "a3")
+    assert statuses(service.find_document("applications", "status", "==", "draft")) == {"a3": "draft"}
+    assert len(reads) == 1
+
+
+def test_delete_removes_the_document_everywhere(service, reads):
+    service.get_document("applications", "a2")
+    service.get_all_documents("applications")
+
+    service.delete_document("applications", "a2")
+
+    assert statuses(service.get_all_documents("applications")) == {"a1": "draft"}
+    assert service._cache.get("applications:a2") is None
+    assert len(reads) == 1
+
+
+def test_projections_are_patched():
+    cache = CacheService()
+    cache.set("universities:all:select:basic_info.Location",
+              [{"id": "u1", "basic_info": {"Location": "Lahore"}}],
+              meta={"kind": "projection", "fields": ["basic_info.Location"]})
+    cache.set("universities:u1", {"name": "Uni", "basic_info": {"Location": "Lahore"}},
+              meta={"kind": "doc", "id": "u1"})
+
+    apply_write(cache, "universities", "u1", "update", {"basic_info.Location": "Islamabad"})
+
+    assert cache.get("universities:all:select:basic_info.Location") == [{"id": "u1", "basic_info": {"Location": "Islamabad"}}]
+    assert cache.get("universities:u1") == {"name": "Uni", "basic_info": {"Location": "Islamabad"}}
+
+
+def test_writes_that_cannot_be_computed_locally_invalidate(service):
+    service.get_all_documents("applications")
+    service._cache.set("applications:count:[]", 2, meta={"kind": "count"})
+
+    # What update_document does once Firestore has applied the write
+    service._write_through("applications", "a1", "update", {"revisions": Increment(1)})
+
+    assert service._cache.get("applications:all") is None
+    assert service._cache.get("applications:count:[]") is None